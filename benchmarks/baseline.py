@@ -0,0 +1,128 @@
+"""The original per-survey scoring and matching loops, kept as oracles.
+
+These are the implementations main.py had before scoring, matching and
+JUPAS lookup moved to scoring.py and indexes.py, reduced to pure
+functions over explicit data. bench_hot_paths.py times the current code
+against them and checks that both give the same answers.
+"""
+from itertools import permutations
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def generate_code(max_categories, second_max_categories, third_max_categories):
+    """Generate OnTrack code"""
+    if len(max_categories) == 2:
+        permutations_result = [''.join(p) + second_max_categories[0] for p in permutations(max_categories, 2)]
+        return " / ".join(permutations_result)
+    elif len(max_categories) >= 3:
+        permutations_result = [''.join(p) for p in permutations(max_categories, 3)]
+        return " / ".join(permutations_result)
+    elif len(max_categories) == 1:
+        if len(second_max_categories) >= 2:
+            permutations_result = [max_categories[0] + ''.join(p) for p in permutations(second_max_categories[0:], 2)]
+            return " / ".join(permutations_result)
+        elif len(second_max_categories) == 1 and len(third_max_categories) >= 2:
+            permutations_result = [max_categories[0] + second_max_categories[0] + ''.join(p) for p in permutations(third_max_categories, 1)]
+            return " / ".join(permutations_result)
+        else:
+            return max_categories[0] + second_max_categories[0] + third_max_categories[0]
+    else:
+        return max_categories[0] + second_max_categories[0] + third_max_categories[0]
+
+
+def page6_holland_code(user_answers: Sequence[Any], questions_pool: Sequence[Dict[str, Any]]) -> str:
+    """get_survey_page page 6: category counts and every tied Holland code"""
+    category_counts = {"R": 0, "A": 0, "S": 0, "C": 0, "I": 0, "E": 0}
+
+    for i, answer in enumerate(user_answers):
+        if answer and str(answer).lower() == "yes":
+            question_idx = i % len(questions_pool)
+            category = questions_pool[question_idx]["category"]
+            category_counts[category] += 1
+
+    sorted_categories = sorted(
+        category_counts.items(),
+        key=lambda x: (x[1], x[0]),  # Sort by count first, then alphabetically
+        reverse=True
+    )
+    max_count = sorted_categories[0][1]
+    second_max_count = sorted_categories[1][1]
+    third_max_count = sorted_categories[2][1]
+    max_categories = [cat for cat, count in sorted_categories if count == max_count]
+    second_max_categories = [cat for cat, count in sorted_categories if count == second_max_count]
+    third_max_categories = [cat for cat, count in sorted_categories if count == third_max_count]
+    return generate_code(max_categories, second_max_categories, third_max_categories)
+
+
+def page6_matching_industries(holland_code: str, industry_mapping: List[Dict[str, Any]]) -> List[str]:
+    """get_survey_page page 6: industries for every tied code"""
+    matching_industries = set()  # Use set to avoid duplicates
+    for code in holland_code.split(' / '):
+        for mapping in industry_mapping:
+            if 'holland_codes' in mapping and 'industry' in mapping:
+                if code in mapping['holland_codes']:
+                    matching_industries.add(mapping['industry'])
+    return list(matching_industries)
+
+
+def submit_survey_score(answers: Sequence[Any], questions_pool: Sequence[Dict[str, Any]],
+                        industry_mapping: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """submit_survey: top three categories and their matching industries"""
+    yes_no_answers = answers[6:]  # Skip name and DSE scores
+
+    category_counts = {"R": 0, "I": 0, "A": 0, "S": 0, "E": 0, "C": 0}
+    for i, answer in enumerate(yes_no_answers):
+        if str(answer).lower() == 'yes' and i < len(questions_pool):
+            category = questions_pool[i].get('category')
+            if category in category_counts:
+                category_counts[category] += 1
+
+    sorted_categories = sorted(
+        category_counts.items(),
+        key=lambda x: (-x[1], x[0])  # Sort by count (descending) then by letter
+    )
+    holland_codes = ''.join(cat for cat, _ in sorted_categories[:3])
+
+    matching_industries = []
+    for industry in industry_mapping:
+        if 'holland_codes' in industry and any(code in industry['holland_codes'] for code in holland_codes):
+            if 'industry' in industry:
+                matching_industries.append(industry['industry'])
+
+    if not matching_industries:
+        # If no exact matches, use the first code as fallback
+        for industry in industry_mapping:
+            if 'holland_codes' in industry and holland_codes[0] in industry['holland_codes']:
+                if 'industry' in industry:
+                    matching_industries.append(industry['industry'])
+
+    if not matching_industries:
+        matching_industries = ["General"]  # Fallback industry
+
+    return {"holland_codes": holland_codes, "matching_industries": matching_industries}
+
+
+def find_closest_program(target_score: float, programs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Find the program with the closest median score to target score"""
+    if not programs:
+        return None
+
+    min_diff = float('inf')
+    closest_program = None
+
+    for program in programs:
+        try:
+            median_score = program.get('median_score_index')
+            if median_score is None or median_score == '/':
+                continue
+
+            median_score = float(median_score)
+            diff = abs(median_score - target_score)
+
+            if diff < min_diff:
+                min_diff = diff
+                closest_program = program
+        except (ValueError, TypeError):
+            continue
+
+    return closest_program
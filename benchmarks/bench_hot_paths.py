@@ -0,0 +1,189 @@
+"""Micro-benchmarks of the per-survey scoring and matching paths, with equivalence checks.
+
+Times the current code against the original loops kept in baseline.py:
+
+  generate_code        tied-category Holland codes (scoring.generate_code)
+  page 6 codes         category counting and codes for get_survey_page page 6
+  page 6 codes ordered the same, counting answers by the session's question order
+  page 6 industries    industries for every tied code (IndustryIndex)
+  submit_survey        top-three code and industries, one survey per call (SurveyScorer.score)
+  submit_survey batch  the same for the whole workload at once (SurveyScorer.score_batch)
+  closest program      JUPAS program nearest the average DSE score (JupasIndex.nearest)
+
+Inputs are generated from questions_pool.yaml, industry_mapping.yaml and
+jupas.yaml at 1x, 10x and 100x their current size, from a fixed seed. Every
+result is checked against the baseline, or against reference.py where the
+current behaviour deliberately differs, and the run fails on any mismatch.
+Run from the repository root:
+
+    python benchmarks/bench_hot_paths.py [--scales 1 10 100] [--surveys 500] [--repeats 5] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import baseline  # noqa: E402
+import reference  # noqa: E402
+from indexes import IndustryIndex, JupasIndex, parse_median  # noqa: E402
+from reference_data import load_yaml_sources  # noqa: E402
+from sampler import QuestionSampler  # noqa: E402
+from scoring import SurveyScorer, all_holland_codes, generate_code, page_category_counts  # noqa: E402
+
+QUESTIONS_PER_SURVEY = 40
+
+
+def scale_reference(data: Dict[str, Any], scale: int, rng: random.Random) -> Dict[str, Any]:
+    """`scale` times the questions, industries and programs per JUPAS industry.
+
+    Questions and industries are renamed copies. Programs are copied within
+    their industry with medians jittered by up to half a point, since the
+    closest-program lookup scans one industry's programs.
+    """
+    def renamed(name: str, copy: int) -> str:
+        return name if copy == 0 else f"{name} ({copy})"
+
+    questions = [{**q, 'question': renamed(q['question'], copy)}
+                 for copy in range(scale) for q in data['questions_pool']]
+    mapping = [{'industry': renamed(entry['industry'], copy), 'holland_codes': list(entry['holland_codes'])}
+               for copy in range(scale) for entry in data['industry_mapping']]
+    jupas = {}
+    for industry, programs in data['jupas'].items():
+        copies = []
+        for copy in range(scale):
+            for program in programs or []:
+                program = {**program, 'course_name': renamed(program.get('course_name', ''), copy)}
+                median = parse_median(program)
+                if copy and median is not None:
+                    program['median_score_index'] = round(min(7.0, max(1.0, median + rng.uniform(-0.5, 0.5))), 2)
+                copies.append(program)
+        jupas[str(industry)] = copies
+    return {'questions_pool': questions, 'industry_mapping': mapping, 'jupas': jupas}
+
+
+def make_surveys(pool_size: int, count: int, rng: random.Random) -> List[Tuple[List[Any], Any]]:
+    """(submit_survey answers, question order) for `count` students"""
+    surveys = []
+    for i in range(count):
+        dse = [rng.randint(1, 7) for _ in range(5)]
+        yes_no = [rng.choice(["yes", "no", "Yes", ""]) for _ in range(QUESTIONS_PER_SURVEY)]
+        order = QuestionSampler.new(pool_size, seed=rng.random()).order[:QUESTIONS_PER_SURVEY]
+        surveys.append(([f"student{i}", *dse, *yes_no], order))
+    return surveys
+
+
+def grouped_counts(counts: Dict[str, int]) -> Tuple[List[str], List[str], List[str]]:
+    ranked = sorted(counts.items(), key=lambda x: (x[1], x[0]), reverse=True)
+    levels = [ranked[0][1], ranked[1][1], ranked[2][1]]
+    return tuple([cat for cat, count in ranked if count == level] for level in levels)
+
+
+def best_time(fn: Callable[[], Any], repeats: int) -> Tuple[float, Any]:
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_scale(data: Dict[str, Any], scale: int, args) -> List[Tuple[str, int, float, float, bool]]:
+    rng = random.Random(args.seed * 1000 + scale)
+    scaled = scale_reference(data, scale, rng)
+    questions, mapping, jupas = scaled['questions_pool'], scaled['industry_mapping'], scaled['jupas']
+
+    build_start = time.perf_counter()
+    industry_index = IndustryIndex.from_mapping(mapping)
+    jupas_index = JupasIndex.from_data(jupas)
+    scorer = SurveyScorer(questions, industry_index)
+    build_time = time.perf_counter() - build_start
+    print(f"\n{scale}x: {len(questions)} questions, {len(mapping)} industries, "
+          f"{sum(len(p) for p in jupas.values())} programs; indexes built in {build_time * 1000:.1f} ms")
+
+    surveys = make_surveys(len(questions), args.surveys, rng)
+    page_answers = [answers[6:] for answers, _ in surveys]
+    counts = [{c: rng.randint(0, 10) for c in "RIASEC"} for _ in range(args.surveys)]
+    groups = [grouped_counts(c) for c in counts]
+    industries = [name for name, programs in jupas.items() if programs]
+    targets = [(rng.choice(industries), round(rng.uniform(1.5, 6.5), 2)) for _ in range(args.surveys)]
+    codes = [reference.page6_holland_code(a, questions, order) for a, (_, order) in zip(page_answers, surveys)]
+
+    def submit_survey_equal(old, new):
+        # Codes as the original scored them; industries as reference.py matches them
+        return all(o["holland_codes"] == n["holland_codes"]
+                   and n["matching_industries"] == reference.submit_survey_industries(n["holland_codes"], mapping)
+                   for o, n in zip(old, new))
+
+    cases = [
+        ("generate_code",
+         lambda: [baseline.generate_code(*g) for g in groups],
+         lambda: [generate_code(*g) for g in groups],
+         lambda old, new: old == new),
+        ("page 6 codes",
+         lambda: [baseline.page6_holland_code(a, questions) for a in page_answers],
+         lambda: [all_holland_codes(page_category_counts(a, questions)) for a in page_answers],
+         lambda old, new: old == new),
+        ("page 6 codes ordered",
+         lambda: [reference.page6_holland_code(a, questions, order)
+                  for a, (_, order) in zip(page_answers, surveys)],
+         lambda: [all_holland_codes(page_category_counts(a, questions, order, len(order)))
+                  for a, (_, order) in zip(page_answers, surveys)],
+         lambda old, new: old == new),
+        ("page 6 industries",
+         lambda: [baseline.page6_matching_industries(code, mapping) for code in codes],
+         lambda: [industry_index.ordered(industry_index.for_codes(code.split(' / '))) for code in codes],
+         # The original returned a set's order; compare membership
+         lambda old, new: [set(o) for o in old] == [set(n) for n in new]),
+        ("submit_survey",
+         lambda: [baseline.submit_survey_score(answers, questions, mapping) for answers, _ in surveys],
+         lambda: [scorer.score(answers) for answers, _ in surveys],
+         submit_survey_equal),
+        ("submit_survey batch",
+         lambda: [baseline.submit_survey_score(answers, questions, mapping) for answers, _ in surveys],
+         lambda: scorer.score_batch([answers for answers, _ in surveys]),
+         submit_survey_equal),
+        ("closest program",
+         lambda: [baseline.find_closest_program(target, jupas[industry]) for industry, target in targets],
+         lambda: [(jupas_index.nearest(industry, target, 1) or [(None, None)])[0][1]
+                  for industry, target in targets],
+         lambda old, new: old == new),
+    ]
+
+    results = []
+    for name, old_fn, new_fn, same in cases:
+        old_time, old = best_time(old_fn, args.repeats)
+        new_time, new = best_time(new_fn, args.repeats)
+        results.append((name, len(old), old_time, new_time, same(old, new)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scoring and matching against the original loops")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--surveys', type=int, default=500, help="inputs per benchmark")
+    parser.add_argument('--repeats', type=int, default=5, help="runs per benchmark; the fastest counts")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    data = load_yaml_sources('.')
+    mismatches = []
+    for scale in args.scales:
+        results = run_scale(data, scale, args)
+        print(f"{'benchmark':<22} {'ops':>6} {'baseline us/op':>15} {'current us/op':>14} {'speed-up':>9}  equal")
+        for name, ops, old_time, new_time, equal in results:
+            print(f"{name:<22} {ops:>6} {old_time / ops * 1e6:>15.2f} {new_time / ops * 1e6:>14.2f} "
+                  f"{old_time / new_time:>8.1f}x  {'yes' if equal else 'NO'}")
+            if not equal:
+                mismatches.append(f"{name} at {scale}x")
+    if mismatches:
+        print(f"\nOutputs differ from the baseline: {', '.join(mismatches)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
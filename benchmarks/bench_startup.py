@@ -0,0 +1,56 @@
+"""Start-up cost of loading reference data: YAML parse and indexing vs compiled snapshot.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [repeats]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reference_data import build_indexes, compile_snapshot, load_snapshot, load_yaml_sources  # noqa: E402
+
+
+def timed(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def report(label, samples):
+    print(f"{label:<28} median {statistics.median(samples) * 1000:8.2f} ms   "
+          f"min {min(samples) * 1000:8.2f} ms")
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    base_dir = '.'
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, 'reference_data.snapshot')
+        compile_snapshot(base_dir, snapshot_path)
+
+        def load_yaml_and_index():
+            data = load_yaml_sources(base_dir)
+            build_indexes(data)
+            return data
+
+        yaml_data, yaml_samples = timed(load_yaml_and_index, repeats)
+        snapshot_data, snapshot_samples = timed(lambda: load_snapshot(base_dir, snapshot_path), repeats)
+
+    assert all(snapshot_data[name] == yaml_data[name] for name in yaml_data), \
+        "snapshot does not match the YAML sources"
+    print(f"Reference data load, {repeats} runs")
+    report("YAML (before)", yaml_samples)
+    report("snapshot + hashes (after)", snapshot_samples)
+    print(f"speed-up: {statistics.median(yaml_samples) / statistics.median(snapshot_samples):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Local stand-in for the OpenAI chat completions API, for load tests.
+
+Answers every /v1/chat/completions request with career paths in the
+`//`-separated format the server parses, after a configurable delay, and
+streams them at a configurable token rate when asked to. Token usage is
+reported as the number of whitespace-separated words.
+
+    python benchmarks/fake_openai.py [--port 8100] [--latency 0.5] [--token-rate 80]
+
+Point the server at it with OPENAI_BASE_URL=http://127.0.0.1:8100/v1.
+The same settings can be given as FAKE_OPENAI_LATENCY,
+FAKE_OPENAI_TOKEN_RATE and FAKE_OPENAI_PATHS when run under uvicorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CAREER_PATH = """Job Title: {title}
+Description: A {title} applies {letters} strengths every day, working with people, data and ideas to solve practical problems for the organisations and communities they serve.
+Required Skills: Communication, analysis, teamwork, time management
+Education: Bachelor's degree in a related field; relevant certifications help.
+Career Progression: Junior {title} → {title} → Senior {title} → Lead {title}
+"""
+
+TITLES = ["Analyst", "Designer", "Engineer", "Consultant", "Coordinator", "Researcher", "Manager",
+          "Specialist", "Advisor", "Planner"]
+
+
+def career_paths_text(count: int, letters: str = "RIASEC") -> str:
+    return "//\n".join(CAREER_PATH.format(title=TITLES[i % len(TITLES)], letters=letters)
+                       for i in range(count))
+
+
+def create_app(latency: float = 0.5, token_rate: float = 80.0, paths: int = 5) -> FastAPI:
+    """latency: seconds before the first token; token_rate: tokens per second after it (0 = instant)"""
+    app = FastAPI()
+    app.state.requests = 0
+
+    def tokens_for(text: str, max_tokens: int):
+        words = text.split(' ')
+        return words[:max_tokens] if max_tokens else words
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "gpt-4o")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        words = tokens_for(career_paths_text(paths), int(body.get("max_tokens") or 0))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + (len(words) / token_rate if token_rate else 0))
+            return JSONResponse({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": ' '.join(words)}}],
+                "usage": usage,
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(choices, **extra) -> str:
+            data = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": choices, **extra}
+            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        async def events():
+            await asyncio.sleep(latency)
+            yield chunk([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+            for i, word in enumerate(words):
+                if token_rate:
+                    await asyncio.sleep(1 / token_rate)
+                text = word if i == 0 else ' ' + word
+                yield chunk([{"index": 0, "delta": {"content": text}, "finish_reason": None}])
+            yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if include_usage:
+                yield chunk([], usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+app = create_app(
+    latency=float(os.getenv('FAKE_OPENAI_LATENCY', '0.5')),
+    token_rate=float(os.getenv('FAKE_OPENAI_TOKEN_RATE', '80')),
+    paths=int(os.getenv('FAKE_OPENAI_PATHS', '5')),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument('--token-rate', type=float, default=80.0, help="tokens per second, 0 for instant")
+    parser.add_argument('--paths', type=int, default=5, help="career paths per completion")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency, args.token_rate, args.paths), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Classroom-scale load test of the full survey flow, without spending API money.
+
+Each simulated student takes survey pages 1-6, submits the survey, reads
+the results, asks for career paths and JUPAS recommendations and sends a
+chat message. Latency is recorded per endpoint and reported as p50/p95/p99
+with overall throughput, so work that blocks the event loop shows up as
+tail latency on the cheap endpoints.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py [--students 60] [--concurrency 60] [--stream]
+
+By default it starts benchmarks/fake_openai.py and the server (uvicorn
+main:app) on free local ports, with SQLite storage, caches and traces in a
+temporary directory. Use --target to drive a server that is already
+running (pointed at a fake or real OpenAI endpoint by the caller).
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout:.0f}s")
+
+
+@contextmanager
+def local_servers(args):
+    """Start the fake OpenAI server and the app; yields (app URL, fake URL)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_port, app_port = free_port(), free_port()
+        fake_env = {
+            **os.environ,
+            "FAKE_OPENAI_LATENCY": str(args.latency),
+            "FAKE_OPENAI_TOKEN_RATE": str(args.token_rate),
+        }
+        app_env = {
+            **os.environ,
+            "OPENAI_API_KEY": "load-test",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+            "ONTRACK_STORAGE": "sqlite",
+            "ONTRACK_DB_PATH": os.path.join(tmp, "ontrack.db"),
+            "ONTRACK_CAREER_CACHE_PATH": os.path.join(tmp, "career_paths_cache.db"),
+            "ONTRACK_TRACE_PATH": os.path.join(tmp, "request_traces.jsonl"),
+            "WEB_CONCURRENCY": str(args.workers),
+        }
+        quiet = {"stdout": subprocess.DEVNULL, "stderr": None if args.verbose else subprocess.DEVNULL}
+        fake = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "fake_openai:app", "--port", str(fake_port),
+             "--log-level", "warning"],
+            cwd=os.path.join(ROOT, "benchmarks"), env=fake_env, **quiet)
+        server = None
+        try:
+            fake_url = f"http://127.0.0.1:{fake_port}"
+            wait_until_up(f"{fake_url}/stats", fake)
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=ROOT, env=app_env, **quiet)
+            app_url = f"http://127.0.0.1:{app_port}"
+            wait_until_up(f"{app_url}/", server)
+            yield app_url, fake_url
+        finally:
+            for process in (server, fake):
+                if process is not None:
+                    process.terminate()
+                    try:
+                        process.wait(timeout=10)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str,
+                   stream: bool = False, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            if stream:
+                async with client.stream(method, url, **kwargs) as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+            else:
+                response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.samples[label].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+
+async def student(client: httpx.AsyncClient, recorder: Recorder, user_name: str, stream: bool,
+                  refresh: bool, rng: random.Random):
+    call = recorder.call
+    dse_scores = [rng.randint(2, 7) for _ in range(5)]
+    basic_info = [user_name, *dse_scores]
+
+    await call(client, "GET /get_survey_page/1", "GET", "/get_survey_page/1")
+    await call(client, "POST /submit_survey_page/", "POST", "/submit_survey_page/",
+               json={"user_name": user_name, "page_number": 1, "answers": basic_info})
+    yes_no = []
+    for page in range(2, 6):
+        response = await call(client, "GET /get_survey_page/2-5", "GET", f"/get_survey_page/{page}",
+                              params={"user_name": user_name})
+        count = len(response.json().get("questions", [])) if response is not None and response.is_success else 10
+        answers = [rng.choice(["yes", "no"]) for _ in range(count)]
+        yes_no.extend(answers)
+        await call(client, "POST /submit_survey_page/", "POST", "/submit_survey_page/",
+                   json={"user_name": user_name, "page_number": page, "answers": answers})
+    response = await call(client, "GET /get_survey_page/6", "GET", "/get_survey_page/6",
+                          params={"user_name": user_name})
+    final = response.json().get("questions", []) if response is not None and response.is_success else []
+    await call(client, "POST /submit_survey_page/", "POST", "/submit_survey_page/",
+               json={"user_name": user_name, "page_number": 6,
+                     "answers": [rng.choice(["yes", "no"]) for _ in final]})
+    await call(client, "POST /submit_survey/", "POST", "/submit_survey/",
+               json={"user_name": user_name, "answers": [*basic_info, *yes_no], "dse_scores": dse_scores})
+
+    await call(client, "GET /get_survey_results/{user}", "GET", f"/get_survey_results/{user_name}")
+    if stream:
+        await call(client, "GET /get_career_paths/{user}/stream", "GET",
+                   f"/get_career_paths/{user_name}/stream", stream=True, params={"refresh": refresh})
+    else:
+        await call(client, "GET /get_career_paths/{user}", "GET", f"/get_career_paths/{user_name}",
+                   params={"refresh": refresh})
+    await call(client, "GET /get_jupas_recommendations/{user}", "GET",
+               f"/get_jupas_recommendations/{user_name}")
+    chat = {"message": "Which of these careers suits me best?"}
+    if stream:
+        await call(client, "POST /chat/{user}/stream", "POST", f"/chat/{user_name}/stream",
+                   stream=True, json=chat)
+    else:
+        await call(client, "POST /chat/{user}", "POST", f"/chat/{user_name}", json=chat)
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    index = max(0, min(len(sorted_samples) - 1, round(fraction * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[index]
+
+
+def report(recorder: Recorder, elapsed: float, students: int, upstream_requests: Optional[int]):
+    total = sum(len(samples) for samples in recorder.samples.values())
+    print(f"{students} students, {total} requests in {elapsed:.2f} s: "
+          f"{total / elapsed:.1f} req/s, {students / elapsed:.2f} students/s")
+    if upstream_requests is not None:
+        print(f"upstream chat completions: {upstream_requests}")
+    print(f"{'endpoint':<40} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for label in sorted(recorder.samples, key=lambda label: -statistics.median(recorder.samples[label])):
+        samples = sorted(recorder.samples[label])
+        print(f"{label:<40} {len(samples):>6} {recorder.errors.get(label, 0):>6} "
+              f"{percentile(samples, 0.50) * 1000:>9.1f} {percentile(samples, 0.95) * 1000:>9.1f} "
+              f"{percentile(samples, 0.99) * 1000:>9.1f} {samples[-1] * 1000:>9.1f}")
+
+
+async def run(app_url: str, fake_url: Optional[str], args) -> None:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=app_url, timeout=args.timeout, limits=limits) as client:
+        async def one(i: int):
+            if args.ramp:
+                await asyncio.sleep(args.ramp * i / args.students)
+            async with semaphore:
+                await student(client, recorder, f"load-{run_id}-{i}", args.stream, args.refresh,
+                              random.Random(rng.random()))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.students)))
+        elapsed = time.perf_counter() - start
+
+        upstream = None
+        if fake_url:
+            try:
+                upstream = httpx.get(f"{fake_url}/stats", timeout=5.0).json()["requests"]
+            except httpx.HTTPError:
+                pass
+    report(recorder, elapsed, args.students, upstream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the survey flow against a fake OpenAI server")
+    parser.add_argument('--students', type=int, default=60, help="simulated students")
+    parser.add_argument('--concurrency', type=int, default=60, help="students active at once")
+    parser.add_argument('--ramp', type=float, default=0.0, help="seconds over which students start")
+    parser.add_argument('--stream', action='store_true', help="use the streaming career path and chat endpoints")
+    parser.add_argument('--refresh', action='store_true', help="bypass the career path cache")
+    parser.add_argument('--latency', type=float, default=0.5, help="fake OpenAI time to first token, seconds")
+    parser.add_argument('--token-rate', type=float, default=80.0, help="fake OpenAI tokens per second")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn workers for the started server")
+    parser.add_argument('--timeout', type=float, default=300.0, help="per-request timeout, seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target', default=None, help="URL of an already running server to test instead")
+    parser.add_argument('--fake-url', default=None, help="URL of the fake OpenAI server used by --target")
+    parser.add_argument('--verbose', action='store_true', help="show server logs")
+    args = parser.parse_args()
+
+    if args.target:
+        asyncio.run(run(args.target.rstrip('/'), args.fake_url, args))
+        return
+    with local_servers(args) as (app_url, fake_url):
+        asyncio.run(run(app_url, fake_url, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Straightforward loops for behaviour that intentionally differs from the original.
+
+baseline.py keeps main.py's original code verbatim; where the current code
+fixes or extends it, the intended result is spelled out here instead, with
+plain loops over the reference data and no indexes, for
+bench_hot_paths.py to check against.
+"""
+from typing import Any, Dict, List, Sequence
+
+from baseline import generate_code
+
+
+def submit_survey_industries(holland_codes: str, industry_mapping: List[Dict[str, Any]]) -> List[str]:
+    """Industries listing the exact code, else a code with its leading pair,
+    else a code with the same letters in any order, in mapping order.
+
+    (The original compared single letters against whole codes and so
+    always fell back to "General".)
+    """
+    tests = [
+        lambda code: code == holland_codes,
+        lambda code: code[:2] == holland_codes[:2],
+        lambda code: sorted(code) == sorted(holland_codes),
+    ]
+    for matches in tests:
+        industries = []
+        for entry in industry_mapping:
+            if 'holland_codes' not in entry or 'industry' not in entry:
+                continue
+            if any(matches(str(code).upper()) for code in entry['holland_codes']):
+                if entry['industry'] not in industries:
+                    industries.append(entry['industry'])
+        if industries:
+            return industries
+    return ["General"]
+
+
+def page6_holland_code(user_answers: Sequence[Any], questions_pool: Sequence[Dict[str, Any]],
+                       question_order: Sequence[int]) -> str:
+    """Every tied Holland code, counting answer i for question order[i].
+
+    Only the counting differs from baseline.page6_holland_code, which took
+    answer i to be question i modulo the pool size; the codes come from
+    the original generate_code.
+    """
+    category_counts = {"R": 0, "A": 0, "S": 0, "C": 0, "I": 0, "E": 0}
+    for answer, question_idx in zip(user_answers, question_order):
+        if answer and str(answer).lower() == "yes":
+            category_counts[questions_pool[question_idx]["category"]] += 1
+
+    ranked = sorted(category_counts.items(), key=lambda x: (x[1], x[0]), reverse=True)
+    levels = [ranked[0][1], ranked[1][1], ranked[2][1]]
+    return generate_code(*([cat for cat, count in ranked if count == level] for level in levels))
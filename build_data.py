@@ -0,0 +1,244 @@
+"""Build the server's reference data from its sources.
+
+Replaces hand-running Convertor.ipynb: reads Holland_industry.xlsx (column
+A industry, column B comma-separated Holland codes, no header row),
+jupas.yaml and questions_pool.yaml, validates them, writes
+industry_mapping.yaml and compiles the snapshot with prebuilt indexes that
+the server loads at start-up.
+
+    python build_data.py [--strict] [--no-yaml]
+
+Problems that would break matching are errors and stop the build; data
+the server can work around (for example a median score it cannot parse)
+is a warning, or an error with --strict.
+"""
+import argparse
+import os
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from indexes import parse_median
+from reference_data import SOURCES, reference_payload, write_snapshot
+
+XLSX_PATH = 'Holland_industry.xlsx'
+RIASEC = set("RIASEC")
+
+_NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+_DOC_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+
+class DataError(ValueError):
+    """Reference data failed validation"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__(f"{len(problems)} problem(s) in reference data:\n  " + "\n  ".join(problems))
+        self.problems = problems
+
+
+class Report:
+    def __init__(self):
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+
+    def error(self, message: str):
+        self.errors.append(message)
+
+    def warning(self, message: str):
+        self.warnings.append(message)
+
+
+def _column_index(cell_ref: str) -> int:
+    index = 0
+    for char in cell_ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def read_xlsx_rows(path: str) -> List[List[str]]:
+    """Cell text of the first worksheet, row by row, using only the standard library"""
+    with zipfile.ZipFile(path) as z:
+        shared = []
+        if 'xl/sharedStrings.xml' in z.namelist():
+            for si in ET.fromstring(z.read('xl/sharedStrings.xml')).findall('main:si', _NS):
+                shared.append(''.join(t.text or '' for t in si.iter(f"{{{_NS['main']}}}t")))
+
+        workbook = ET.fromstring(z.read('xl/workbook.xml'))
+        first_sheet = workbook.find('main:sheets/main:sheet', _NS)
+        rels = ET.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+        target = next(rel.get('Target') for rel in rels.findall('rel:Relationship', _NS)
+                      if rel.get('Id') == first_sheet.get(_DOC_REL))
+        sheet = ET.fromstring(z.read('xl/' + target.lstrip('/').replace('xl/', '', 1)))
+
+    rows = []
+    for row in sheet.iter(f"{{{_NS['main']}}}row"):
+        cells: Dict[int, str] = {}
+        for cell in row.findall('main:c', _NS):
+            kind = cell.get('t')
+            if kind == 'inlineStr':
+                text = ''.join(t.text or '' for t in cell.iter(f"{{{_NS['main']}}}t"))
+            else:
+                value = cell.find('main:v', _NS)
+                text = value.text if value is not None and value.text is not None else ''
+                if kind == 's' and text:
+                    text = shared[int(text)]
+            cells[_column_index(cell.get('r', 'A'))] = text
+        if cells:
+            rows.append([cells.get(i, '') for i in range(max(cells) + 1)])
+    return rows
+
+
+def _valid_code(code: str) -> bool:
+    return len(code) == 3 and set(code) <= RIASEC and len(set(code)) == 3
+
+
+def industry_mapping_from_rows(rows: List[List[str]], report: Report) -> List[Dict[str, Any]]:
+    """Industry mapping entries in the industry_mapping.yaml layout"""
+    mapping = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        industry = (row[0] if row else '').strip()
+        codes_cell = (row[1] if len(row) > 1 else '').strip()
+        if not industry and not codes_cell:
+            continue
+        if not industry or industry.lower() == 'nan':
+            report.error(f"{XLSX_PATH} row {number}: missing industry name")
+            continue
+        if industry in seen:
+            report.error(f"{XLSX_PATH} row {number}: duplicate industry {industry!r}")
+            continue
+        seen.add(industry)
+
+        codes = []
+        for code in codes_cell.split(','):
+            code = code.strip().upper()
+            if not code:
+                continue
+            if not _valid_code(code):
+                report.error(f"{XLSX_PATH} row {number}: invalid Holland code {code!r} for {industry!r}")
+            elif code in codes:
+                report.warning(f"{XLSX_PATH} row {number}: duplicate code {code} for {industry!r}")
+            else:
+                codes.append(code)
+        if not codes:
+            report.error(f"{XLSX_PATH} row {number}: no Holland codes for {industry!r}")
+            continue
+        mapping.append({'industry': industry, 'holland_codes': codes})
+    return mapping
+
+
+def validate_questions(questions: Any, report: Report):
+    if not isinstance(questions, list) or not questions:
+        report.error("questions_pool.yaml: no questions")
+        return
+    for number, question in enumerate(questions, start=1):
+        if not isinstance(question, dict) or not str(question.get('question', '')).strip():
+            report.error(f"questions_pool.yaml question {number}: missing question text")
+        elif question.get('category') not in RIASEC:
+            report.error(f"questions_pool.yaml question {number}: invalid category {question.get('category')!r}")
+
+
+def validate_jupas(jupas: Any, industries: set, report: Report):
+    """Check JUPAS programs; reference_payload drops the empty placeholder industries"""
+    if not isinstance(jupas, dict):
+        report.error("jupas.yaml: expected a mapping of industry to programs")
+        return
+    named = set()
+    for industry, programs in jupas.items():
+        name = str(industry).strip()
+        if not name or name.lower() == 'nan':
+            if programs:
+                report.error(f"jupas.yaml: {len(programs)} programs under an unnamed industry")
+            else:
+                report.warning(f"jupas.yaml: dropped empty industry {industry!r}")
+            continue
+        if name not in industries:
+            report.warning(f"jupas.yaml: industry {name!r} is not in the industry mapping")
+        for number, program in enumerate(programs or [], start=1):
+            where = f"jupas.yaml {name!r} program {number}"
+            if not program.get('course_name') or not program.get('jupas_code'):
+                report.error(f"{where}: missing course_name or jupas_code")
+                continue
+            median = program.get('median_score_index')
+            if median in (None, '/') or str(median).lower() == 'nan':
+                continue
+            score = parse_median(program)
+            if score is None:
+                report.warning(f"{where} ({program['jupas_code']}): median score {median!r} is not a "
+                               f"number and is left out of score matching")
+            elif not 1 <= score <= 7:
+                report.error(f"{where} ({program['jupas_code']}): median score {score} outside 1-7")
+        named.add(name)
+    for industry in sorted(industries - named):
+        report.warning(f"industry {industry!r} has no JUPAS programs")
+
+
+def build(base_dir: str = '.', xlsx_path: str = XLSX_PATH, write_yaml: bool = True,
+          strict: bool = False, snapshot_path: Optional[str] = None) -> Tuple[str, List[str]]:
+    """Validate the sources and write the snapshot; returns (snapshot path, warnings).
+
+    Raises DataError listing every problem if validation fails.
+    """
+    def path(filename: str) -> str:
+        return os.path.join(base_dir, filename)
+
+    report = Report()
+    with open(path(SOURCES['questions_pool']), 'r', encoding='utf-8') as file:
+        questions = (yaml.safe_load(file) or {}).get('questions')
+    with open(path(SOURCES['jupas']), 'r', encoding='utf-8') as file:
+        jupas = yaml.safe_load(file)
+
+    validate_questions(questions, report)
+    industry_mapping = industry_mapping_from_rows(read_xlsx_rows(path(xlsx_path)), report)
+    validate_jupas(jupas, {entry['industry'] for entry in industry_mapping}, report)
+
+    problems = report.errors + (report.warnings if strict else [])
+    if problems:
+        raise DataError(problems)
+
+    sources = {'industry_source': xlsx_path, **SOURCES}
+    if write_yaml:
+        # Replaced atomically so a running server watching the file never reads half of it
+        yaml_path = path(SOURCES['industry_mapping'])
+        with open(yaml_path + '.tmp', 'w', encoding='utf-8') as file:
+            yaml.dump(industry_mapping, file, default_flow_style=False, allow_unicode=True)
+        os.replace(yaml_path + '.tmp', yaml_path)
+    else:
+        # The YAML file is not in sync with the spreadsheet, so do not tie the snapshot to it
+        sources.pop('industry_mapping')
+
+    data = reference_payload(questions, industry_mapping, jupas)
+    return write_snapshot(data, sources, base_dir, snapshot_path), report.warnings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build validated reference data and indexes for the server")
+    parser.add_argument('--base-dir', default='.', help="directory holding the source files")
+    parser.add_argument('--xlsx', default=XLSX_PATH, help="industry to Holland code spreadsheet")
+    parser.add_argument('--out', default=None, help="snapshot path (default reference_data.snapshot)")
+    parser.add_argument('--no-yaml', action='store_true', help="do not rewrite industry_mapping.yaml")
+    parser.add_argument('--strict', action='store_true', help="treat warnings as errors")
+    args = parser.parse_args(argv)
+
+    try:
+        snapshot_path, warnings = build(args.base_dir, args.xlsx, write_yaml=not args.no_yaml,
+                                        strict=args.strict, snapshot_path=args.out)
+    except DataError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    for warning in warnings:
+        print(f"warning: {warning}", file=sys.stderr)
+    print(f"Wrote {snapshot_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Precompute career paths for every profile a finished survey can produce.
+
+Scoring always stores one ordered RIASEC triple (120 possibilities) and
+the industries the scorer matches to it, so the whole key space of the
+career path cache is known up front. The warmer walks it with bounded
+concurrency, skipping keys that already hold an unexpired result, so an
+interrupted run resumes where it stopped.
+
+    python cache_warmer.py [--concurrency N] [--limit N]
+
+The same job can run inside the server through /admin/warm_career_paths.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from itertools import permutations
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from scoring import SurveyScorer
+
+RIASEC = "RIASEC"
+
+
+def career_path_profiles(scorer: SurveyScorer) -> List[Tuple[str, List[str]]]:
+    """(Holland code, matching industries) for every code the scorer can store"""
+    return [(code, scorer.matching_industries(code))
+            for code in (''.join(p) for p in permutations(RIASEC, 3))]
+
+
+class CacheWarmer:
+    """Runs `generate(code, industries)` for every profile not yet cached.
+
+    `is_cached(code, industries)` is checked just before each job starts, so
+    results written meanwhile by live traffic or another warmer are not
+    generated twice. A failed job is counted and the run carries on.
+    """
+
+    def __init__(self, profiles: List[Tuple[str, List[str]]],
+                 generate: Callable[[str, List[str]], Awaitable[Any]],
+                 is_cached: Callable[[str, List[str]], Awaitable[bool]], concurrency: int = 4):
+        self.profiles = profiles
+        self.generate = generate
+        self.is_cached = is_cached
+        self.concurrency = max(1, concurrency)
+        self.generated = 0
+        self.skipped = 0
+        self.failed: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _warm_one(self, semaphore: asyncio.Semaphore, code: str, industries: List[str]):
+        async with semaphore:
+            if await self.is_cached(code, industries):
+                self.skipped += 1
+                return
+            try:
+                await self.generate(code, industries)
+                self.generated += 1
+            except Exception as e:
+                detail = getattr(e, 'detail', None) or str(e)
+                print(f"Error warming career paths for {code}: {detail}")
+                self.failed[code] = str(detail)
+
+    async def run(self) -> Dict[str, Any]:
+        self.started_at = time.time()
+        self.finished_at = None
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._warm_one(semaphore, code, industries)
+                               for code, industries in self.profiles))
+        self.finished_at = time.time()
+        return self.stats()
+
+    def start(self) -> asyncio.Task:
+        """Run in the background on the current event loop"""
+        self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None and self.finished_at is None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "total": len(self.profiles),
+            "generated": self.generated,
+            "skipped": self.skipped,
+            "failed": len(self.failed),
+            "failures": dict(list(self.failed.items())[:20]),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute career paths for every Holland code")
+    parser.add_argument('--concurrency', type=int, default=4, help="completions in flight at once")
+    parser.add_argument('--limit', type=int, default=None, help="only warm the first N profiles")
+    args = parser.parse_args(argv)
+
+    # The server module holds the prompt, the cache and the OpenAI client
+    import main as server
+
+    warmer = server.career_paths_warmer(args.concurrency)
+    if args.limit is not None:
+        warmer.profiles = warmer.profiles[:args.limit]
+
+    async def run():
+        try:
+            return await warmer.run()
+        finally:
+            await server.LLM.close()
+
+    stats = asyncio.run(run())
+    server.CAREER_PATHS_CACHE.close()
+    print(f"{stats['generated']} generated, {stats['skipped']} already cached, "
+          f"{stats['failed']} failed of {stats['total']}")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
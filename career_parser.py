@@ -0,0 +1,89 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SEPARATOR = '//'
+
+# (label in the completion, key in the parsed dict), checked in this order
+CAREER_PATH_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("Job Title:", 'title'),
+    ("Description:", 'description'),
+    ("Required Skills:", 'required_skills'),
+    ("Education:", 'education'),
+    ("Career Progression:", 'progression'),
+)
+
+EMERGING_CAREER_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("Job Title:", 'title'),
+    ("Description:", 'description'),
+    ("Required Skills:", 'required_skills'),
+    ("Education:", 'education'),
+    ("Growth Potential:", 'growth_potential'),
+)
+
+
+def parse_block(block: str, fields: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """Parse one `//`-separated block into a dict of the labelled fields"""
+    path_dict = {}
+    for line in block.strip().split('\n'):
+        if not line.strip():
+            continue
+        for label, key in fields:
+            if label in line:
+                path_dict[key] = line.replace(label, "").strip()
+                break
+    return path_dict
+
+
+class CareerStreamParser:
+    """Incremental parser for `//`-separated career listings.
+
+    Feed it text as it streams from the model; each call returns the
+    careers whose closing separator has arrived, so the first card can be
+    shown long before the completion ends. `finish` parses whatever is
+    left after the last separator.
+    """
+
+    def __init__(self, fields: Iterable[Tuple[str, str]] = CAREER_PATH_FIELDS):
+        self.fields = tuple(fields)
+        self._buffer = ''
+        self._scanned = 0  # Buffer prefix already known to hold no separator
+        self.parsed: List[Dict[str, str]] = []
+
+    def _emit(self, block: str) -> Optional[Dict[str, str]]:
+        if not block.strip():
+            return None
+        path_dict = parse_block(block, self.fields)
+        if not path_dict:
+            return None
+        self.parsed.append(path_dict)
+        return path_dict
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Add streamed text and return the careers completed by it"""
+        self._buffer += text
+        completed = []
+        while True:
+            index = self._buffer.find(SEPARATOR, self._scanned)
+            if index < 0:
+                # A trailing '/' may be the first half of the next separator
+                self._scanned = max(0, len(self._buffer) - len(SEPARATOR) + 1)
+                return completed
+            block = self._buffer[:index]
+            self._buffer = self._buffer[index + len(SEPARATOR):]
+            self._scanned = 0
+            path_dict = self._emit(block)
+            if path_dict is not None:
+                completed.append(path_dict)
+
+    def finish(self) -> List[Dict[str, str]]:
+        """Parse the text after the last separator and return any career in it"""
+        block, self._buffer, self._scanned = self._buffer, '', 0
+        path_dict = self._emit(block)
+        return [path_dict] if path_dict is not None else []
+
+
+def parse_careers(content: str, fields: Iterable[Tuple[str, str]] = CAREER_PATH_FIELDS) -> List[Dict[str, str]]:
+    """Parse a complete, non-streamed completion"""
+    parser = CareerStreamParser(fields)
+    parser.feed(content)
+    parser.finish()
+    return parser.parsed
@@ -0,0 +1,247 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from storage import ChatSessionStore
+
+Turn = Dict[str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough GPT token count: about four ASCII characters per token, one per CJK character"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def session_bytes(session: Dict[str, Any]) -> int:
+    """UTF-8 bytes of the summary and turns held by a conversation"""
+    size = len(session.get('summary', '').encode('utf-8'))
+    return size + sum(len(turn['content'].encode('utf-8')) for turn in session.get('turns', []))
+
+
+class MemoryChatSessionStore(ChatSessionStore):
+    """Process-local chat conversations with idle expiry and an LRU size cap.
+
+    Conversations idle for longer than `ttl` seconds are dropped on access
+    and by a periodic sweep; once `max_entries` are live, saving a new one
+    evicts the least recently used.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 2 * 3600, sweep_interval: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl:
+                del self._sessions[session_id]
+                self.expirations += 1
+                return None
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return entry[1]
+
+    def save(self, session_id: str, session: Dict[str, Any]):
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), session)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """Drop every idle conversation; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            # Conversations are in access order, so expired ones are at the front
+            removed = 0
+            while self._sessions:
+                session_id, (last_seen, _) = next(iter(self._sessions.items()))
+                if now - last_seen <= self.ttl:
+                    break
+                del self._sessions[session_id]
+                removed += 1
+            self.expirations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "live_sessions": len(self._sessions),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "bytes_estimate": sum(session_bytes(s) for _, s in self._sessions.values()),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def start_background_tasks(self):
+        """Sweep idle conversations periodically from a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.sweep_interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping chat sessions: {str(e)}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=run, name="chat-session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+
+class ChatMemory:
+    """Turn history of chat conversations, kept under a token budget.
+
+    Each conversation holds the student's profile, a rolling summary of
+    older turns and the recent turns verbatim. Once the summary and turns
+    together pass `token_budget` tokens, `compact` folds all but the last
+    `keep_turns` exchanges into the summary with the given summarize
+    function. Until a compaction lands, `prompt` sends only the newest
+    exchanges that fit the budget (the last one always), so prompts stay
+    bounded either way. A conversation holding more than `max_bytes` of
+    text drops its oldest turns unsummarized.
+    """
+
+    def __init__(self, store: ChatSessionStore, token_budget: int = 3000, keep_turns: int = 3,
+                 max_bytes: int = 64 * 1024):
+        self.store = store
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.max_bytes = max_bytes
+        self.compactions = 0
+        self.compaction_errors = 0
+        self.dropped_turns = 0
+
+    def new(self, user_name: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """A conversation that is not stored until passed to `save`"""
+        return {
+            "session_id": uuid.uuid4().hex,
+            "user_name": user_name,
+            "profile": profile,
+            "summary": "",
+            "turns": [],
+            "summarized_turns": 0,
+            "created_at": time.time(),
+        }
+
+    def save(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        self.store.save(session["session_id"], session)
+        return session
+
+    def create(self, user_name: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+        return self.save(self.new(user_name, profile))
+
+    def get(self, session_id: str, user_name: str) -> Optional[Dict[str, Any]]:
+        """The conversation, if it exists, has not expired and belongs to user_name"""
+        session = self.store.get(session_id)
+        if session is None or session.get('user_name') != user_name:
+            return None
+        return session
+
+    def history_tokens(self, session: Dict[str, Any]) -> int:
+        return estimate_tokens(session['summary']) + sum(estimate_tokens(t['content']) for t in session['turns'])
+
+    def prompt(self, session: Dict[str, Any], system_prompt: str, message: str) -> List[Turn]:
+        """Chat messages for the next reply: system prompt, summary, recent turns and the new message"""
+        messages = [{"role": "system", "content": system_prompt}]
+        budget = self.token_budget
+        if session['summary']:
+            messages.append({"role": "system", "content": f"之前對話的摘要：\n{session['summary']}"})
+            budget -= estimate_tokens(session['summary'])
+        # Whole exchanges, newest first; the last one is always sent
+        turns = session['turns']
+        start = len(turns)
+        while start >= 2:
+            budget -= sum(estimate_tokens(turn['content']) for turn in turns[start - 2:start])
+            if budget < 0 and start < len(turns):
+                break
+            start -= 2
+        messages.extend(turns[start:])
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    def append(self, session_id: str, message: str, reply: str) -> Optional[Dict[str, Any]]:
+        """Record one exchange; returns the updated conversation, or None if it has expired"""
+        session = self.store.get(session_id)
+        if session is None:
+            return None
+        session['turns'].extend([
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": reply},
+        ])
+        while session_bytes(session) > self.max_bytes and len(session['turns']) > 2:
+            del session['turns'][:2]
+            session['summarized_turns'] += 2
+            self.dropped_turns += 2
+        self.store.save(session_id, session)
+        return session
+
+    def needs_compaction(self, session: Dict[str, Any]) -> bool:
+        return (self.history_tokens(session) > self.token_budget
+                and len(session['turns']) > 2 * self.keep_turns)
+
+    async def compact(self, session_id: str,
+                      summarize: Callable[[str, List[Turn]], Awaitable[str]]) -> bool:
+        """Fold older turns into the summary; returns whether the conversation changed.
+
+        Turns added while the summary is being written are kept, and the
+        result is discarded if another compaction got there first.
+        """
+        session = self.store.get(session_id)
+        if session is None or not self.needs_compaction(session):
+            return False
+        start = session['summarized_turns']
+        folded = session['turns'][:len(session['turns']) - 2 * self.keep_turns]
+        try:
+            summary = await summarize(session['summary'], folded)
+        except Exception as e:
+            print(f"Error summarizing chat session {session_id}: {str(e)}")
+            self.compaction_errors += 1
+            return False
+
+        session = self.store.get(session_id)
+        if session is None or session['summarized_turns'] != start:
+            return False
+        session['summary'] = summary.strip()
+        del session['turns'][:len(folded)]
+        session['summarized_turns'] += len(folded)
+        self.store.save(session_id, session)
+        self.compactions += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.store.stats() if hasattr(self.store, 'stats') else {}
+        return {
+            **stats,
+            "token_budget": self.token_budget,
+            "compactions": self.compactions,
+            "compaction_errors": self.compaction_errors,
+            "dropped_turns": self.dropped_turns,
+        }
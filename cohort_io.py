@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+CSV_COLUMNS = ["user_name", "timestamp", "holland_codes", "matching_industries", "dse_scores", "answers"]
+
+# List-valued columns are written as JSON inside the CSV cell
+JSON_COLUMNS = {"matching_industries", "dse_scores", "answers"}
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def export_jsonl(items: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[str]:
+    """One JSON object per stored survey"""
+    for user_name, user_data in items:
+        yield json.dumps({"user_name": user_name, **user_data}, ensure_ascii=False) + '\n'
+
+
+def export_csv(items: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[str]:
+    """A header row, then one CSV row per stored survey"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return text
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for user_name, user_data in items:
+        row = {"user_name": user_name, **user_data}
+        writer.writerow([
+            json.dumps(row.get(column, []), ensure_ascii=False) if column in JSON_COLUMNS
+            else row.get(column, '')
+            for column in CSV_COLUMNS
+        ])
+        yield flush()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed request body into text lines without buffering it all"""
+    pending = b''
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8-sig').rstrip('\r')
+    if pending:
+        yield pending.decode('utf-8-sig').rstrip('\r')
+
+
+async def parse_rows(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line_number, row dict or error message) for each non-empty line.
+
+    CSV input needs a header row; quoted cells may not span lines. An
+    invalid header raises ValueError before any row is yielded.
+    """
+    header: List[str] = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        if fmt != 'jsonl' and not header:
+            try:
+                cells = next(csv.reader([line]))
+            except csv.Error as e:
+                raise ValueError(f"Invalid CSV header: {str(e)}")
+            if "user_name" not in cells:
+                raise ValueError("CSV header must include user_name")
+            header = cells
+            continue
+        try:
+            if fmt == 'jsonl':
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object")
+            else:
+                cells = next(csv.reader([line]))
+                row = dict(zip(header, cells))
+                for column in JSON_COLUMNS & row.keys():
+                    row[column] = json.loads(row[column]) if row[column] else []
+        except (ValueError, csv.Error) as e:
+            yield line_number, f"Invalid row: {str(e)}"
+            continue
+        yield line_number, row
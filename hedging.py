@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class DeadlineExceeded(Exception):
+    """No attempt finished successfully before the budget's deadline"""
+
+
+class LatencyBudget:
+    """Deadline and hedging for one endpoint's upstream calls.
+
+    `run(fn)` starts `fn()` and, if it has not answered once the
+    `hedge_percentile` of the last `window` successful calls has passed,
+    starts a second, hedged attempt; whichever answers first wins and the
+    other is cancelled. An attempt that fails before the hedge delay is
+    hedged at once. Until `min_samples` calls have been seen `hedge_after`
+    is used as the delay, a quarter of the deadline unless given, so a cold
+    process hedges too. Hedges are capped at `max_hedge_ratio` of calls
+    so a slow upstream does not get twice the load. When neither attempt
+    has answered by `deadline` seconds, both are cancelled and
+    DeadlineExceeded is raised for the caller to fall back on.
+    Latencies are kept per process.
+    """
+
+    def __init__(self, name: str, deadline: float, hedge_percentile: float = 0.95,
+                 hedge_after: Optional[float] = None, min_samples: int = 20, window: int = 200,
+                 max_hedge_ratio: float = 0.1):
+        self.name = name
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after if hedge_after is not None else deadline / 4
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self._latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.failed = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None to not hedge"""
+        if self.hedge_percentile <= 0 or self.hedge_percentile >= 1:
+            return None
+        if len(self._latencies) < self.min_samples:
+            return self.hedge_after
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(self.hedge_percentile * len(latencies)))]
+
+    def _may_hedge(self) -> bool:
+        return self.hedged < self.max_hedge_ratio * self.calls
+
+    async def run(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.deadline
+        hedge_at = None
+        delay = self.hedge_delay()
+        if delay is not None:
+            hedge_at = start + min(delay, self.deadline)
+        self.calls += 1
+
+        attempts: Dict[asyncio.Future, float] = {asyncio.ensure_future(fn()): start}
+        hedge: Optional[asyncio.Future] = None
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                now = loop.time()
+                if now >= deadline:
+                    self.deadline_exceeded += 1
+                    raise DeadlineExceeded(f"{self.name} had no answer after {self.deadline:g}s")
+                if hedge is None and (not attempts or (hedge_at is not None and now >= hedge_at)):
+                    if not self._may_hedge():
+                        if not attempts:
+                            break
+                        hedge_at = None
+                        continue
+                    hedge = asyncio.ensure_future(fn())
+                    attempts[hedge] = now
+                    self.hedged += 1
+                    continue
+                if not attempts:
+                    break
+
+                wake = deadline if hedge is not None or hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(list(attempts), timeout=max(0.0, wake - now),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    started = attempts.pop(task)
+                    if task.exception() is None:
+                        self._latencies.append(loop.time() - started)
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in attempts:
+                task.cancel()
+        self.failed += 1
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "deadline": self.deadline,
+            "hedge_delay": self.hedge_delay(),
+            "samples": len(self._latencies),
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "failed": self.failed,
+        }
@@ -0,0 +1,200 @@
+import math
+from bisect import bisect_left, bisect_right
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+class IndustryIndex:
+    """Immutable inverted index from Holland codes to industries.
+
+    Built once from INDUSTRY_MAPPING so matching is a few dict lookups and
+    set unions, independent of how many industries or code permutations
+    there are. Three keys are indexed: the full three-letter code, the
+    code's letters in any order, and each code's leading letter pair.
+    """
+
+    __slots__ = ('_by_code', '_by_letters', '_by_pair', '_rank')
+
+    def __init__(self, by_code: Mapping[str, FrozenSet[str]], by_letters: Mapping[str, FrozenSet[str]],
+                 by_pair: Mapping[str, FrozenSet[str]], rank: Mapping[str, int]):
+        self._by_code = MappingProxyType(dict(by_code))
+        self._by_letters = MappingProxyType(dict(by_letters))
+        self._by_pair = MappingProxyType(dict(by_pair))
+        self._rank = MappingProxyType(dict(rank))
+
+    @classmethod
+    def from_mapping(cls, mapping: Iterable[Dict[str, Any]]) -> "IndustryIndex":
+        by_code: Dict[str, set] = {}
+        by_letters: Dict[str, set] = {}
+        by_pair: Dict[str, set] = {}
+        rank: Dict[str, int] = {}
+        for entry in mapping or []:
+            if 'holland_codes' not in entry or 'industry' not in entry:
+                continue
+            industry = entry['industry']
+            rank.setdefault(industry, len(rank))
+            for code in entry['holland_codes']:
+                code = str(code).upper()
+                by_code.setdefault(code, set()).add(industry)
+                by_pair.setdefault(code[:2], set()).add(industry)
+                by_letters.setdefault(''.join(sorted(code)), set()).add(industry)
+
+        def freeze(index):
+            return {key: frozenset(values) for key, values in index.items()}
+
+        return cls(freeze(by_code), freeze(by_letters), freeze(by_pair), rank)
+
+    def __reduce__(self):
+        # Mapping proxies cannot be pickled; rebuild them from plain dicts
+        return (IndustryIndex, (dict(self._by_code), dict(self._by_letters),
+                                dict(self._by_pair), dict(self._rank)))
+
+    def for_code(self, code: str) -> FrozenSet[str]:
+        """Industries listing this exact code"""
+        return self._by_code.get(code.upper(), EMPTY)
+
+    def for_codes(self, codes: Iterable[str]) -> FrozenSet[str]:
+        """Industries listing any of the exact codes"""
+        return EMPTY.union(*(self.for_code(code) for code in codes))
+
+    def for_pair(self, pair: str) -> FrozenSet[str]:
+        """Industries with at least one code starting with the two letters"""
+        return self._by_pair.get(pair.upper(), EMPTY)
+
+    def for_letters(self, code: str) -> FrozenSet[str]:
+        """Industries with a code made of the same letters in any order"""
+        return self._by_letters.get(''.join(sorted(code.upper())), EMPTY)
+
+    def closest(self, code: str) -> List[str]:
+        """Industries for the exact code, else its leading pair, else its letters in any order.
+
+        The first of the three lookups that finds anything wins, in mapping
+        file order; empty when none does.
+        """
+        for industries in (self.for_code(code), self.for_pair(code[:2]), self.for_letters(code)):
+            if industries:
+                return self.ordered(industries)
+        return []
+
+    def ordered(self, industries: Iterable[str]) -> List[str]:
+        """Industries in the order they appear in the mapping file"""
+        return sorted(industries, key=lambda industry: self._rank.get(industry, len(self._rank)))
+
+    def __len__(self) -> int:
+        return len(self._rank)
+
+
+def parse_median(program: Dict[str, Any]) -> Optional[float]:
+    """A program's median score index as a float, or None for '/', 'nan' and missing values"""
+    median = program.get('median_score_index')
+    if median is None or median == '/':
+        return None
+    try:
+        score = float(median)
+    except (ValueError, TypeError):
+        return None
+    # 'nan' is the spreadsheet export's empty cell; it never matches a score
+    return None if math.isnan(score) else score
+
+
+class ProgramList:
+    """One industry's programs with parseable medians, sorted by median score"""
+
+    __slots__ = ('medians', 'programs', 'order')
+
+    def __init__(self, programs: Iterable[Dict[str, Any]]):
+        entries = []
+        for position, program in enumerate(programs or []):
+            median = parse_median(program)
+            if median is not None:
+                entries.append((median, position, program))
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        self.medians: Tuple[float, ...] = tuple(entry[0] for entry in entries)
+        self.order: Tuple[int, ...] = tuple(entry[1] for entry in entries)
+        self.programs: Tuple[Dict[str, Any], ...] = tuple(entry[2] for entry in entries)
+
+    def __len__(self) -> int:
+        return len(self.medians)
+
+    def nearest(self, target: float, k: int = 1) -> List[Tuple[float, Dict[str, Any]]]:
+        """The k programs closest to target as (difference, program), closest first.
+
+        Ties go to the program listed first in jupas.yaml.
+        """
+        medians = self.medians
+        position = bisect_left(medians, target)
+        # The k nearest lie within k places of the insertion point; widen
+        # to whole runs of equal medians so ties can be broken by file order
+        start = max(0, position - k)
+        while start > 0 and medians[start - 1] == medians[start]:
+            start -= 1
+        end = min(len(medians), position + k)
+        while end < len(medians) and medians[end] == medians[end - 1]:
+            end += 1
+        candidates = sorted(range(start, end), key=lambda i: (abs(medians[i] - target), self.order[i]))
+        return [(abs(medians[i] - target), self.programs[i]) for i in candidates[:k]]
+
+    def in_range(self, low: float, high: float) -> List[Dict[str, Any]]:
+        """Programs with low <= median <= high, lowest median first"""
+        start = bisect_left(self.medians, low)
+        end = bisect_right(self.medians, high)
+        return list(self.programs[start:end])
+
+    def bands(self, target: float, margin: float = 0.3, span: float = 1.0) -> Dict[str, List[Dict[str, Any]]]:
+        """Split programs around target into reach, match and safety bands.
+
+        match: median within `margin` of target; reach: up to `span` above
+        the match band; safety: up to `span` below it. Each band is sorted
+        by median, lowest first.
+        """
+        medians = self.medians
+        match_low = bisect_left(medians, target - margin)
+        match_high = bisect_right(medians, target + margin)
+        return {
+            "reach": list(self.programs[match_high:bisect_right(medians, target + margin + span)]),
+            "match": list(self.programs[match_low:match_high]),
+            "safety": list(self.programs[bisect_left(medians, target - margin - span):match_low]),
+        }
+
+
+class JupasIndex:
+    """Immutable per-industry index of JUPAS programs sorted by median score.
+
+    Medians are parsed once at load time and '/' sentinels dropped, so
+    nearest-program, band and range queries are binary searches.
+    """
+
+    __slots__ = ('_industries',)
+
+    def __init__(self, industries: Mapping[str, ProgramList]):
+        self._industries = MappingProxyType(dict(industries))
+
+    @classmethod
+    def from_data(cls, jupas_data: Mapping[str, Iterable[Dict[str, Any]]]) -> "JupasIndex":
+        return cls({industry: ProgramList(programs) for industry, programs in (jupas_data or {}).items()})
+
+    def __reduce__(self):
+        return (JupasIndex, (dict(self._industries),))
+
+    def __contains__(self, industry: str) -> bool:
+        return industry in self._industries
+
+    def programs(self, industry: str) -> Optional[ProgramList]:
+        return self._industries.get(industry)
+
+    def nearest(self, industry: str, target: float, k: int = 1) -> List[Tuple[float, Dict[str, Any]]]:
+        programs = self._industries.get(industry)
+        return programs.nearest(target, k) if programs else []
+
+    def in_range(self, industry: str, low: float, high: float) -> List[Dict[str, Any]]:
+        programs = self._industries.get(industry)
+        return programs.in_range(low, high) if programs else []
+
+    def bands(self, industry: str, target: float, margin: float = 0.3,
+              span: float = 1.0) -> Dict[str, List[Dict[str, Any]]]:
+        programs = self._industries.get(industry)
+        if not programs:
+            return {"reach": [], "match": [], "safety": []}
+        return programs.bands(target, margin, span)
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+
+def _parse_model_limits(value: str) -> Dict[str, int]:
+    """Parse "gpt-4=4,gpt-4o=8" into {"gpt-4": 4, "gpt-4o": 8}"""
+    limits = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        model, limit = item.split('=', 1)
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+class LLMGateway:
+    """Shared non-blocking access to the OpenAI chat API.
+
+    One AsyncOpenAI client (and so one pooled HTTP connection set) serves
+    every endpoint. Calls to each model are bounded by their own semaphore
+    so a burst of slow GPT-4 requests cannot use up every connection, and
+    each call has a timeout covering the wait for a slot as well as the
+    request itself.
+
+    Functions in `usage_hooks` are called with (model, usage) for every
+    completion that reports token usage, streamed ones included.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, default_concurrency: int = 8,
+                 model_concurrency: Optional[Dict[str, int]] = None,
+                 timeout: float = 120.0, max_connections: int = 64):
+        self.default_concurrency = default_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.timeout = timeout
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=10.0),
+        )
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self._http_client, max_retries=1)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.usage_hooks: List[Callable[[str, Any], None]] = []
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        """Configure from OPENAI_API_KEY and the ONTRACK_LLM_* variables"""
+        return cls(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            default_concurrency=int(os.getenv('ONTRACK_LLM_CONCURRENCY', '8')),
+            model_concurrency=_parse_model_limits(os.getenv('ONTRACK_LLM_MODEL_CONCURRENCY', '')),
+            timeout=float(os.getenv('ONTRACK_LLM_TIMEOUT', '120')),
+            max_connections=int(os.getenv('ONTRACK_LLM_MAX_CONNECTIONS', '64')),
+        )
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            limit = self.model_concurrency.get(model, self.default_concurrency)
+            self._semaphores[model] = asyncio.Semaphore(limit)
+        return self._semaphores[model]
+
+    def _report_usage(self, model: str, usage: Any):
+        if usage is None:
+            return
+        for hook in self.usage_hooks:
+            try:
+                hook(model, usage)
+            except Exception as e:
+                print(f"Error in LLM usage hook: {str(e)}")
+
+    async def _create(self, semaphore: asyncio.Semaphore, **kwargs) -> Any:
+        async with semaphore:
+            return await self.client.chat.completions.create(**kwargs)
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                   temperature: float = 0.7, timeout: Optional[float] = None) -> Any:
+        """Run one chat completion and return the API response"""
+        response = await asyncio.wait_for(
+            self._create(self._semaphore(model), model=model, messages=messages,
+                         max_tokens=max_tokens, temperature=temperature),
+            timeout=timeout or self.timeout,
+        )
+        self._report_usage(model, getattr(response, 'usage', None))
+        return response
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Run one chat completion and return the text of the first choice"""
+        response = await self.chat(model, messages, max_tokens, temperature, timeout)
+        if not response.choices:
+            raise RuntimeError("No response generated")
+        return response.choices[0].message.content
+
+    async def stream(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                     temperature: float = 0.7, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield text deltas of one chat completion as the model produces them.
+
+        The model's slot is held until the stream ends; `timeout` bounds the
+        wait for the slot and the gap between two chunks.
+        """
+        timeout = timeout or self.timeout
+        semaphore = self._semaphore(model)
+        await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+        try:
+            stream = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=model, messages=messages, max_tokens=max_tokens,
+                    temperature=temperature, stream=True,
+                    # Ask for a final chunk carrying token usage
+                    extra_body={"stream_options": {"include_usage": True}}),
+                timeout=timeout,
+            )
+            chunks = stream.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    self._report_usage(model, getattr(chunk, 'usage', None))
+            finally:
+                await stream.close()
+        finally:
+            semaphore.release()
+
+    async def close(self):
+        await self.client.close()
@@ -1,16 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Union, Optional, Any
-import yaml
-import random
 from fastapi.middleware.cors import CORSMiddleware
-from itertools import permutations
-from openai import OpenAI
 import os
 import json
+import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
-import numpy as np
+from storage import (create_chat_session_store, create_response_store, create_session_store,
+                     primary_holland_code)
+from chat_sessions import ChatMemory
+from reference_set import ReferenceSet, ReloadableReference
+from llm_gateway import LLMGateway
+from result_cache import ResultCache
+from singleflight import SingleFlight
+from hedging import LatencyBudget
+from cache_warmer import CacheWarmer, career_path_profiles
+from metrics import MetricsMiddleware, Registry, instrument_gateway, instrument_methods
+from trace_log import (TraceLog, TraceMiddleware, annotate, trace_cache, trace_flights, trace_gateway,
+                       trace_methods)
+from streaming import sse_event, sse_response
+from sampler import QuestionSampler
+from scoring import all_holland_codes, page_category_counts
+from cohort_io import FORMATS as COHORT_FORMATS, export_csv, export_jsonl, iter_lines, parse_rows
+from career_parser import (CAREER_PATH_FIELDS, EMERGING_CAREER_FIELDS, CareerStreamParser,
+                           parse_careers)
 
 load_dotenv()
 app = FastAPI()
@@ -24,7 +39,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Shared async OpenAI access with per-model concurrency limits
+LLM = LLMGateway.from_env()
+
+# Bump when the career path prompt or parsing changes so stale results are not served
+CAREER_PATHS_PROMPT_VERSION = 1
+
+# Generated career paths depend only on the Holland code and industries
+CAREER_PATHS_CACHE = ResultCache(
+    os.getenv('ONTRACK_CAREER_CACHE_PATH', 'career_paths_cache.db'),
+    max_entries=int(os.getenv('ONTRACK_CAREER_CACHE_SIZE', '256')),
+    max_disk_entries=int(os.getenv('ONTRACK_CAREER_CACHE_DISK_SIZE', '10000')),
+    ttl=float(os.getenv('ONTRACK_CAREER_CACHE_TTL', str(30 * 24 * 3600))),
+)
+
+# In-flight career path completions, shared by concurrent identical requests
+CAREER_PATHS_FLIGHTS = SingleFlight()
+
+# Latency budgets of the LLM-backed endpoints that answer from local data
+# when the model is too slow or fails: a hedged second call goes out once a
+# call outlasts ONTRACK_HEDGE_PERCENTILE of recent ones (ONTRACK_HEDGE_AFTER
+# seconds, or a quarter of the deadline, until there are enough of them), and
+# the endpoint falls back after its deadline (seconds)
+def latency_budget(name: str, deadline: str) -> LatencyBudget:
+    hedge_after = os.getenv('ONTRACK_HEDGE_AFTER')
+    return LatencyBudget(
+        name,
+        deadline=float(deadline),
+        hedge_percentile=float(os.getenv('ONTRACK_HEDGE_PERCENTILE', '0.95')),
+        hedge_after=float(hedge_after) if hedge_after else None,
+        max_hedge_ratio=float(os.getenv('ONTRACK_HEDGE_RATIO', '0.1')),
+    )
+
+LLM_BUDGETS = {
+    "get_personality_analysis": latency_budget(
+        "get_personality_analysis", os.getenv('ONTRACK_PERSONALITY_DEADLINE', '60')),
+    "get_emerging_careers": latency_budget(
+        "get_emerging_careers", os.getenv('ONTRACK_EMERGING_CAREERS_DEADLINE', '120')),
+}
 
 class SurveyPageResponse(BaseModel):
     user_name: str
@@ -36,48 +88,153 @@ class SurveyResponse(BaseModel):
     answers: List[Union[str, int, float]]  # All answers including name, DSE scores, and yes/no
     dse_scores: List[Union[int, float]]    # Just the DSE scores
 
+class SurveyBatch(BaseModel):
+    responses: List[SurveyResponse]  # One finished survey per student
+
 class ChatMessage(BaseModel):
     message: str
     preset_question: Optional[int] = None
-
-
-
-# Load question pools and industry mapping from YAML files
-try:
-    with open('questions_pool.yaml', 'r', encoding='utf-8') as file:
-        QUESTIONS_POOL = yaml.safe_load(file)["questions"]
-    with open('industry_mapping.yaml', 'r', encoding='utf-8') as file:
-        INDUSTRY_MAPPING = yaml.safe_load(file)
-    with open('jupas.yaml', 'r', encoding='utf-8') as file:
-        JUPAS_DATA = yaml.safe_load(file)
-except Exception as e:
-    print(f"Error loading YAML files: {e}")
-    QUESTIONS_POOL = []
-    INDUSTRY_MAPPING = {}
-    JUPAS_DATA = {}
-
-# Store user responses temporarily (in production, use a database)
-USER_RESPONSES = {}
-
-def generate_code(max_categories, second_max_categories, third_max_categories):
-    """Generate OnTrack code"""
-    if len(max_categories) == 2:
-        permutations_result = [''.join(p) + second_max_categories[0] for p in permutations(max_categories, 2)]
-        return " / ".join(permutations_result)
-    elif len(max_categories) >= 3:
-        permutations_result = [''.join(p) for p in permutations(max_categories, 3)]
-        return " / ".join(permutations_result)
-    elif len(max_categories) == 1:
-        if len(second_max_categories) >= 2:
-            permutations_result = [max_categories[0] + ''.join(p) for p in permutations(second_max_categories[0:], 2)]
-            return " / ".join(permutations_result)
-        elif len(second_max_categories) == 1 and len(third_max_categories) >= 2:
-            permutations_result = [max_categories[0] + second_max_categories[0] + ''.join(p) for p in permutations(third_max_categories, 1)]
-            return " / ".join(permutations_result)
-        else:
-            return max_categories[0] + second_max_categories[0] + third_max_categories[0]
-    else:
-        return max_categories[0] + second_max_categories[0] + third_max_categories[0]
+    session_id: Optional[str] = None  # Continue this conversation; omitted starts a new one
+
+
+
+# Question pool, industry mapping, JUPAS programs, their lookup indexes and
+# the Holland code scorer, loaded from the compiled snapshot when it matches
+# its inputs and from the YAML files otherwise. REFERENCE.current is swapped
+# whole on reload; a request reads it once and uses that set throughout.
+REFERENCE = ReloadableReference(watch_interval=float(os.getenv('ONTRACK_REFERENCE_WATCH_INTERVAL', '0')))
+
+# Required in the X-Admin-Token header of admin endpoints when set
+ADMIN_TOKEN = os.getenv('ONTRACK_ADMIN_TOKEN')
+
+# In-progress survey sessions and finished surveys; the backend is chosen
+# with ONTRACK_STORAGE (log or sqlite)
+SESSION_STORE = create_session_store()
+RESPONSE_STORE = create_response_store()
+
+# Chat conversations on the same backend as survey sessions. Older turns are
+# folded into a rolling summary once a conversation passes
+# ONTRACK_CHAT_TOKEN_BUDGET tokens, keeping ONTRACK_CHAT_KEEP_TURNS recent
+# exchanges verbatim; summaries are written in the background, one at a
+# time per conversation
+CHAT_SESSION_STORE = create_chat_session_store()
+CHAT_MEMORY = ChatMemory(
+    CHAT_SESSION_STORE,
+    token_budget=int(os.getenv('ONTRACK_CHAT_TOKEN_BUDGET', '3000')),
+    keep_turns=int(os.getenv('ONTRACK_CHAT_KEEP_TURNS', '3')),
+    max_bytes=int(os.getenv('ONTRACK_CHAT_SESSION_MAX_BYTES', str(64 * 1024))),
+)
+CHAT_SUMMARY_MODEL = os.getenv('ONTRACK_CHAT_SUMMARY_MODEL', 'gpt-4o')
+CHAT_COMPACTIONS = SingleFlight()
+CHAT_COMPACTION_TASKS = set()
+
+# Prometheus metrics for /metrics. Requests are timed by middleware and the
+# stores and LLM gateway by wrappers, so the handlers themselves stay as they are
+METRICS = Registry()
+REQUEST_LATENCY = METRICS.histogram(
+    "ontrack_http_request_duration_seconds", "HTTP request latency to the end of the response",
+    ["method", "route", "status"])
+STORE_LATENCY = METRICS.histogram(
+    "ontrack_store_operation_duration_seconds", "Time spent in response and session store calls",
+    ["store", "operation"])
+LLM_LATENCY = METRICS.histogram(
+    "ontrack_llm_request_duration_seconds", "LLM call latency, to the end of the stream for streamed calls",
+    ["model", "call"])
+LLM_FIRST_TOKEN = METRICS.histogram(
+    "ontrack_llm_time_to_first_token_seconds", "Time from starting a streamed LLM call to its first text",
+    ["model"])
+LLM_TOKENS = METRICS.counter(
+    "ontrack_llm_tokens_total", "Tokens used by LLM calls", ["route", "model", "kind"])
+
+app.add_middleware(MetricsMiddleware, histogram=REQUEST_LATENCY)
+instrument_methods(RESPONSE_STORE, ("get", "put", "put_many", "find_by_holland_code"), STORE_LATENCY,
+                   store="responses")
+instrument_methods(SESSION_STORE, ("get", "save", "delete"), STORE_LATENCY, store="sessions")
+instrument_methods(CHAT_SESSION_STORE, ("get", "save", "delete"), STORE_LATENCY, store="chat_sessions")
+instrument_gateway(LLM, LLM_LATENCY, LLM_FIRST_TOKEN, LLM_TOKENS)
+
+# Per-request trace records (route, user, stage timings, LLM model and
+# tokens, cache outcome) appended to JSON Lines by a background thread.
+# An empty ONTRACK_TRACE_PATH turns tracing off.
+TRACE_PATH = os.getenv('ONTRACK_TRACE_PATH', 'request_traces.jsonl')
+TRACE_LOG = TraceLog(
+    TRACE_PATH,
+    max_bytes=int(os.getenv('ONTRACK_TRACE_MAX_BYTES', str(50 * 1024 * 1024))),
+    backups=int(os.getenv('ONTRACK_TRACE_BACKUPS', '5')),
+    max_queue=int(os.getenv('ONTRACK_TRACE_QUEUE', '10000')),
+) if TRACE_PATH else None
+
+if TRACE_LOG is not None:
+    app.add_middleware(TraceMiddleware, log=TRACE_LOG)
+    trace_methods(RESPONSE_STORE, ("get", "put", "put_many", "find_by_holland_code"), "response_store")
+    trace_methods(SESSION_STORE, ("get", "save", "delete"), "session_store")
+    trace_methods(CHAT_SESSION_STORE, ("get", "save", "delete"), "chat_session_store")
+    trace_gateway(LLM)
+    trace_cache(CAREER_PATHS_CACHE, "career_paths")
+    trace_flights(CAREER_PATHS_FLIGHTS, "career_paths")
+
+@METRICS.collector
+def cache_metrics():
+    """Cache and session counters already kept by each component's stats()"""
+    caches = {"career_paths": CAREER_PATHS_CACHE.stats()}
+    if hasattr(RESPONSE_STORE, 'stats'):
+        caches["responses"] = RESPONSE_STORE.stats()
+    for cache, stats in caches.items():
+        labels = {"cache": cache}
+        yield "ontrack_cache_hit_ratio", "Share of cache lookups served from the cache", labels, stats["hit_rate"]
+        yield "ontrack_cache_hits_total", "Cache lookups served from memory", labels, stats["hits"]
+        yield "ontrack_cache_disk_hits_total", "Cache lookups served from disk", labels, stats.get("disk_hits")
+        yield "ontrack_cache_misses_total", "Cache lookups that missed", labels, stats["misses"]
+        yield "ontrack_cache_entries", "Entries held in memory", labels, stats["entries"]
+    flights = CAREER_PATHS_FLIGHTS.stats()
+    yield "ontrack_llm_coalesced_calls_total", "Career path requests that joined an in-flight call", {}, flights["coalesced"]
+    for endpoint, budget in LLM_BUDGETS.items():
+        stats = budget.stats()
+        labels = {"endpoint": endpoint}
+        yield "ontrack_llm_hedge_delay_seconds", "Wait before a hedged LLM call is sent", labels, stats["hedge_delay"]
+        yield "ontrack_llm_hedged_calls_total", "LLM calls that sent a hedged duplicate", labels, stats["hedged"]
+        yield "ontrack_llm_hedge_wins_total", "Hedged duplicates that answered first", labels, stats["hedge_wins"]
+        yield "ontrack_llm_degraded_total", "Responses built from local data after a deadline or failure", labels, \
+            stats["deadline_exceeded"] + stats["failed"]
+    if hasattr(SESSION_STORE, 'stats'):
+        yield "ontrack_live_sessions", "Survey sessions held", {}, SESSION_STORE.stats().get("live_sessions")
+    chat = CHAT_MEMORY.stats()
+    yield "ontrack_chat_sessions", "Chat conversations held", {}, chat.get("live_sessions")
+    yield "ontrack_chat_session_bytes", "Text held by in-memory chat conversations", {}, chat.get("bytes_estimate")
+    yield "ontrack_chat_compactions_total", "Chat histories folded into a summary", {}, chat["compactions"]
+    yield "ontrack_chat_compaction_errors_total", "Chat summaries that failed", {}, chat["compaction_errors"]
+
+@app.on_event("startup")
+async def start_storage_tasks():
+    RESPONSE_STORE.start_background_tasks()
+    SESSION_STORE.start_background_tasks()
+    CHAT_SESSION_STORE.start_background_tasks()
+    REFERENCE.start_background_tasks()
+    if TRACE_LOG is not None:
+        TRACE_LOG.start_background_tasks()
+    # Set ONTRACK_WARM_CAREER_PATHS to a concurrency to warm the career path cache at start-up
+    warm_concurrency = int(os.getenv('ONTRACK_WARM_CAREER_PATHS', '0'))
+    if warm_concurrency > 0:
+        start_career_paths_warmer(warm_concurrency)
+
+@app.on_event("shutdown")
+async def close_storage():
+    RESPONSE_STORE.close()
+    SESSION_STORE.close()
+    CHAT_SESSION_STORE.close()
+    REFERENCE.close()
+    if TRACE_LOG is not None:
+        TRACE_LOG.close()
+    CAREER_PATHS_CACHE.close()
+    await LLM.close()
+
+def session_reference(session: Dict[str, Any]) -> ReferenceSet:
+    """The reference set holding the question pool a survey session was served from"""
+    reference = REFERENCE.for_version(session.get('questions_version'))
+    if reference is None:
+        raise HTTPException(status_code=409,
+                            detail="The survey questions have changed since this survey started; please start again")
+    return reference
 
 @app.get("/get_survey_page/{page_number}")
 async def get_survey_page(page_number: int, user_name: Optional[str] = None):
@@ -98,42 +255,28 @@ async def get_survey_page(page_number: int, user_name: Optional[str] = None):
             raise HTTPException(status_code=400, detail="User name is required for pages 2-5")
             
         # Initialize user's data if not exists
-        if user_name not in USER_RESPONSES:
-            USER_RESPONSES[user_name] = {
-                'answers': [],
-                'used_questions': set()  # Track used question indices
-            }
-            
-        user_data = USER_RESPONSES[user_name]
-        used_questions = user_data.get('used_questions', set())
-        
-        # Get available questions (those not used yet)
-        available_questions = [
-            (i, q) for i, q in enumerate(QUESTIONS_POOL)
-            if i not in used_questions
-        ]
-        
-        if len(available_questions) < 10:
-            raise HTTPException(
-                status_code=400,
-                detail="Not enough unique questions remaining"
-            )
-            
-        # Randomly select 10 unused questions
-        selected_questions = random.sample(available_questions, 10)
-        
-        # Update used questions
-        for idx, _ in selected_questions:
-            used_questions.add(idx)
-        USER_RESPONSES[user_name]['used_questions'] = used_questions
-        
+        user_data = SESSION_STORE.get(user_name)
+        if user_data is None:
+            user_data = {'answers': []}
+
+        # Take this page's slice of the session's question order
+        reference = REFERENCE.current
+        sampler = QuestionSampler.from_session(user_data, len(reference.questions_pool),
+                                               reference.questions_version)
+        try:
+            selected_indices = sampler.page(page_number)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        sampler.save(user_data)
+        SESSION_STORE.save(user_name, user_data)
+
         # Format questions for response
         questions = [
             {
-                "question": q["question"],
-                "category": q["category"]
+                "question": reference.questions_pool[i]["question"],
+                "category": reference.questions_pool[i]["category"]
             }
-            for _, q in selected_questions
+            for i in selected_indices
         ]
         
         return {"questions": questions}
@@ -141,59 +284,32 @@ async def get_survey_page(page_number: int, user_name: Optional[str] = None):
         if not user_name:
             raise HTTPException(status_code=400, detail="User name is required for page 6")
             
-        if user_name not in USER_RESPONSES:
+        user_data = SESSION_STORE.get(user_name)
+        if user_data is None:
             raise HTTPException(status_code=400, detail="No previous responses found for this user")
 
-        user_data = USER_RESPONSES.get(user_name, {})
         user_answers = user_data.get('answers', [])
         
         if not user_answers:
             raise HTTPException(status_code=400, detail="No answers found for this user")
 
-        # Calculate category counts
-        category_counts = {"R": 0, "A": 0, "S": 0, "C": 0, "I": 0, "E": 0}
-        
-        for i, answer in enumerate(user_answers):
-            if answer and str(answer).lower() == "yes":
-                question_idx = i % len(QUESTIONS_POOL)
-                category = QUESTIONS_POOL[question_idx]["category"]
-                category_counts[category] += 1
-
-        # Sort categories by count
-        sorted_categories = sorted(
-            category_counts.items(),
-            key=lambda x: (x[1], x[0]),  # Sort by count first, then alphabetically
-            reverse=True
-        )
-
-        # Get categories for code generation
-        max_count = sorted_categories[0][1]
-        second_max_count = sorted_categories[1][1]
-        third_max_count = sorted_categories[2][1]
-
-        # Group categories by their counts
-        max_categories = [cat for cat, count in sorted_categories if count == max_count]
-        second_max_categories = [cat for cat, count in sorted_categories if count == second_max_count]
-        third_max_categories = [cat for cat, count in sorted_categories if count == third_max_count]
-
-        # Generate holland code using the improved function
-        holland_code = generate_code(max_categories, second_max_categories, third_max_categories)
+        # Count yes answers per category and turn them into Holland codes,
+        # against the question pool the session's order points into
+        reference = session_reference(user_data)
+        category_counts = page_category_counts(user_answers, reference.questions_pool,
+                                               user_data.get('question_order'), user_data.get('served', 0))
+        holland_code = all_holland_codes(category_counts)
 
         # Store the first code if multiple are generated
         primary_code = holland_code.split(' / ')[0]
-        USER_RESPONSES[user_name]['holland_code'] = primary_code
+        user_data['holland_code'] = primary_code
 
         # Get matching industries for ALL possible codes
-        matching_industries = set()  # Use set to avoid duplicates
-        for code in holland_code.split(' / '):
-            for mapping in INDUSTRY_MAPPING:
-                if 'holland_codes' in mapping and 'industry' in mapping:
-                    if code in mapping['holland_codes']:
-                        matching_industries.add(mapping['industry'])
-
-        matching_industries = list(matching_industries)  # Convert back to list
-        USER_RESPONSES[user_name]['matching_industries'] = matching_industries
-        USER_RESPONSES[user_name]['all_holland_codes'] = holland_code  # Store all possible codes
+        industry_index = reference.industry_index
+        matching_industries = industry_index.ordered(industry_index.for_codes(holland_code.split(' / ')))
+        user_data['matching_industries'] = matching_industries
+        user_data['all_holland_codes'] = holland_code  # Store all possible codes
+        SESSION_STORE.save(user_name, user_data)
 
         return {
             "questions": [
@@ -210,27 +326,36 @@ async def get_survey_page(page_number: int, user_name: Optional[str] = None):
 async def submit_survey_page(response: SurveyPageResponse):
     """Submit answers for a specific page"""
     try:
-        # Store responses in memory (in production, use a database)
-        if response.user_name not in USER_RESPONSES:
-            USER_RESPONSES[response.user_name] = {'answers': []}
-        
+        # Store responses in the session store
+        user_data = SESSION_STORE.get(response.user_name)
+        if user_data is None:
+            user_data = {'answers': []}
+
         if response.page_number == 1:
             if len(response.answers) != 6:
                 raise HTTPException(status_code=400, detail="Invalid number of answers for page 1")
-            USER_RESPONSES[response.user_name]['basic_info'] = response.answers
+            user_data['basic_info'] = response.answers
         elif 2 <= response.page_number <= 5:
             start_idx = (response.page_number - 2) * 10
-            USER_RESPONSES[response.user_name]['answers'][start_idx:start_idx + 10] = response.answers
+            user_data['answers'][start_idx:start_idx + 10] = response.answers
         elif response.page_number == 6:
-            USER_RESPONSES[response.user_name]['final_answers'] = response.answers
-            
+            user_data['final_answers'] = response.answers
+
+        SESSION_STORE.save(response.user_name, user_data)
         return {"status": "success", "page": response.page_number}
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-
-USER_RESPONSES = {}
+def survey_record(response: SurveyResponse, scored: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored form of a finished survey"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "answers": response.answers,
+        "dse_scores": response.dse_scores,
+        "holland_codes": scored["holland_codes"],
+        "matching_industries": scored["matching_industries"]
+    }
 
 @app.post("/submit_survey/")
 async def submit_survey(response: SurveyResponse):
@@ -239,213 +364,324 @@ async def submit_survey(response: SurveyResponse):
         if not response.user_name:
             raise HTTPException(status_code=400, detail="Username is required")
         
-        # Calculate Holland codes from answers
-        yes_no_answers = response.answers[6:]  # Skip name and DSE scores
-        
-        # Initialize category counts
-        category_counts = {"R": 0, "I": 0, "A": 0, "S": 0, "E": 0, "C": 0}
-        
-        # Count 'yes' answers for each category
-        for i, answer in enumerate(yes_no_answers):
-            if str(answer).lower() == 'yes' and i < len(QUESTIONS_POOL):
-                category = QUESTIONS_POOL[i].get('category')
-                if category in category_counts:
-                    category_counts[category] += 1
-
-        # Sort categories by count to get Holland codes
-        sorted_categories = sorted(
-            category_counts.items(), 
-            key=lambda x: (-x[1], x[0])  # Sort by count (descending) then by letter
-        )
-        
-        # Generate Holland code string (top 3)
-        holland_codes = ''.join(cat for cat, _ in sorted_categories[:3])
-        
-        # Find matching industries
-        matching_industries = []
-        for industry in INDUSTRY_MAPPING:
-            if 'holland_codes' in industry and any(code in industry['holland_codes'] for code in holland_codes):
-                if 'industry' in industry:
-                    matching_industries.append(industry['industry'])
-
-        if not matching_industries:
-            # If no exact matches, use the first code as fallback
-            for industry in INDUSTRY_MAPPING:
-                if 'holland_codes' in industry and holland_codes[0] in industry['holland_codes']:
-                    if 'industry' in industry:
-                        matching_industries.append(industry['industry'])
+        # Calculate Holland codes and matching industries from answers, in
+        # the order the session served the questions when there is one
+        session = SESSION_STORE.get(response.user_name)
+        question_order = None
+        reference = REFERENCE.current
+        if session and session.get('question_order') is not None:
+            question_order = session['question_order'][:session.get('served', 0)]
+            reference = session_reference(session)
+        scored = reference.scorer.score(response.answers, question_order)
+        holland_codes = scored["holland_codes"]
+        matching_industries = scored["matching_industries"]
+
+        # Append to the response log
+        RESPONSE_STORE.put(response.user_name, survey_record(response, scored))
 
-        # Ensure we have at least some industries
-        if not matching_industries:
-            matching_industries = ["General"]  # Fallback industry
-
-        # Store the complete response
-        user_data = {
-            "timestamp": datetime.now().isoformat(),
-            "answers": response.answers,
-            "dse_scores": response.dse_scores,
+        return {
+            "status": "success",
+            "message": "Survey completed successfully",
+            "user_name": response.user_name,
             "holland_codes": holland_codes,
             "matching_industries": matching_industries
         }
 
-        # Save to file
-        try:
-            with open('survey_responses.json', 'r', encoding='utf-8') as f:
-                stored_responses = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            stored_responses = {}
-
-        stored_responses[response.user_name] = user_data
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error processing survey: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
 
-        with open('survey_responses.json', 'w', encoding='utf-8') as f:
-            json.dump(stored_responses, f, ensure_ascii=False, indent=2)
+@app.post("/submit_survey_batch/")
+async def submit_survey_batch(batch: SurveyBatch):
+    """Score and store a whole class of finished surveys in one pass and one write"""
+    try:
+        missing = [i for i, response in enumerate(batch.responses) if not response.user_name]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Username is required (responses {missing})")
+
+        scored = REFERENCE.current.scorer.score_batch([response.answers for response in batch.responses])
+        records = {
+            response.user_name: survey_record(response, result)
+            for response, result in zip(batch.responses, scored)
+        }
+        RESPONSE_STORE.put_many(records)
 
         return {
             "status": "success",
-            "message": "Survey completed successfully",
-            "user_name": response.user_name,
-            "holland_codes": holland_codes,
-            "matching_industries": matching_industries
+            "message": f"{len(records)} surveys completed successfully",
+            "total": len(records),
+            "results": [
+                {"user_name": response.user_name, **result}
+                for response, result in zip(batch.responses, scored)
+            ]
         }
 
     except Exception as e:
-        print(f"Error processing survey: {str(e)}")
+        print(f"Error processing survey batch: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_admin_token(x_admin_token: Optional[str]):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/export_survey_results")
+async def export_survey_results(format: str = "csv", x_admin_token: Optional[str] = Header(None)):
+    """Stream every finished survey as CSV or JSON Lines"""
+    check_admin_token(x_admin_token)
+    if format not in COHORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    rows = export_csv(RESPONSE_STORE.iter_items()) if format == "csv" else export_jsonl(RESPONSE_STORE.iter_items())
+    return StreamingResponse(
+        rows,
+        media_type=COHORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="survey_results.{format}"'}
+    )
+
+@app.post("/import_survey_results")
+async def import_survey_results(request: Request, format: str = "csv", chunk_size: int = 500,
+                                x_admin_token: Optional[str] = Header(None)):
+    """Validate, score and store surveys streamed in as CSV or JSON Lines.
+
+    Rows need user_name, answers and dse_scores; Holland codes and industries
+    are recomputed with the same scorer as submit_survey. Rows are handled in
+    chunks, each stored with one write. A CSV file with an invalid header is
+    rejected as a whole.
+    """
+    check_admin_token(x_admin_token)
+    if format not in COHORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    chunk_size = max(1, min(chunk_size, 5000))
+
+    imported = 0
+    failed = 0
+    errors = []
+    chunk: List[SurveyResponse] = []
+    scorer = REFERENCE.current.scorer  # One scorer for the whole import, even across a reload
+
+    def store_chunk():
+        scored = scorer.score_batch([response.answers for response in chunk])
+        RESPONSE_STORE.put_many({
+            response.user_name: survey_record(response, result)
+            for response, result in zip(chunk, scored)
+        })
+        chunk.clear()
+
+    try:
+        async for line_number, row in parse_rows(iter_lines(request.stream()), format):
+            try:
+                if isinstance(row, str):
+                    raise ValueError(row)
+                response = SurveyResponse(**row)
+                if not response.user_name:
+                    raise ValueError("Username is required")
+            except (ValueError, TypeError) as e:
+                failed += 1
+                if len(errors) < 100:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            chunk.append(response)
+            if len(chunk) >= chunk_size:
+                imported += len(chunk)
+                store_chunk()
+    except ValueError as e:
+        # Raised by parse_rows for an invalid CSV header, before any row is stored
         raise HTTPException(status_code=400, detail=str(e))
+    if chunk:
+        imported += len(chunk)
+        store_chunk()
+
+    return {
+        "status": "success" if not failed else "partial",
+        "imported": imported,
+        "failed": failed,
+        "errors": errors
+    }
 
 @app.get("/get_survey_results/{user_name}")
 async def get_survey_results(user_name: str):
     """Get stored survey results for a user"""
     try:
-        if user_name not in USER_RESPONSES:
-            # Try to load from JSON file
-            try:
-                with open('survey_responses.json', 'r') as f:
-                    stored_responses = json.load(f)
-                    if user_name in stored_responses:
-                        return stored_responses[user_name]
-            except (FileNotFoundError, json.JSONDecodeError):
-                pass
-            
+        user_data = SESSION_STORE.get(user_name)
+        if user_data is None:
+            # Try to load from the response store
+            user_data = RESPONSE_STORE.get(user_name)
+            if user_data is not None:
+                return user_data
+
             raise HTTPException(status_code=404, detail="User not found")
-        
-        return USER_RESPONSES[user_name]
+
+        session = dict(user_data.items())
+        if session.get('question_order') is not None:
+            session['question_order'] = list(session['question_order'])
+        return session
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/get_users_by_holland_code/{holland_code}")
+async def get_users_by_holland_code(holland_code: str, limit: int = 100):
+    """List users whose primary Holland code matches"""
+    users = RESPONSE_STORE.find_by_holland_code(holland_code.upper(), limit)
+    return {"holland_code": holland_code.upper(), "users": users, "total": len(users)}
+
+
+@app.get("/get_cache_stats")
+async def get_cache_stats():
+    """Hit/miss counters of the caches and in-memory session store sizes"""
+    response_cache = RESPONSE_STORE.stats() if hasattr(RESPONSE_STORE, 'stats') else None
+    sessions = SESSION_STORE.stats() if hasattr(SESSION_STORE, 'stats') else None
+    return {
+        "response_cache": response_cache,
+        "career_paths_cache": CAREER_PATHS_CACHE.stats(),
+        "career_paths_in_flight": CAREER_PATHS_FLIGHTS.stats(),
+        "llm_budgets": {endpoint: budget.stats() for endpoint, budget in LLM_BUDGETS.items()},
+        "sessions": sessions,
+        "chat_sessions": CHAT_MEMORY.stats(),
+        "reference_data": REFERENCE.stats(),
+        "trace_log": TRACE_LOG.stats() if TRACE_LOG is not None else None,
+    }
+
+
+@app.post("/admin/reload_reference_data")
+async def reload_reference_data(x_admin_token: Optional[str] = Header(None)):
+    """Reload questions, industry mapping and JUPAS data in this worker without a restart.
+
+    Parsing and indexing run in a thread; requests keep being served from the
+    old data until the new set is swapped in. Other workers pick changes up
+    through ONTRACK_REFERENCE_WATCH_INTERVAL.
+    """
+    check_admin_token(x_admin_token)
+    try:
+        reference = await asyncio.to_thread(REFERENCE.reload)
+    except Exception as e:
+        print(f"Error reloading reference data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Reload failed, keeping current data: {str(e)}")
+    return {"status": "success", **reference.info()}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Latency histograms, token counts and cache ratios in Prometheus text format"""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
 # For testing the API
 @app.get("/")
 async def root():
     return {"message": "Survey API is running"}
 
-async def generate_career_paths(holland_code: str, matching_industries: List[str]) -> Dict:
-    """Generate 10 specific career paths using OpenAI API"""
-    try:
-        prompt = f"""
-        Based on the following information:
-        - Holland Code: {holland_code}
-        - Matching Industries: {', '.join(matching_industries)}
-
-        Please provide 5 specific career paths that match this profiles. For each career path:
-        1. Job Title
-        2. Detailed job description
-        3. Required skills
-        4. Education requirements
-        5. Career progression
-
-        Format each career path with // as separators.
-        Example format:
-        Job Title: Software Engineer
-        Description: A Software Engineer designs, develops, and maintains computer software and systems. They use programming languages like Python, Java, or C++ to create applications that solve problems or enhance user experiences. Beyond coding, software engineers also debug issues, test software functionality, and collaborate with other team members to ensure a product meets user needs. This career demands strong analytical thinking, problem-solving skills, and continuous learning to adapt to evolving technologies and build innovative digital solutions..
-        Required Skills: Programming languages (Python, Java), problem-solving, teamwork
-        Education: Bachelor's degree in Computer Science or related field; Relevant Courses or Certifications in programming, algorithms, and software development can also be helpful.
-        Career Progression: Junior Developer → Senior Developer → Tech Lead → Software Architect
-        //
-        [Next career path...]
-        """
-
-        response = client.chat.completions.create(
+def career_paths_cache_key(holland_code: str, matching_industries: List[str]) -> str:
+    """Cache key for generate_career_paths; industry order does not matter"""
+    industries = sorted({industry.strip() for industry in matching_industries})
+    return ResultCache.make_key(holland_code.strip().upper(), industries, CAREER_PATHS_PROMPT_VERSION)
+
+def career_paths_messages(holland_code: str, matching_industries: List[str]) -> List[Dict[str, str]]:
+    """Chat messages asking the model for career paths"""
+    prompt = f"""
+    Based on the following information:
+    - Holland Code: {holland_code}
+    - Matching Industries: {', '.join(matching_industries)}
+
+    Please provide 5 specific career paths that match this profiles. For each career path:
+    1. Job Title
+    2. Detailed job description
+    3. Required skills
+    4. Education requirements
+    5. Career progression
+
+    Format each career path with // as separators.
+    Example format:
+    Job Title: Software Engineer
+    Description: A Software Engineer designs, develops, and maintains computer software and systems. They use programming languages like Python, Java, or C++ to create applications that solve problems or enhance user experiences. Beyond coding, software engineers also debug issues, test software functionality, and collaborate with other team members to ensure a product meets user needs. This career demands strong analytical thinking, problem-solving skills, and continuous learning to adapt to evolving technologies and build innovative digital solutions..
+    Required Skills: Programming languages (Python, Java), problem-solving, teamwork
+    Education: Bachelor's degree in Computer Science or related field; Relevant Courses or Certifications in programming, algorithms, and software development can also be helpful.
+    Career Progression: Junior Developer → Senior Developer → Tech Lead → Software Architect
+    //
+    [Next career path...]
+    """
+
+    return [
+        {"role": "system", "content": "You are a career counselor specializing in Holland Code career matching. Provide detailed and specific career paths."},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_career_paths(content: str) -> List[Dict[str, str]]:
+    """Split a completion into career path dicts"""
+    return parse_careers(content, CAREER_PATH_FIELDS)
+
+async def generate_career_paths(holland_code: str, matching_industries: List[str], refresh: bool = False) -> Dict:
+    """Generate 10 specific career paths using OpenAI API.
+
+    Concurrent calls for the same cache key, such as a class of students
+    sharing a Holland code, share one in-flight completion.
+    """
+    cache_key = career_paths_cache_key(holland_code, matching_industries)
+    if not refresh:
+        cached = await CAREER_PATHS_CACHE.aget(cache_key)
+        if cached is not None:
+            return cached
+
+    async def complete() -> Dict:
+        response = await LLM.chat(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a career counselor specializing in Holland Code career matching. Provide detailed and specific career paths."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=career_paths_messages(holland_code, matching_industries),
             max_tokens=6000,
             temperature=0.7
         )
 
         # Access the message content correctly
         content = response.choices[0].message.content
+        structured_paths = parse_career_paths(content)
 
-        # Split the response into individual career paths
-        career_paths = content.split('//')
-        
-        # Clean and structure each career path
-        structured_paths = []
-        for path in career_paths:
-            if path.strip():  # Skip empty paths
-                path_dict = {}
-                lines = path.strip().split('\n')
-                for line in lines:
-                    if line.strip():
-                        if "Job Title:" in line:
-                            path_dict['title'] = line.replace("Job Title:", "").strip()
-                        elif "Description:" in line:
-                            path_dict['description'] = line.replace("Description:", "").strip()
-                        elif "Required Skills:" in line:
-                            path_dict['required_skills'] = line.replace("Required Skills:", "").strip()
-                        elif "Education:" in line:
-                            path_dict['education'] = line.replace("Education:", "").strip()
-                        elif "Career Progression:" in line:
-                            path_dict['progression'] = line.replace("Career Progression:", "").strip()
-                if path_dict:  # Only append if we parsed some data
-                    structured_paths.append(path_dict)
-        
-        return {
+        result = {
             "career_paths": structured_paths,
             "total_paths": len(structured_paths)
         }
+        if structured_paths:
+            await CAREER_PATHS_CACHE.aput(cache_key, result)
+        return result
+
+    try:
+        return await CAREER_PATHS_FLIGHTS.do(cache_key, complete)
     except Exception as e:
         print(f"Error in generate_career_paths: {str(e)}")  # Add debugging
         raise HTTPException(status_code=500, detail=f"Error generating career paths: {str(e)}")
 
-# Add new endpoint to get career paths
-@app.get("/get_career_paths/{user_name}")
-async def get_career_paths(user_name: str):
-    """Get specific career paths for a user"""
-    try:
-        # Load user data from file
-        try:
-            with open('survey_responses.json', 'r', encoding='utf-8') as f:
-                stored_responses = json.load(f)
-                user_data = stored_responses.get(user_name)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error reading survey_responses.json: {str(e)}")
-            raise HTTPException(
-                status_code=404,
-                detail="Survey data not found or corrupted"
-            )
+def career_paths_profile(user_name: str):
+    """Holland codes and matching industries of a finished survey, validated"""
+    # Look up user data through the response store index
+    user_data = RESPONSE_STORE.get(user_name)
 
-        if not user_data:
-            raise HTTPException(status_code=404, detail="User not found")
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
 
-        # Get holland codes and matching industries
-        holland_codes = user_data.get('holland_codes', '')
-        if not holland_codes:
-            raise HTTPException(
-                status_code=400,
-                detail="Holland codes not found in user data"
-            )
+    # Get holland codes and matching industries
+    holland_codes = user_data.get('holland_codes', '')
+    if not holland_codes:
+        raise HTTPException(
+            status_code=400,
+            detail="Holland codes not found in user data"
+        )
 
-        matching_industries = user_data.get('matching_industries', [])
-        if not matching_industries:
-            raise HTTPException(
-                status_code=400,
-                detail="No matching industries found"
-            )
+    matching_industries = user_data.get('matching_industries', [])
+    if not matching_industries:
+        raise HTTPException(
+            status_code=400,
+            detail="No matching industries found"
+        )
+    return holland_codes, matching_industries
+
+# Add new endpoint to get career paths
+@app.get("/get_career_paths/{user_name}")
+async def get_career_paths(user_name: str, refresh: bool = False):
+    """Get specific career paths for a user; refresh=true bypasses the cache"""
+    try:
+        holland_codes, matching_industries = career_paths_profile(user_name)
 
         # Generate career paths using the holland code
-        career_paths_data = await generate_career_paths(holland_codes, matching_industries)
+        career_paths_data = await generate_career_paths(holland_codes, matching_industries, refresh=refresh)
 
         return {
             "user_name": user_name,
@@ -464,47 +700,117 @@ async def get_career_paths(user_name: str):
             detail=f"Error getting career paths: {str(e)}"
         )
 
-    
-def find_closest_program(target_score: float, programs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-    """Find the program with the closest median score to target score"""
-    if not programs:
-        return None
-        
-    min_diff = float('inf')
-    closest_program = None
-    
-    for program in programs:
-        try:
-            median_score = program.get('median_score_index')
-            if median_score is None or median_score == '/':
-                continue
-                
-            median_score = float(median_score)
-            diff = abs(median_score - target_score)
-            
-            if diff < min_diff:
-                min_diff = diff
-                closest_program = program
-        except (ValueError, TypeError):
-            continue
-    
-    return closest_program
+@app.get("/get_career_paths/{user_name}/stream")
+async def stream_career_paths(user_name: str, refresh: bool = False):
+    """Stream career paths for a user as Server-Sent Events.
+
+    Emits `token` events with raw text while the model generates and a
+    `career_path` event as soon as each path is complete, then one `done`
+    event carrying the same payload as /get_career_paths. The generation is
+    registered in CAREER_PATHS_FLIGHTS, so concurrent requests for the same
+    paths, streamed or not, wait for it and get only the `done` event.
+    """
+    holland_codes, matching_industries = career_paths_profile(user_name)
+
+    async def events():
+        profile = {
+            "user_name": user_name,
+            "holland_codes": holland_codes,
+            "matching_industries": matching_industries,
+        }
+        cache_key = career_paths_cache_key(holland_codes, matching_industries)
+        cached = None if refresh else await CAREER_PATHS_CACHE.aget(cache_key)
+        if cached is not None:
+            yield sse_event("done", {**profile, **cached})
+            return
+
+        # The generation runs as its own task and hands events to this
+        # request through a queue, so it finishes for the waiters even if
+        # this client disconnects
+        pending: asyncio.Queue = asyncio.Queue()
+
+        async def complete() -> Dict:
+            parser = CareerStreamParser(CAREER_PATH_FIELDS)
+            try:
+                async for text in LLM.stream(
+                    model="gpt-4o",
+                    messages=career_paths_messages(holland_codes, matching_industries),
+                    max_tokens=6000,
+                    temperature=0.7
+                ):
+                    pending.put_nowait(sse_event("token", {"text": text}))
+                    for path_dict in parser.feed(text):
+                        pending.put_nowait(sse_event("career_path", path_dict))
+                for path_dict in parser.finish():
+                    pending.put_nowait(sse_event("career_path", path_dict))
+            finally:
+                pending.put_nowait(None)
+
+            structured_paths = parser.parsed
+            result = {
+                "career_paths": structured_paths,
+                "total_paths": len(structured_paths)
+            }
+            if structured_paths:
+                await CAREER_PATHS_CACHE.aput(cache_key, result)
+            return result
+
+        flight, leading = CAREER_PATHS_FLIGHTS.start(cache_key, complete)
+        if leading:
+            while (event := await pending.get()) is not None:
+                yield event
+        result = await asyncio.shield(flight)
+        yield sse_event("done", {**profile, **result})
+
+    return sse_response(events(), "stream_career_paths")
+
+def career_paths_warmer(concurrency: int = 4) -> CacheWarmer:
+    """A job that fills CAREER_PATHS_CACHE for every Holland code scoring can store"""
+    return CacheWarmer(
+        career_path_profiles(REFERENCE.current.scorer),
+        generate_career_paths,
+        lambda code, industries: CAREER_PATHS_CACHE.acontains(career_paths_cache_key(code, industries)),
+        concurrency=concurrency,
+    )
+
+CAREER_PATHS_WARMER: Optional[CacheWarmer] = None
+
+def start_career_paths_warmer(concurrency: int) -> CacheWarmer:
+    global CAREER_PATHS_WARMER
+    if CAREER_PATHS_WARMER is None or not CAREER_PATHS_WARMER.running:
+        CAREER_PATHS_WARMER = career_paths_warmer(concurrency)
+        CAREER_PATHS_WARMER.start()
+    return CAREER_PATHS_WARMER
+
+@app.post("/admin/warm_career_paths")
+async def warm_career_paths(concurrency: int = 4, x_admin_token: Optional[str] = Header(None)):
+    """Start precomputing career paths for every Holland code in the background.
+
+    Codes that already have a cached result are skipped, so calling this
+    again after an interruption resumes the job. Poll the GET endpoint for
+    progress.
+    """
+    check_admin_token(x_admin_token)
+    return start_career_paths_warmer(max(1, min(concurrency, 16))).stats()
+
+@app.get("/admin/warm_career_paths")
+async def warm_career_paths_status(x_admin_token: Optional[str] = Header(None)):
+    check_admin_token(x_admin_token)
+    if CAREER_PATHS_WARMER is None:
+        return {"running": False, "total": 0}
+    return CAREER_PATHS_WARMER.stats()
 
+    
 @app.get("/get_jupas_recommendations/{user_name}")
-async def get_jupas_recommendations(user_name: str):
-    """Get JUPAS recommendations based on survey results"""
+async def get_jupas_recommendations(user_name: str, limit: int = 5):
+    """Get JUPAS recommendations based on survey results.
+
+    Each industry carries its closest program, up to `limit` programs ranked
+    by distance from the average DSE score, and reach/match/safety bands.
+    """
     try:
-        # Load user data
-        try:
-            with open('survey_responses.json', 'r', encoding='utf-8') as f:
-                stored_responses = json.load(f)
-                user_data = stored_responses.get(user_name)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error reading survey_responses.json: {str(e)}")
-            raise HTTPException(
-                status_code=404,
-                detail="Survey data not found or corrupted"
-            )
+        # Look up user data through the response store index
+        user_data = RESPONSE_STORE.get(user_name)
 
         if not user_data:
             raise HTTPException(
@@ -556,21 +862,25 @@ async def get_jupas_recommendations(user_name: str):
 
         # Get recommendations for each matching industry
         recommendations = []
+        limit = max(1, min(limit, 50))
+        jupas_index = REFERENCE.current.jupas_index
         for industry in matching_industries:
-            if industry in JUPAS_DATA:
-                programs = JUPAS_DATA[industry]
-                if not programs:
-                    continue
-                
-                # Find closest program for this industry
-                closest_program = find_closest_program(average_score, programs)
-                if closest_program:
-                    score_diff = abs(float(closest_program['median_score_index']) - average_score)
-                    recommendations.append({
-                        "industry": industry,
-                        "program": closest_program,
-                        "score_difference": round(score_diff, 2)
-                    })
+            # Closest programs for this industry, nearest first
+            ranked = jupas_index.nearest(industry, average_score, limit)
+            if not ranked:
+                continue
+
+            score_diff, closest_program = ranked[0]
+            recommendations.append({
+                "industry": industry,
+                "program": closest_program,
+                "score_difference": round(score_diff, 2),
+                "ranked_programs": [
+                    {"program": program, "score_difference": round(diff, 2)}
+                    for diff, program in ranked
+                ],
+                "bands": jupas_index.bands(industry, average_score)
+            })
 
         if not recommendations:
             return {
@@ -601,6 +911,145 @@ async def get_jupas_recommendations(user_name: str):
         )
 
     
+# Short descriptions of each Holland type for answers built without the model
+HOLLAND_TYPES = {
+    "R": ("實際型", "喜歡動手操作、使用工具和機器，重視具體成果"),
+    "I": ("研究型", "好奇心強，喜歡觀察、分析和解決抽象問題"),
+    "A": ("藝術型", "富想像力和創意，喜歡以不同方式表達自己"),
+    "S": ("社會型", "樂於助人，善於溝通、教導和與人合作"),
+    "E": ("企業型", "有領導才能和說服力，喜歡訂立目標並推動計劃"),
+    "C": ("常規型", "做事細心有條理，擅長處理資料和遵循既定程序"),
+}
+
+async def local_recommendations(user_data: Dict) -> Dict:
+    """Industries, closest JUPAS programs and cached career paths of a finished survey.
+
+    Built from reference data and the career path cache only, for when an
+    LLM-backed endpoint cannot answer in time.
+    """
+    matching_industries = user_data.get('matching_industries', [])
+    jupas_programs = []
+    try:
+        dse_scores = [float(score) for score in user_data.get('dse_scores') or []]
+        average_score = sum(dse_scores) / len(dse_scores)
+    except (ValueError, TypeError, ZeroDivisionError):
+        average_score = None
+    if average_score is not None:
+        jupas_index = REFERENCE.current.jupas_index
+        for industry in matching_industries:
+            for diff, program in jupas_index.nearest(industry, average_score, 3):
+                jupas_programs.append({"industry": industry, "program": program, "score_difference": round(diff, 2)})
+        jupas_programs.sort(key=lambda x: x['score_difference'])
+
+    # Career paths depend only on the top Holland code and its industries
+    career_paths = []
+    holland_code = user_data.get('holland_codes')
+    if holland_code and matching_industries:
+        cached = await CAREER_PATHS_CACHE.aget(career_paths_cache_key(holland_code, matching_industries))
+        if cached is not None:
+            career_paths = cached["career_paths"]
+
+    annotate(degraded=True)
+    return {
+        "degraded": True,
+        "matching_industries": matching_industries,
+        "jupas_programs": jupas_programs,
+        "career_paths": career_paths,
+    }
+
+def local_personality_analysis(holland_code: str, matching_industries: List[str]) -> str:
+    """A short analysis in the model's section format, from the Holland type descriptions"""
+    types = [HOLLAND_TYPES[letter] for letter in holland_code.upper() if letter in HOLLAND_TYPES]
+    traits = "；".join(f"{name}：{description}" for name, description in types)
+    industries = "、".join(matching_industries) if matching_industries else "多個不同範疇"
+    return (
+        f"性格特質：\n你的性格結合了以下特質——{traits}。\n\n"
+        f"學術發展建議：\n可多了解{industries}相關的課程和活動，"
+        "並在小組學習中選擇能發揮以上特質的角色。"
+    )
+
+def emerging_careers_request(user_name: str, favorite_sport: str, passionate_activity: str,
+                             billionaire_purchase: str):
+    """Validated user profile and chat messages for an emerging careers request"""
+    # Look up user data through the response store index
+    user_data = RESPONSE_STORE.get(user_name)
+
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found in survey responses")
+
+    # Extract required data
+    holland_codes = user_data.get('all_holland_codes', '').split(' / ')
+    dse_scores = user_data.get('dse_scores', [])
+    matching_industries = user_data.get('matching_industries', [])
+
+    if not holland_codes or not dse_scores or not matching_industries:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing required user data in survey responses"
+        )
+
+    # Calculate average DSE score
+    avg_dse_score = sum(dse_scores) / len(dse_scores)
+
+    # Create prompt for GPT
+    prompt = f"""
+    Based on the following user profile and preferences:
+
+    Professional Profile:
+    - Holland Code: {holland_codes[0]} (Primary personality type)
+    - Academic Performance: DSE Average Score of {avg_dse_score:.1f}/7
+    - Industry Matches: {', '.join(matching_industries)}
+
+    Personal Interests & Values:
+    - Favorite Sport: {favorite_sport}
+    - Activity they're passionate about: {passionate_activity}
+    - First purchase as a billionaire: {billionaire_purchase}
+
+    Please suggest 10 emerging or future-oriented career paths (In Traditional Chinese) that:
+    1. Align with their Holland Code personality type
+    2. Match their interests and values
+    3. Are considered emerging or future industries (2024 and beyond)
+    4. Take into account their academic performance level
+
+    For each career path, provide:
+    1. Job Title (emerging/future role)
+    2. Detailed description of the role
+    3. Key skills required
+    4. Education path recommendation
+    5. Future growth potential
+
+    Format each career with // as separators.
+    Example format:
+    Job Title: Metaverse Experience Designer
+    Description: A Metaverse Experience Designer creates immersive digital environments and interactions within virtual worlds. They blend skills in design, user experience (UX), and storytelling to craft engaging, interactive experiences that draw users into the metaverse. This role involves building virtual spaces, integrating avatars, and developing user journeys to ensure a compelling experience. Designers work with VR/AR tools, 3D modeling, and collaborate across disciplines to build vibrant, memorable experiences that make virtual worlds feel alive and engaging for users.
+    Required Skills: VR/AR development, 3D modeling, user psychology, spatial design
+    Education: Bachelor's in Digital Design, Interactive Media, or related field
+    Growth Potential: The role of a Metaverse Experience Designer has immense growth potential as VR and AR technologies expand rapidly. The demand for skilled designers to craft immersive experiences in the metaverse is rising as industries like entertainment, retail, education, and healthcare explore virtual spaces. Meta (formerly Facebook), for example, has been heavily investing in metaverse development and actively seeks talent for positions like "Metaverse Experience Designer." As adoption grows, designers will shape how people socialize, learn, and work in these spaces. Opportunities for specialization, such as gamified education or virtual commerce, create diverse pathways to innovate and redefine user experiences.
+    //
+    [Next career...]
+    """
+
+    profile = {
+        "user_name": user_name,
+        "holland_code": holland_codes[0],
+        "dse_average": round(avg_dse_score, 1),
+        "matching_industries": matching_industries,
+        "personal_interests": {
+            "favorite_sport": favorite_sport,
+            "passionate_activity": passionate_activity,
+            "billionaire_purchase": billionaire_purchase
+        }
+    }
+    messages = [
+        {"role": "system", "content": "You are an experienced career advisor specializing in emerging industries and future job markets in Hong Kong."},
+        {"role": "user", "content": prompt}
+    ]
+    return profile, messages
+
+def parse_emerging_careers(content: str) -> List[Dict[str, str]]:
+    """Split a completion into emerging career dicts"""
+    return parse_careers(content, EMERGING_CAREER_FIELDS)
+
 @app.get("/get_emerging_careers/{user_name}")
 async def get_emerging_careers(
     user_name: str, 
@@ -608,115 +1057,41 @@ async def get_emerging_careers(
     passionate_activity: str,
     billionaire_purchase: str
 ):
-    """Generate emerging career recommendations based on user profile and preferences"""
-    try:
-        # Load user data from JSON file
-        try:
-            with open('survey_responses.json', 'r', encoding='utf-8') as f:
-                stored_responses = json.load(f)
-                user_data = stored_responses.get(user_name)
-        except (FileNotFoundError, json.JSONDecodeError):
-            raise HTTPException(status_code=404, detail="Survey responses file not found or corrupted")
-
-        if not user_data:
-            raise HTTPException(status_code=404, detail="User not found in survey responses")
+    """Generate emerging career recommendations based on user profile and preferences.
 
-        # Extract required data
-        holland_codes = user_data.get('all_holland_codes', '').split(' / ')
-        dse_scores = user_data.get('dse_scores', [])
-        matching_industries = user_data.get('matching_industries', [])
-
-        if not holland_codes or not dse_scores or not matching_industries:
-            raise HTTPException(
-                status_code=400,
-                detail="Missing required user data in survey responses"
+    Past the endpoint's deadline the response is marked `degraded` and carries
+    local recommendations (see local_recommendations) instead of new careers.
+    """
+    try:
+        profile, messages = emerging_careers_request(
+            user_name, favorite_sport, passionate_activity, billionaire_purchase)
+
+        async def complete() -> str:
+            response = await LLM.chat(
+                model="gpt-4o",
+                messages=messages,
+                max_tokens=8000,
+                temperature=0.7
             )
+            return response.choices[0].message.content
 
-        # Calculate average DSE score
-        avg_dse_score = sum(dse_scores) / len(dse_scores)
-
-        # Create prompt for GPT
-        prompt = f"""
-        Based on the following user profile and preferences:
-
-        Professional Profile:
-        - Holland Code: {holland_codes[0]} (Primary personality type)
-        - Academic Performance: DSE Average Score of {avg_dse_score:.1f}/7
-        - Industry Matches: {', '.join(matching_industries)}
-
-        Personal Interests & Values:
-        - Favorite Sport: {favorite_sport}
-        - Activity they're passionate about: {passionate_activity}
-        - First purchase as a billionaire: {billionaire_purchase}
-
-        Please suggest 10 emerging or future-oriented career paths (In Traditional Chinese) that:
-        1. Align with their Holland Code personality type
-        2. Match their interests and values
-        3. Are considered emerging or future industries (2024 and beyond)
-        4. Take into account their academic performance level
-
-        For each career path, provide:
-        1. Job Title (emerging/future role)
-        2. Detailed description of the role
-        3. Key skills required
-        4. Education path recommendation
-        5. Future growth potential
-
-        Format each career with // as separators.
-        Example format:
-        Job Title: Metaverse Experience Designer
-        Description: A Metaverse Experience Designer creates immersive digital environments and interactions within virtual worlds. They blend skills in design, user experience (UX), and storytelling to craft engaging, interactive experiences that draw users into the metaverse. This role involves building virtual spaces, integrating avatars, and developing user journeys to ensure a compelling experience. Designers work with VR/AR tools, 3D modeling, and collaborate across disciplines to build vibrant, memorable experiences that make virtual worlds feel alive and engaging for users.
-        Required Skills: VR/AR development, 3D modeling, user psychology, spatial design
-        Education: Bachelor's in Digital Design, Interactive Media, or related field
-        Growth Potential: The role of a Metaverse Experience Designer has immense growth potential as VR and AR technologies expand rapidly. The demand for skilled designers to craft immersive experiences in the metaverse is rising as industries like entertainment, retail, education, and healthcare explore virtual spaces. Meta (formerly Facebook), for example, has been heavily investing in metaverse development and actively seeks talent for positions like "Metaverse Experience Designer." As adoption grows, designers will shape how people socialize, learn, and work in these spaces. Opportunities for specialization, such as gamified education or virtual commerce, create diverse pathways to innovate and redefine user experiences.
-        //
-        [Next career...]
-        """
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an experienced career advisor specializing in emerging industries and future job markets in Hong Kong."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=8000,
-            temperature=0.7
-        )
+        try:
+            content = await LLM_BUDGETS["get_emerging_careers"].run(complete)
+        except Exception as e:
+            # Slow or failed completion: answer from local data instead
+            print(f"Error in get_emerging_careers, answering from local data: {str(e)}")
+            return {
+                **profile,
+                "emerging_careers": [],
+                "total_paths": 0,
+                **(await local_recommendations(RESPONSE_STORE.get(user_name) or {}))
+            }
 
         # Parse the response
-        content = response.choices[0].message.content
-        career_paths = content.split('//')
-        
-        structured_paths = []
-        for path in career_paths:
-            if path.strip():
-                path_dict = {}
-                lines = path.strip().split('\n')
-                for line in lines:
-                    if line.strip():
-                        if "Job Title:" in line:
-                            path_dict['title'] = line.replace("Job Title:", "").strip()
-                        elif "Description:" in line:
-                            path_dict['description'] = line.replace("Description:", "").strip()
-                        elif "Required Skills:" in line:
-                            path_dict['required_skills'] = line.replace("Required Skills:", "").strip()
-                        elif "Education:" in line:
-                            path_dict['education'] = line.replace("Education:", "").strip()
-                        elif "Growth Potential:" in line:
-                            path_dict['growth_potential'] = line.replace("Growth Potential:", "").strip()
-                if path_dict:
-                    structured_paths.append(path_dict)
+        structured_paths = parse_emerging_careers(content)
 
         return {
-            "user_name": user_name,
-            "holland_code": holland_codes[0],
-            "dse_average": round(avg_dse_score, 1),
-            "matching_industries": matching_industries,
-            "personal_interests": {
-                "favorite_sport": favorite_sport,
-                "passionate_activity": passionate_activity,
-                "billionaire_purchase": billionaire_purchase
-            },
+            **profile,
             "emerging_careers": structured_paths,
             "total_paths": len(structured_paths)
         }
@@ -728,20 +1103,45 @@ async def get_emerging_careers(
             detail=f"Error generating emerging careers: {str(e)}"
         )
 
+@app.get("/get_emerging_careers/{user_name}/stream")
+async def stream_emerging_careers(
+    user_name: str,
+    favorite_sport: str,
+    passionate_activity: str,
+    billionaire_purchase: str
+):
+    """Stream emerging career recommendations as Server-Sent Events"""
+    profile, messages = emerging_careers_request(
+        user_name, favorite_sport, passionate_activity, billionaire_purchase)
+
+    async def events():
+        parser = CareerStreamParser(EMERGING_CAREER_FIELDS)
+        async for text in LLM.stream(model="gpt-4o", messages=messages, max_tokens=8000, temperature=0.7):
+            yield sse_event("token", {"text": text})
+            for path_dict in parser.feed(text):
+                yield sse_event("emerging_career", path_dict)
+        for path_dict in parser.finish():
+            yield sse_event("emerging_career", path_dict)
+
+        structured_paths = parser.parsed
+        yield sse_event("done", {
+            **profile,
+            "emerging_careers": structured_paths,
+            "total_paths": len(structured_paths)
+        })
+
+    return sse_response(events(), "stream_emerging_careers")
+
 @app.get("/get_personality_analysis/{user_name}")
 async def get_personality_analysis(user_name: str):
-    """Generate personality analysis based on Holland Code"""
+    """Generate personality analysis based on Holland Code.
+
+    Past the endpoint's deadline the analysis is built from the Holland type
+    descriptions and the response is marked `degraded`.
+    """
     try:
-        # Load user data
-        try:
-            with open('survey_responses.json', 'r', encoding='utf-8') as f:
-                stored_responses = json.load(f)
-                user_data = stored_responses.get(user_name)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            raise HTTPException(
-                status_code=404,
-                detail="Survey data not found or corrupted"
-            )
+        # Look up user data through the response store index
+        user_data = RESPONSE_STORE.get(user_name)
 
         if not user_data:
             raise HTTPException(
@@ -782,17 +1182,30 @@ async def get_personality_analysis(user_name: str):
         [Content]
         """
 
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a career counselor specializing in Holland Code analysis."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.7
-        )
+        async def complete() -> str:
+            response = await LLM.chat(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are a career counselor specializing in Holland Code analysis."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=1500,
+                temperature=0.7
+            )
+            return response.choices[0].message.content
 
-        analysis = response.choices[0].message.content
+        try:
+            analysis = await LLM_BUDGETS["get_personality_analysis"].run(complete)
+        except Exception as e:
+            # Slow or failed completion: answer from local data instead
+            print(f"Error in get_personality_analysis, answering from local data: {str(e)}")
+            return {
+                "user_name": user_name,
+                "holland_codes": holland_codes,
+                "analysis": local_personality_analysis(holland_codes[0] or user_data.get('holland_codes', ''),
+                                                       matching_industries),
+                **(await local_recommendations(user_data))
+            }
 
         return {
             "user_name": user_name,
@@ -808,149 +1221,246 @@ async def get_personality_analysis(user_name: str):
         )
 
 
-@app.post("/chat/{user_name}")
-async def chat_with_bot(user_name: str, chat_input: ChatMessage):  # Removed async
-    """Chat with the career counseling bot"""
-    try:
-        # Load user data
-        try:
-            with open('survey_responses.json', 'r', encoding='utf-8') as f:
-                stored_responses = json.load(f)
-                user_data = stored_responses.get(user_name)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error reading survey_responses.json: {str(e)}")
-            raise HTTPException(
-                status_code=404,
-                detail="Survey data not found"
-            )
+def chat_profile(user_name: str) -> Dict[str, Any]:
+    """Survey results a chat conversation is about, validated"""
+    # Look up user data through the response store index
+    user_data = RESPONSE_STORE.get(user_name)
 
-        if not user_data:
-            raise HTTPException(
-                status_code=404,
-                detail="User not found"
-            )
+    if not user_data:
+        raise HTTPException(
+            status_code=404,
+            detail="User not found"
+        )
 
-        # Get user profile data
-        holland_code = user_data.get('holland_code', '')
-        all_holland_codes = user_data.get('all_holland_codes', '')
-        matching_industries = user_data.get('matching_industries', [])
-        dse_scores = user_data.get('dse_scores', [])
-        category_scores = user_data.get('category_scores', {})
+    # Get user profile data
+    holland_code = primary_holland_code(user_data) or ''
+    all_holland_codes = user_data.get('all_holland_codes', '')
+    matching_industries = user_data.get('matching_industries', [])
+    dse_scores = user_data.get('dse_scores', [])
+    category_scores = user_data.get('category_scores', {})
 
-        # Validate required data
-        if not all([holland_code, matching_industries, dse_scores]):
-            raise HTTPException(
-                status_code=400,
-                detail="Missing required user data"
-            )
+    # Validate required data
+    if not all([holland_code, matching_industries, dse_scores]):
+        raise HTTPException(
+            status_code=400,
+            detail="Missing required user data"
+        )
 
-        # Calculate average DSE score safely
-        try:
-            avg_dse_score = sum(float(score) for score in dse_scores) / len(dse_scores)
-        except (TypeError, ValueError, ZeroDivisionError):
+    # Calculate average DSE score safely
+    try:
+        avg_dse_score = sum(float(score) for score in dse_scores) / len(dse_scores)
+    except (TypeError, ValueError, ZeroDivisionError):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid DSE scores"
+        )
+
+    return {
+        "holland_code": holland_code,
+        "all_holland_codes": all_holland_codes,
+        "matching_industries": matching_industries,
+        "avg_dse_score": round(avg_dse_score, 2),
+        "category_scores": category_scores,
+    }
+
+def chat_question(profile: Dict[str, Any], chat_input: ChatMessage) -> str:
+    """The student's message, or the text of the preset question they picked"""
+    holland_code = profile['holland_code']
+    all_holland_codes = profile['all_holland_codes']
+    matching_industries = profile['matching_industries']
+    category_scores = profile['category_scores']
+
+    # Process message or preset question
+    message = chat_input.message
+    preset_question = chat_input.preset_question
+
+    # Define preset questions
+    preset_questions = {
+        1: f"""基於你的Holland Code ({holland_code})和性格特質分數：
+           {category_scores}
+           請分析我應該發展的技能：
+           1. 核心技能
+           2. 輔助技能
+           3. 未來發展潛力
+           4. 實際行動建議""",
+        
+        2: f"""關於這些適合我性格的行業：
+           {', '.join(matching_industries)}
+           請分析：
+           1. 行業特點和發展趨勢
+           2. 入行要求和準備工作
+           3. 職業發展路徑
+           4. 相關進修建議""",
+        
+        3: f"""基於我的Holland Code組合 ({all_holland_codes})，
+           建議我參與什麼課外活動？
+           請從以下角度分析：
+           1. 領導才能發展
+           2. 專業技能提升
+           3. 人際網絡建立
+           4. 實戰經驗累積""",
+        
+        4: f"""關於我的JUPAS選科（DSE預計平均分：{profile['avg_dse_score']}）：
+           1. 現有成績分析
+           2. 提升競爭力建議
+           3. 備選方案規劃
+           4. 面試準備策略"""
+    }
+
+    # Handle preset question
+    if preset_question:
+        if preset_question not in preset_questions:
             raise HTTPException(
                 status_code=400,
-                detail="Invalid DSE scores"
+                detail="Invalid preset question number"
             )
+        message = preset_questions[preset_question]
 
-        # Process message or preset question
-        message = chat_input.message
-        preset_question = chat_input.preset_question
-
-        # Define preset questions
-        preset_questions = {
-            1: f"""基於你的Holland Code ({holland_code})和性格特質分數：
-               {category_scores}
-               請分析我應該發展的技能：
-               1. 核心技能
-               2. 輔助技能
-               3. 未來發展潛力
-               4. 實際行動建議""",
-            
-            2: f"""關於這些適合我性格的行業：
-               {', '.join(matching_industries)}
-               請分析：
-               1. 行業特點和發展趨勢
-               2. 入行要求和準備工作
-               3. 職業發展路徑
-               4. 相關進修建議""",
-            
-            3: f"""基於我的Holland Code組合 ({all_holland_codes})，
-               建議我參與什麼課外活動？
-               請從以下角度分析：
-               1. 領導才能發展
-               2. 專業技能提升
-               3. 人際網絡建立
-               4. 實戰經驗累積""",
-            
-            4: f"""關於我的JUPAS選科（DSE預計平均分：{round(avg_dse_score, 2)}）：
-               1. 現有成績分析
-               2. 提升競爭力建議
-               3. 備選方案規劃
-               4. 面試準備策略"""
-        }
-
-        # Handle preset question
-        if preset_question:
-            if preset_question not in preset_questions:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid preset question number"
-                )
-            message = preset_questions[preset_question]
+    # Validate message
+    if not message or not message.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Message cannot be empty"
+        )
+    return message
+
+def chat_system_prompt(profile: Dict[str, Any]) -> str:
+    """Counselor instructions and the student's profile, sent ahead of every conversation"""
+    return f"""You are a professional career counselor who:
+    1. Has deep knowledge of Holland Codes and career development
+    2. Thinks with both entrepreneurial and creative mindsets
+    3. Provides logical and structured advice
+    4. Always responds in Traditional Chinese
+    5. Focuses on practical and actionable suggestions
+
+    用戶資料：
+    - Holland Code: {profile['holland_code']}
+    - Holland Code組合: {profile['all_holland_codes']}
+    - 匹配行業: {', '.join(profile['matching_industries'])}
+    - DSE平均分: {profile['avg_dse_score']}
+    - 性格特質分數: {profile['category_scores']}
+
+    請就用戶的每個問題提供詳細回應(Do not mention the word "Holland Code" in your resposne)，要求：
+    1. 針對用戶情況
+    2. 提供可行建議
+    3. 保持鼓勵支持
+    4. 重點清晰
+    5. 具體可行
+
+    回應格式：
+    分析：
+    [分析內容]
+
+    建議：
+    [建議內容]
+
+    行動計劃：
+    [具體步驟]
+    """
+
+def chat_request(user_name: str, chat_input: ChatMessage):
+    """Validate a chat request; returns its conversation, the question and the messages for the model.
+
+    Without a session_id a new conversation is set up, but only stored by
+    record_chat_turn once its first reply has arrived.
+    """
+    if chat_input.session_id:
+        session = CHAT_MEMORY.get(chat_input.session_id, user_name)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found or expired")
+        profile = session['profile']
+    else:
+        session, profile = None, chat_profile(user_name)
+
+    question = chat_question(profile, chat_input)
+    if session is None:
+        session = CHAT_MEMORY.new(user_name, profile)
+    return session, question, CHAT_MEMORY.prompt(session, chat_system_prompt(profile), question)
+
+async def summarize_chat(summary: str, turns: List[Dict[str, str]]) -> str:
+    """Merge older chat turns into the conversation's rolling summary"""
+    transcript = "\n".join(
+        f"{'學生' if turn['role'] == 'user' else '顧問'}：{turn['content']}" for turn in turns)
+    prompt = f"""
+    以下是一段升學及職業輔導對話的較早部分。請把「之前的摘要」和「新對話」合併成一份不超過300字的繁體中文摘要，
+    保留學生提及的目標、興趣、顧慮、顧問已給出的主要建議，以及仍未解決的問題。
+
+    之前的摘要：
+    {summary or "（無）"}
+
+    新對話：
+    {transcript}
+    """
+    return await LLM.complete(
+        model=CHAT_SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": "You summarize career counseling conversations accurately and concisely."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=800,
+        temperature=0.3
+    )
+
+def record_chat_turn(session: Dict[str, Any], question: str, reply: str, new: bool = False):
+    """Store an exchange and start compacting the conversation in the background once it is over budget.
+
+    A new conversation is stored here, with its first exchange, so a
+    request that fails leaves nothing behind.
+    """
+    session_id = session["session_id"]
+    if new:
+        CHAT_MEMORY.save(session)
+    session = CHAT_MEMORY.append(session_id, question, reply)
+    if session is None or not CHAT_MEMORY.needs_compaction(session):
+        return
+    task = asyncio.ensure_future(CHAT_COMPACTIONS.do(
+        session_id, lambda: CHAT_MEMORY.compact(session_id, summarize_chat)))
+    CHAT_COMPACTION_TASKS.add(task)
+    task.add_done_callback(CHAT_COMPACTION_TASKS.discard)
+
+@app.post("/chat/{user_name}/sessions")
+async def create_chat_session(user_name: str):
+    """Start a conversation; pass its session_id with each message to continue it"""
+    session = CHAT_MEMORY.create(user_name, chat_profile(user_name))
+    return {"session_id": session["session_id"], "user_name": user_name}
+
+@app.get("/chat/{user_name}/sessions/{session_id}")
+async def get_chat_session(user_name: str, session_id: str):
+    """Summary of the older turns of a conversation and its recent turns verbatim"""
+    session = CHAT_MEMORY.get(session_id, user_name)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {
+        "session_id": session_id,
+        "user_name": user_name,
+        "summary": session["summary"],
+        "turns": session["turns"],
+        "summarized_turns": session["summarized_turns"],
+        "history_tokens": CHAT_MEMORY.history_tokens(session)
+    }
+
+@app.delete("/chat/{user_name}/sessions/{session_id}")
+async def delete_chat_session(user_name: str, session_id: str):
+    if CHAT_MEMORY.get(session_id, user_name) is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    CHAT_SESSION_STORE.delete(session_id)
+    return {"status": "success"}
 
-        # Validate message
-        if not message or not message.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Message cannot be empty"
-            )
+@app.post("/chat/{user_name}")
+async def chat_with_bot(user_name: str, chat_input: ChatMessage):  # Removed async
+    """Chat with the career counseling bot.
 
-        # Create chat prompt
-        prompt = f"""
-        用戶資料：
-        - Holland Code: {holland_code}
-        - Holland Code組合: {all_holland_codes}
-        - 匹配行業: {', '.join(matching_industries)}
-        - DSE平均分: {round(avg_dse_score, 2)}
-        - 性格特質分數: {category_scores}
-
-        用戶問題：{message}
-
-        請提供詳細回應(Do not mention the word "Holland Code" in your resposne)，要求：
-        1. 針對用戶情況
-        2. 提供可行建議
-        3. 保持鼓勵支持
-        4. 重點清晰
-        5. 具體可行
-
-        回應格式：
-        分析：
-        [分析內容]
-
-        建議：
-        [建議內容]
-
-        行動計劃：
-        [具體步驟]
-        """
+    Replies carry a session_id; sending it back with the next message
+    continues the conversation with its earlier turns in context.
+    """
+    try:
+        session, question, messages = chat_request(user_name, chat_input)
 
         # Call OpenAI API
         try:
-            response = client.chat.completions.create(
+            response = await LLM.chat(
                 model="gpt-4",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """You are a professional career counselor who:
-                        1. Has deep knowledge of Holland Codes and career development
-                        2. Thinks with both entrepreneurial and creative mindsets
-                        3. Provides logical and structured advice
-                        4. Always responds in Traditional Chinese
-                        5. Focuses on practical and actionable suggestions"""
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 max_tokens=2000,
                 temperature=0.7
             )
@@ -961,10 +1471,13 @@ async def chat_with_bot(user_name: str, chat_input: ChatMessage):  # Removed asy
                     detail="No response generated"
                 )
 
+            reply = response.choices[0].message.content
+            record_chat_turn(session, question, reply, new=not chat_input.session_id)
             return {
                 "status": "success",
-                "response": response.choices[0].message.content,
-                "preset_question": preset_question
+                "response": reply,
+                "preset_question": chat_input.preset_question,
+                "session_id": session["session_id"]
             }
 
         except Exception as e:
@@ -981,4 +1494,30 @@ async def chat_with_bot(user_name: str, chat_input: ChatMessage):  # Removed asy
         raise HTTPException(
             status_code=500,
             detail="Internal server error"
-        )
\ No newline at end of file
+        )
+
+@app.post("/chat/{user_name}/stream")
+async def stream_chat_with_bot(user_name: str, chat_input: ChatMessage):
+    """Chat with the career counseling bot, streaming the reply as Server-Sent Events.
+
+    The `done` event carries the session_id to continue with; an `error`
+    event carries the request's own session_id, None for a new conversation,
+    which is not started when its first reply fails.
+    """
+    session, question, messages = chat_request(user_name, chat_input)
+
+    async def events():
+        content = []
+        async for text in LLM.stream(model="gpt-4", messages=messages, max_tokens=2000, temperature=0.7):
+            content.append(text)
+            yield sse_event("token", {"text": text})
+        reply = ''.join(content)
+        record_chat_turn(session, question, reply, new=not chat_input.session_id)
+        yield sse_event("done", {
+            "status": "success",
+            "response": reply,
+            "preset_question": chat_input.preset_question,
+            "session_id": session["session_id"]
+        })
+
+    return sse_response(events(), "stream_chat_with_bot", {"session_id": chat_input.session_id})
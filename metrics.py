@@ -0,0 +1,281 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Histograms keep fixed cumulative buckets per label set, so recording a
+sample is one bisect and a few additions under a lock; nothing is kept
+per request. Each worker process has its own registry, so scrape every
+worker (or run one) to see the whole picture.
+"""
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; from in-memory lookups up to long LLM completions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# ASGI scope of the request being handled, so code deep in a handler can
+# label what it records with the route
+CURRENT_SCOPE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    'ontrack_current_scope', default=None)
+
+LabelKey = Tuple[str, ...]
+INF = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        """Context manager recording the time spent in its block"""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {_number(cumulative)}")
+            cumulative += values[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, INF)} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {values[-1]!r}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {_number(cumulative)}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Registry:
+    """Metrics plus collectors that turn existing stats() dicts into samples at scrape time.
+
+    Collected samples named *_total are exposed as counters, the rest as gauges.
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+        """Register fn returning (name, help, labels, value) gauge samples; usable as a decorator"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        gauges: Dict[str, Tuple[str, List[str]]] = {}
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+                continue
+            for name, help, labels, value in samples:
+                if value is None:
+                    continue
+                _, samples_for_name = gauges.setdefault(name, (help, []))
+                samples_for_name.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        for name, (help, samples) in gauges.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram: Histogram, **labels: str) -> Callable:
+    """Decorator recording each call's duration; works on sync and async functions"""
+    def decorate(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument_methods(obj: Any, methods: Iterable[str], histogram: Histogram, **labels: str):
+    """Replace each named method on the instance `obj` with a timed wrapper"""
+    for name in methods:
+        method = getattr(obj, name, None)
+        if method is not None:
+            setattr(obj, name, timed(histogram, operation=name, **labels)(method))
+
+
+def route_template(scope: Optional[Dict[str, Any]], default: str = "other") -> str:
+    """Path template of the route matched for a request, e.g. /chat/{user_name}"""
+    route = scope.get('route') if scope is not None else None
+    return getattr(route, 'path', None) or default
+
+
+def current_route(default: str = "other") -> str:
+    """Route template of the request being handled in this context"""
+    return route_template(CURRENT_SCOPE.get(), default)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status.
+
+    The time runs until the last body chunk is sent, so streamed responses
+    are measured to their end rather than to their headers. Paths that
+    match no route are counted under "other" to keep label values bounded.
+    """
+
+    def __init__(self, app, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+        token = CURRENT_SCOPE.set(scope)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status["code"] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            CURRENT_SCOPE.reset(token)
+            self.histogram.observe(time.perf_counter() - start, method=scope.get('method', ''),
+                                   route=route_template(scope), status=str(status["code"]))
+
+
+def instrument_gateway(gateway: Any, latency: Histogram, first_token: Histogram, tokens: Counter):
+    """Time an LLMGateway's calls per model and count tokens per model and route.
+
+    `chat` (which `complete` goes through) is timed whole; for `stream` the
+    time to the first text delta goes to `first_token` and the time to the
+    end of the stream to `latency`.
+    """
+    chat = gateway.chat
+    stream = gateway.stream
+
+    @functools.wraps(chat)
+    async def timed_chat(*args, **kwargs):
+        model = kwargs.get('model', args[0] if args else '')
+        with latency.time(model=model, call="chat"):
+            return await chat(*args, **kwargs)
+
+    @functools.wraps(stream)
+    async def timed_stream(*args, **kwargs):
+        model = kwargs.get('model', args[0] if args else '')
+        start = time.perf_counter()
+        first = True
+        try:
+            async for text in stream(*args, **kwargs):
+                if first:
+                    first_token.observe(time.perf_counter() - start, model=model)
+                    first = False
+                yield text
+        finally:
+            latency.observe(time.perf_counter() - start, model=model, call="stream")
+
+    def count_tokens(model: str, usage: Any):
+        route = current_route("background")
+        for kind in ("prompt_tokens", "completion_tokens"):
+            count = getattr(usage, kind, None)
+            if count:
+                tokens.inc(count, route=route, model=model, kind=kind.split('_')[0])
+
+    gateway.chat = timed_chat
+    gateway.stream = timed_stream
+    gateway.usage_hooks.append(count_tokens)
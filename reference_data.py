@@ -0,0 +1,144 @@
+"""Reference data (questions, industry mapping, JUPAS programs) and its compiled snapshot.
+
+Parsing the YAML files with PyYAML dominates worker start-up, so
+`python reference_data.py` compiles them, together with the prebuilt
+lookup indexes, into one pickle snapshot stamped with a format version
+and the SHA-256 of every input file. At start-up the snapshot is used only
+if both still match; otherwise the YAML is parsed and indexed as before.
+`build_data.py` writes the same snapshot from Holland_industry.xlsx. The
+snapshot is a local build artifact and is trusted like its inputs.
+"""
+import hashlib
+import os
+import pickle
+import sys
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from indexes import IndustryIndex, JupasIndex
+
+SNAPSHOT_VERSION = 4
+SNAPSHOT_PATH = 'reference_data.snapshot'
+
+# Name in the loaded data -> source file
+SOURCES = {
+    'questions_pool': 'questions_pool.yaml',
+    'industry_mapping': 'industry_mapping.yaml',
+    'jupas': 'jupas.yaml',
+}
+
+
+def _source_path(base_dir: str, filename: str) -> str:
+    return os.path.join(base_dir, filename)
+
+
+def file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_hashes(base_dir: str = '.', sources: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """SHA-256 of each input file's bytes, keyed by file name"""
+    sources = sources or SOURCES
+    return {filename: file_hash(_source_path(base_dir, filename)) for filename in sources.values()}
+
+
+def clean_jupas(jupas: Any) -> Dict[str, List[Dict[str, Any]]]:
+    """JUPAS programs keyed by stripped industry name, without unnamed ('nan') industries"""
+    cleaned = {}
+    for industry, programs in (jupas or {}).items():
+        name = str(industry).strip()
+        if not name or name.lower() == 'nan':
+            continue
+        cleaned[name] = list(programs or [])
+    return cleaned
+
+
+def reference_payload(questions_pool: Any, industry_mapping: Any, jupas: Any) -> Dict[str, Any]:
+    """Reference data in the form the server uses, whichever tool read it.
+
+    Every path to a ReferenceSet goes through here: parsing the YAML at
+    start-up, `compile_snapshot` and build_data.py, so a snapshot holds the
+    same data whichever of them wrote it.
+    """
+    return {
+        'questions_pool': list(questions_pool or []),
+        'industry_mapping': list(industry_mapping or []),
+        'jupas': clean_jupas(jupas),
+    }
+
+
+def load_yaml_sources(base_dir: str = '.') -> Dict[str, Any]:
+    """Parse the YAML sources the slow way"""
+    data = {}
+    for name, filename in SOURCES.items():
+        with open(_source_path(base_dir, filename), 'r', encoding='utf-8') as file:
+            data[name] = yaml.safe_load(file)
+    return reference_payload(data['questions_pool']["questions"], data['industry_mapping'], data['jupas'])
+
+
+def build_indexes(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Lookup indexes the server uses, built from loaded reference data"""
+    return {
+        'industry_index': IndustryIndex.from_mapping(data['industry_mapping']),
+        'jupas_index': JupasIndex.from_data(data['jupas']),
+    }
+
+
+def write_snapshot(data: Dict[str, Any], sources: Dict[str, str], base_dir: str = '.',
+                   snapshot_path: Optional[str] = None) -> str:
+    """Write data and its indexes to a snapshot tied to the given input files; returns its path"""
+    snapshot_path = snapshot_path or _source_path(base_dir, SNAPSHOT_PATH)
+    data = reference_payload(data['questions_pool'], data['industry_mapping'], data['jupas'])
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "hashes": source_hashes(base_dir, sources),
+        "data": data,
+        "indexes": build_indexes(data),
+    }
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def compile_snapshot(base_dir: str = '.', snapshot_path: Optional[str] = None) -> str:
+    """Parse the YAML sources and write them to a versioned snapshot; returns its path"""
+    return write_snapshot(load_yaml_sources(base_dir), SOURCES, base_dir, snapshot_path)
+
+
+def load_snapshot(base_dir: str = '.', snapshot_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Data and indexes from the snapshot, or None if it is missing, unreadable or stale"""
+    snapshot_path = snapshot_path or _source_path(base_dir, SNAPSHOT_PATH)
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    try:
+        current = {filename: file_hash(_source_path(base_dir, filename)) for filename in snapshot["hashes"]}
+    except OSError:
+        return None
+    if current != snapshot["hashes"]:
+        return None
+    return {**snapshot["data"], **snapshot["indexes"]}
+
+
+def load_reference_data(base_dir: str = '.', snapshot_path: Optional[str] = None) -> Dict[str, Any]:
+    """Questions, industry mapping, JUPAS data and their indexes, from the snapshot when it is current"""
+    data = load_snapshot(base_dir, snapshot_path)
+    if data is None:
+        data = load_yaml_sources(base_dir)
+        data.update(build_indexes(data))
+    return data
+
+
+if __name__ == '__main__':
+    path = compile_snapshot(*sys.argv[1:2])
+    print(f"Wrote {path}")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from indexes import IndustryIndex, JupasIndex
+from reference_data import SNAPSHOT_PATH, SOURCES, build_indexes, load_reference_data
+from scoring import SurveyScorer
+from storage import file_signature
+
+
+def questions_version(questions_pool: List[Dict[str, Any]]) -> str:
+    """Short fingerprint of the question pool, stored with sessions that index into it"""
+    text = "\n".join(f"{q.get('category')}\t{q.get('question')}" for q in questions_pool)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class ReferenceSet:
+    """One consistent generation of reference data and everything derived from it.
+
+    Never mutated after construction: a request takes `REFERENCE.current`
+    once and keeps using that object, so a reload that swaps in a new set
+    mid-request cannot mix old questions with new indexes.
+    """
+
+    __slots__ = ('questions_pool', 'industry_mapping', 'jupas', 'industry_index', 'jupas_index',
+                 'scorer', 'questions_version', 'loaded_at')
+
+    def __init__(self, questions_pool: List[Dict[str, Any]], industry_mapping: List[Dict[str, Any]],
+                 jupas: Dict[str, List[Dict[str, Any]]], industry_index: IndustryIndex,
+                 jupas_index: JupasIndex):
+        self.questions_pool = questions_pool
+        self.industry_mapping = industry_mapping
+        self.jupas = jupas
+        self.industry_index = industry_index
+        self.jupas_index = jupas_index
+        self.scorer = SurveyScorer(questions_pool, industry_index)
+        self.questions_version = questions_version(questions_pool)
+        self.loaded_at = time.time()
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> "ReferenceSet":
+        if 'industry_index' not in data or 'jupas_index' not in data:
+            data = {**data, **build_indexes(data)}
+        return cls(data['questions_pool'], data['industry_mapping'], data['jupas'],
+                   data['industry_index'], data['jupas_index'])
+
+    @classmethod
+    def empty(cls) -> "ReferenceSet":
+        return cls.from_data({'questions_pool': [], 'industry_mapping': [], 'jupas': {}})
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "questions": len(self.questions_pool),
+            "questions_version": self.questions_version,
+            "industries": len(self.industry_mapping),
+            "jupas_industries": len(self.jupas),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ReloadableReference:
+    """Holds the current ReferenceSet and replaces it without a restart.
+
+    `reload` parses and indexes the files into a complete new set before
+    publishing it with a single reference assignment, so readers see either
+    the old set or the new one and never wait on a lock. A failed or empty
+    load keeps the old set. With `watch_interval` > 0 a daemon thread polls
+    the source files and reloads once a change has stayed put for one
+    interval, so a file caught half-written is not picked up.
+
+    The last `keep_versions` sets with a different question pool are kept
+    so sessions that started on one can finish on it (see `for_version`).
+    """
+
+    def __init__(self, base_dir: str = '.', watch_interval: float = 0.0, keep_versions: int = 4):
+        self.base_dir = base_dir
+        self.watch_interval = watch_interval
+        self.keep_versions = keep_versions
+        self._previous: "OrderedDict[str, ReferenceSet]" = OrderedDict()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._signature = self.signature()
+        try:
+            self.current = ReferenceSet.from_data(load_reference_data(base_dir))
+        except Exception as e:
+            print(f"Error loading reference data: {e}")
+            self.last_error = str(e)
+            self.current = ReferenceSet.empty()
+
+    def signature(self):
+        paths = [os.path.join(self.base_dir, filename) for filename in SOURCES.values()]
+        return file_signature(*paths, os.path.join(self.base_dir, SNAPSHOT_PATH))
+
+    def reload(self) -> ReferenceSet:
+        """Load the files into a new set and swap it in; raises and keeps the old set on failure"""
+        with self._reload_lock:
+            signature = self.signature()
+            try:
+                reference = ReferenceSet.from_data(load_reference_data(self.base_dir))
+                if not reference.questions_pool or not reference.industry_mapping:
+                    raise ValueError("reference data has no questions or no industries")
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            previous = self.current
+            if previous.questions_pool and previous.questions_version != reference.questions_version:
+                self._previous[previous.questions_version] = previous
+                self._previous.move_to_end(previous.questions_version)
+                while len(self._previous) > self.keep_versions:
+                    self._previous.popitem(last=False)
+            self._previous.pop(reference.questions_version, None)
+            self.current = reference
+            self._signature = signature
+            self.reloads += 1
+            self.last_error = None
+            return reference
+
+    def for_version(self, version: Optional[str]) -> Optional[ReferenceSet]:
+        """The set whose question pool has this version (the current one for None), or None if it is gone"""
+        current = self.current
+        if version is None or version == current.questions_version:
+            return current
+        return self._previous.get(version)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.current.info(),
+            "previous_versions": list(self._previous),
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "watch_interval": self.watch_interval,
+        }
+
+    def start_background_tasks(self):
+        """Watch the source files from a daemon thread when a watch interval is set"""
+        if self._watcher is not None or self.watch_interval <= 0:
+            return
+
+        def run():
+            pending = None
+            while not self._stop.wait(self.watch_interval):
+                signature = self.signature()
+                if signature == self._signature:
+                    pending = None
+                elif signature != pending:
+                    pending = signature  # Changed; wait one interval for writes to settle
+                else:
+                    try:
+                        self.reload()
+                        print("Reloaded reference data")
+                    except Exception as e:
+                        print(f"Error reloading reference data: {str(e)}")
+                        self._signature = signature  # Retry only after the next change
+                    pending = None
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=run, name="reference-watcher", daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from storage import ResponseStore
+
+
+class CachedResponseStore(ResponseStore):
+    """Process-wide cache of parsed surveys in front of another ResponseStore.
+
+    Entries are kept per user in LRU order, so the common read is a dict
+    lookup with no disk I/O or JSON parsing. Before each read the backend's
+    file signature is compared with the one seen last; a change made by
+    another worker (or a compaction) drops the whole cache, while writes
+    made through this object update their own entry in place.
+    """
+
+    def __init__(self, store: ResponseStore, max_entries: int = 2048):
+        self.store = store
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._version = self.store.version()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        version = self.store.version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+            self.invalidations += 1
+
+    def _remember(self, user_name: str, user_data: Optional[Dict[str, Any]]):
+        self._entries[user_name] = user_data
+        self._entries.move_to_end(user_name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, user_name: str) -> Optional[Dict[str, Any]]:
+        """Return the cached survey for a user; callers must treat it as read-only"""
+        with self._lock:
+            self._check_version()
+            if user_name in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(user_name)
+                return self._entries[user_name]
+            self.misses += 1
+            version = self._version
+        user_data = self.store.get(user_name)
+        with self._lock:
+            # Only cache the read if nothing was written while it ran
+            if self._version == version:
+                self._remember(user_name, user_data)
+        return user_data
+
+    def put(self, user_name: str, user_data: Dict[str, Any]):
+        self.put_many({user_name: user_data})
+
+    def put_many(self, responses: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            before = self.store.version()
+            self.store.put_many(responses)
+            if before != self._version:
+                # Someone else wrote too; their records are not in the cache
+                self._entries.clear()
+                self.invalidations += 1
+            for user_name, user_data in responses.items():
+                self._remember(user_name, user_data)
+            self._version = self.store.version()
+
+    def evict(self, user_name: str):
+        """Drop one user's entry; the next read goes to the backend"""
+        with self._lock:
+            self._entries.pop(user_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = self.store.version()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def users(self) -> Iterator[str]:
+        return self.store.users()
+
+    def find_by_holland_code(self, holland_code: str, limit: int = 100) -> List[str]:
+        return self.store.find_by_holland_code(holland_code, limit)
+
+    def iter_items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Bulk reads go straight to the backend so they do not flush the cache
+        return self.store.iter_items()
+
+    def __contains__(self, user_name: str) -> bool:
+        return self.get(user_name) is not None
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def version(self):
+        return self.store.version()
+
+    def start_background_tasks(self):
+        self.store.start_background_tasks()
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Any
+
+from storage import ResponseStore, file_signature, primary_holland_code
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+
+class LogResponseStore(ResponseStore):
+    """Append-only store of finished surveys with an in-memory offset index.
+
+    Every submission appends one JSON line to the log, so a write costs the
+    same no matter how many students are stored. The index maps each
+    user_name to the (offset, length) of its latest record, so reads are a
+    single positioned read instead of parsing the whole file. Superseded
+    records are dropped by `compact`, which can run in a background thread.
+    """
+
+    def __init__(self, path: str = 'survey_responses.jsonl',
+                 legacy_path: Optional[str] = 'survey_responses.json'):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._codes: Dict[str, Optional[str]] = {}
+        self._by_code: Dict[str, Set[str]] = {}
+        self._records = 0  # Lines in the log, including superseded ones
+        self._indexed_size = 0
+        self._inode = None
+        self._fd = None
+        self._compactor = None
+        self._stop = threading.Event()
+        self._lock_fd = None
+        self._open()
+
+    def _open(self):
+        """Open the log, importing the legacy JSON file on first use"""
+        if fcntl is not None:
+            # Locking a sidecar file keeps the lock valid across compactions
+            self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        with self._file_lock():
+            if not os.path.exists(self.path):
+                self._import_legacy()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._rebuild_index()
+
+    def _import_legacy(self):
+        """Seed the log from survey_responses.json written by older versions"""
+        if not self.legacy_path:
+            return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                stored_responses = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for user_name, user_data in stored_responses.items():
+                f.write(self._encode(user_name, user_data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across worker processes sharing the log"""
+        if self._lock_fd is None:
+            yield
+            return
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _encode(user_name: str, user_data: Dict[str, Any]) -> bytes:
+        record = {"user_name": user_name, "data": user_data}
+        return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+    def _rebuild_index(self):
+        """Rebuild the offset index from scratch by scanning the log"""
+        self._index = {}
+        self._codes = {}
+        self._by_code = {}
+        self._records = 0
+        self._indexed_size = 0
+        st = os.fstat(self._fd)
+        self._inode = st.st_ino
+        self._scan_from(0)
+
+    def _scan_from(self, offset: int):
+        """Index records appended after `offset` (by us or another worker)"""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            position = offset
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Torn write from a crash; ignore the partial record
+                    break
+                try:
+                    record = json.loads(line)
+                    user_name = record["user_name"]
+                    user_data = record["data"]
+                except (ValueError, KeyError, TypeError):
+                    position += len(line)
+                    continue
+                self._index_record(user_name, user_data, position, len(line))
+                position += len(line)
+        self._indexed_size = position
+
+    def _index_record(self, user_name: str, user_data: Dict[str, Any], offset: int, length: int):
+        old_code = self._codes.get(user_name)
+        if old_code is not None:
+            self._by_code[old_code].discard(user_name)
+        code = primary_holland_code(user_data)
+        if code is not None:
+            self._by_code.setdefault(code, set()).add(user_name)
+        self._codes[user_name] = code
+        self._index[user_name] = (offset, length)
+        self._records += 1
+
+    def _refresh(self):
+        """Pick up records written by other processes since the last scan"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode:
+            # Another worker compacted the log; reopen the new file
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            self._rebuild_index()
+        elif st.st_size > self._indexed_size:
+            self._scan_from(self._indexed_size)
+
+    def get(self, user_name: str) -> Optional[Dict[str, Any]]:
+        """Return the latest stored survey for a user, or None"""
+        with self._lock:
+            self._refresh()
+            location = self._index.get(user_name)
+            if location is None:
+                return None
+            offset, length = location
+            line = os.pread(self._fd, length, offset)
+        return json.loads(line)["data"]
+
+    def put(self, user_name: str, user_data: Dict[str, Any]):
+        """Append a survey for a user, superseding any earlier one"""
+        self.put_many({user_name: user_data})
+
+    def put_many(self, responses: Dict[str, Dict[str, Any]]):
+        """Append several surveys with a single write"""
+        lines = [(u, d, self._encode(u, d)) for u, d in responses.items()]
+        with self._lock, self._file_lock():
+            self._refresh()
+            # A torn tail from a crash must not swallow the new records
+            if os.fstat(self._fd).st_size > self._indexed_size:
+                os.truncate(self.path, self._indexed_size)
+            os.write(self._fd, b''.join(line for _, _, line in lines))
+            os.fsync(self._fd)
+            offset = self._indexed_size
+            for user_name, user_data, line in lines:
+                self._index_record(user_name, user_data, offset, len(line))
+                offset += len(line)
+            self._indexed_size = offset
+
+    def __contains__(self, user_name: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return user_name in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+    def users(self) -> Iterator[str]:
+        with self._lock:
+            self._refresh()
+            return iter(list(self._index))
+
+    def find_by_holland_code(self, holland_code: str, limit: int = 100) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._by_code.get(holland_code, ()))[:limit]
+
+    def version(self):
+        return file_signature(self.path)
+
+    def start_background_tasks(self):
+        self.start_compactor()
+
+    def needs_compaction(self, min_records: int = 1000, ratio: float = 2.0) -> bool:
+        with self._lock:
+            return self._records >= min_records and self._records > ratio * len(self._index)
+
+    def compact(self):
+        """Rewrite the log keeping only the latest record of each user"""
+        with self._lock, self._file_lock():
+            self._refresh()
+            tmp_path = self.path + '.compact'
+            with open(tmp_path, 'wb') as f:
+                for offset, length in sorted(self._index.values()):
+                    f.write(os.pread(self._fd, length, offset))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            self._rebuild_index()
+
+    def start_compactor(self, interval: float = 60.0):
+        """Compact the log periodically from a daemon thread"""
+        if self._compactor is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    if self.needs_compaction():
+                        self.compact()
+                except Exception as e:
+                    print(f"Error compacting {self.path}: {str(e)}")
+
+        self._stop.clear()
+        self._compactor = threading.Thread(target=run, name="response-log-compactor", daemon=True)
+        self._compactor.start()
+
+    def close(self):
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5)
+            self._compactor = None
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
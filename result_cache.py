@@ -0,0 +1,217 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_used_at ON results (used_at);
+"""
+
+GET_RESULT = "SELECT created_at, used_at, data FROM results WHERE key = ?"
+TOUCH_RESULT = "UPDATE results SET used_at = ? WHERE key = ?"
+PUT_RESULT = """
+INSERT INTO results (key, created_at, used_at, data) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    created_at = excluded.created_at,
+    used_at = excluded.used_at,
+    data = excluded.data
+"""
+DELETE_RESULT = "DELETE FROM results WHERE key = ?"
+DELETE_EXPIRED = "DELETE FROM results WHERE created_at < ?"
+COUNT_RESULTS = "SELECT COUNT(*) FROM results"
+# Drop the least recently used rows beyond the size limit
+TRIM_RESULTS = """
+DELETE FROM results WHERE key IN (
+    SELECT key FROM results ORDER BY used_at DESC LIMIT -1 OFFSET ?
+)
+"""
+
+
+class ResultCache:
+    """Two-tier cache of JSON-serializable results with TTL and size eviction.
+
+    The first tier is an in-process LRU of up to `max_entries` values; the
+    second is an SQLite file shared by every worker and kept across restarts,
+    trimmed to `max_disk_entries` least recently used rows. Entries older
+    than `ttl` seconds are treated as missing in both tiers. A disk hit
+    only rewrites the row's last-use time once it is `touch_interval`
+    seconds old, so repeated hits do not each cost a write.
+
+    The memory tier and the SQLite file have separate locks, so memory hits
+    never wait on disk I/O. Async code should use `aget`, `aput` and
+    `acontains`, which answer memory hits inline and run disk work in a
+    thread, keeping it off the event loop.
+    """
+
+    def __init__(self, path: Optional[str], max_entries: int = 256,
+                 max_disk_entries: int = 10000, ttl: float = 30 * 24 * 3600,
+                 touch_interval: float = 60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()  # Memory tier and counters
+        self._db_lock = threading.Lock()  # SQLite connection
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._conn = None
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        return json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+
+    def _remember(self, key: str, created_at: float, value: Any):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _get_memory(self, key: str, now: float) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[Any]:
+        value = None
+        with self._db_lock:
+            if self._conn is not None:
+                row = self._conn.execute(GET_RESULT, (key,)).fetchone()
+                if row is not None and now - row[0] <= self.ttl:
+                    if now - row[1] >= self.touch_interval:
+                        self._conn.execute(TOUCH_RESULT, (now, key))
+                    value = json.loads(row[2])
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self._remember(key, row[0], value)
+            self.disk_hits += 1
+            return value
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            return value
+        return self._get_disk(key, now)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """`get` for async code: disk lookups run in a thread"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            return value
+        if self._conn is None:
+            return self._get_disk(key, now)
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    def _contains_memory(self, key: str, now: float) -> bool:
+        with self._lock:
+            entry = self._memory.get(key)
+            return entry is not None and now - entry[0] <= self.ttl
+
+    def _contains_disk(self, key: str, now: float) -> bool:
+        with self._db_lock:
+            if self._conn is None:
+                return False
+            row = self._conn.execute(GET_RESULT, (key,)).fetchone()
+        return row is not None and now - row[0] <= self.ttl
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` has an unexpired value, without counting a lookup or touching it"""
+        now = time.time()
+        return self._contains_memory(key, now) or self._contains_disk(key, now)
+
+    async def acontains(self, key: str) -> bool:
+        now = time.time()
+        if self._contains_memory(key, now):
+            return True
+        if self._conn is None:
+            return False
+        return await asyncio.to_thread(self._contains_disk, key, now)
+
+    def _put_disk(self, key: str, now: float, data: str):
+        with self._db_lock:
+            if self._conn is None:
+                return
+            self._conn.execute(PUT_RESULT, (key, now, now, data))
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._trim(now)
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, now, value)
+        self._put_disk(key, now, data)
+
+    async def aput(self, key: str, value: Any):
+        """`put` for async code: the value is in memory at once and written to disk in a thread"""
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, now, value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._put_disk, key, now, data)
+
+    def _trim(self, now: float):
+        self._conn.execute(DELETE_EXPIRED, (now - self.ttl,))
+        self._conn.execute(TRIM_RESULTS, (self.max_disk_entries,))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.execute(DELETE_RESULT, (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        disk_entries = None
+        with self._db_lock:
+            if self._conn is not None:
+                disk_entries = self._conn.execute(COUNT_RESULTS).fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._trim(time.time())
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,61 @@
+import random
+from array import array
+from typing import Any, Dict, Optional
+
+PAGE_SIZE = 10
+FIRST_QUESTION_PAGE = 2
+
+
+class QuestionSampler:
+    """Per-session question order for survey pages 2-5.
+
+    Each session draws one shuffled permutation of question indices, kept
+    as an unsigned short array (2 bytes per question). Page p is a fixed
+    slice of it, so handing out a page costs O(page size), reloading a page
+    shows the same questions, and answer position i always belongs to
+    question order[i]. `served` is the length of the prefix handed out so far.
+    `version` identifies the question pool the indices point into.
+    """
+
+    __slots__ = ('order', 'served', 'version')
+
+    def __init__(self, order: array, served: int = 0, version: Optional[str] = None):
+        self.order = order
+        self.served = served
+        self.version = version
+
+    @classmethod
+    def new(cls, pool_size: int, seed: Optional[int] = None, version: Optional[str] = None) -> "QuestionSampler":
+        order = list(range(pool_size))
+        random.Random(seed).shuffle(order)
+        return cls(array('H', order), version=version)
+
+    @classmethod
+    def from_session(cls, session: Dict[str, Any], pool_size: int,
+                     version: Optional[str] = None) -> "QuestionSampler":
+        """The session's sampler, starting a new one if it has none or the pool changed"""
+        order = session.get('question_order')
+        session_version = session.get('questions_version')
+        if (order is None or len(order) != pool_size
+                or (version and session_version and session_version != version)):
+            return cls.new(pool_size, version=version)
+        return cls(array('H', order), session.get('served', 0), version)
+
+    def save(self, session: Dict[str, Any]):
+        session['question_order'] = self.order
+        session['served'] = self.served
+        if self.version is not None:
+            session['questions_version'] = self.version
+
+    def page(self, page_number: int, page_size: int = PAGE_SIZE) -> array:
+        """Question indices for a page; raises ValueError if the pool runs out"""
+        start = (page_number - FIRST_QUESTION_PAGE) * page_size
+        end = start + page_size
+        if start < 0 or end > len(self.order):
+            raise ValueError("Not enough unique questions remaining")
+        self.served = max(self.served, end)
+        return self.order[start:end]
+
+    def served_indices(self) -> array:
+        """Question index of each answer position handed out so far"""
+        return self.order[:self.served]
@@ -0,0 +1,164 @@
+from itertools import permutations
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from indexes import IndustryIndex
+
+# Columns of the category matrix; alphabetical so a stable sort on counts
+# breaks ties by letter, as submit_survey always has
+CATEGORIES = ("A", "C", "E", "I", "R", "S")
+
+# Answers 0-5 are the name and DSE scores; yes/no answers start after them
+ANSWER_OFFSET = 6
+
+
+def generate_code(max_categories, second_max_categories, third_max_categories):
+    """Generate OnTrack code"""
+    if len(max_categories) == 2:
+        permutations_result = [''.join(p) + second_max_categories[0] for p in permutations(max_categories, 2)]
+        return " / ".join(permutations_result)
+    elif len(max_categories) >= 3:
+        permutations_result = [''.join(p) for p in permutations(max_categories, 3)]
+        return " / ".join(permutations_result)
+    elif len(max_categories) == 1:
+        if len(second_max_categories) >= 2:
+            permutations_result = [max_categories[0] + ''.join(p) for p in permutations(second_max_categories[0:], 2)]
+            return " / ".join(permutations_result)
+        elif len(second_max_categories) == 1 and len(third_max_categories) >= 2:
+            permutations_result = [max_categories[0] + second_max_categories[0] + ''.join(p) for p in permutations(third_max_categories, 1)]
+            return " / ".join(permutations_result)
+        else:
+            return max_categories[0] + second_max_categories[0] + third_max_categories[0]
+    else:
+        return max_categories[0] + second_max_categories[0] + third_max_categories[0]
+
+
+def page_category_counts(answers: Sequence[Any], questions_pool: Sequence[Dict[str, Any]],
+                         question_order: Optional[Sequence[int]] = None, served: int = 0) -> Dict[str, int]:
+    """Yes answers per category for survey page 6.
+
+    Answer i belongs to the i-th question served to the session, or to
+    question i modulo the pool size for sessions started before sessions
+    recorded a question order.
+    """
+    category_counts = {"R": 0, "A": 0, "S": 0, "C": 0, "I": 0, "E": 0}
+    for i, answer in enumerate(answers):
+        if answer and str(answer).lower() == "yes":
+            if question_order is not None:
+                if i >= served:
+                    continue
+                question_idx = question_order[i]
+            else:
+                question_idx = i % len(questions_pool)
+            category = questions_pool[question_idx]["category"]
+            category_counts[category] += 1
+    return category_counts
+
+
+def all_holland_codes(category_counts: Dict[str, int]) -> str:
+    """Every Holland code the counts tie between, joined with " / " (page 6)"""
+    # Sort categories by count first, then alphabetically
+    sorted_categories = sorted(category_counts.items(), key=lambda x: (x[1], x[0]), reverse=True)
+
+    # Group categories by their counts
+    max_count = sorted_categories[0][1]
+    second_max_count = sorted_categories[1][1]
+    third_max_count = sorted_categories[2][1]
+    max_categories = [cat for cat, count in sorted_categories if count == max_count]
+    second_max_categories = [cat for cat, count in sorted_categories if count == second_max_count]
+    third_max_categories = [cat for cat, count in sorted_categories if count == third_max_count]
+
+    return generate_code(max_categories, second_max_categories, third_max_categories)
+
+
+class SurveyScorer:
+    """Vectorized Holland code scoring for one or many finished surveys.
+
+    Answers are turned into an N x Q yes matrix and multiplied by a
+    precomputed Q x 6 category matrix, giving every student's RIASEC counts
+    in one pass. Codes are the top three categories by count (ties broken
+    alphabetically) and industries come from the IndustryIndex, looked up
+    once per distinct code in the batch: every industry sharing one of the
+    code's letters, ranked by how closely its codes match.
+    """
+
+    def __init__(self, questions_pool: Sequence[Dict[str, Any]], industry_index: IndustryIndex,
+                 fallback_industry: str = "General"):
+        self.industry_index = industry_index
+        self.fallback_industry = fallback_industry
+        # Industries per code; at most 120 codes, so kept for the scorer's lifetime
+        self._industries: Dict[str, List[str]] = {}
+        self.num_questions = len(questions_pool)
+        self.category_matrix = np.zeros((self.num_questions, len(CATEGORIES)), dtype=np.int32)
+        for i, question in enumerate(questions_pool):
+            category = question.get('category')
+            if category in CATEGORIES:
+                self.category_matrix[i, CATEGORIES.index(category)] = 1
+
+    def yes_matrix(self, answer_rows: Sequence[Sequence[Any]],
+                   question_orders: Optional[Sequence[Optional[Sequence[int]]]] = None) -> np.ndarray:
+        """N x Q matrix with 1 where a student answered 'yes' to question q.
+
+        Without a question order, answer i is taken to be question i. With
+        one (from the session's QuestionSampler), answer i belongs to
+        question order[i] and answers past the end of the order are ignored.
+        """
+        width = self.num_questions
+        padded = []
+        for answers in answer_rows:
+            row = [str(answer) for answer in answers[ANSWER_OFFSET:ANSWER_OFFSET + width]]
+            padded.append(row + [''] * (width - len(row)))
+        if not width:
+            return np.zeros((len(answer_rows), 0), dtype=np.int32)
+        yes = (np.char.lower(np.array(padded, dtype=str)) == 'yes').astype(np.int32)
+        if question_orders is None:
+            return yes
+        matrix = np.zeros_like(yes)
+        for row, order in enumerate(question_orders):
+            if order is None:
+                matrix[row] = yes[row]
+                continue
+            served = np.asarray(order, dtype=np.intp)[:width]
+            matrix[row, served] = yes[row, :len(served)]
+        return matrix
+
+    def category_counts(self, answer_rows: Sequence[Sequence[Any]],
+                        question_orders: Optional[Sequence[Optional[Sequence[int]]]] = None) -> np.ndarray:
+        """N x 6 RIASEC counts, columns in CATEGORIES order"""
+        return self.yes_matrix(answer_rows, question_orders) @ self.category_matrix
+
+    def holland_codes(self, counts: np.ndarray) -> List[str]:
+        """Top three categories of each row of counts"""
+        top = np.argsort(-counts, axis=1, kind='stable')[:, :3]
+        letters = np.array(CATEGORIES)[top]
+        return [''.join(row) for row in letters]
+
+    def matching_industries(self, holland_codes: str) -> List[str]:
+        """Industries for the code, its leading pair or its letters (IndustryIndex.closest), else the fallback"""
+        industries = self._industries.get(holland_codes)
+        if industries is None:
+            industries = self.industry_index.closest(holland_codes) or [self.fallback_industry]
+            self._industries[holland_codes] = industries
+        return list(industries)
+
+    def score_batch(self, answer_rows: Sequence[Sequence[Any]],
+                    question_orders: Optional[Sequence[Optional[Sequence[int]]]] = None) -> List[Dict[str, Any]]:
+        """Score many surveys; returns holland_codes, matching_industries and category_counts for each"""
+        if not answer_rows:
+            return []
+        counts = self.category_counts(answer_rows, question_orders)
+        codes = self.holland_codes(counts)
+        industries = {code: self.matching_industries(code) for code in set(codes)}
+        return [
+            {
+                "holland_codes": code,
+                "matching_industries": list(industries[code]),
+                "category_counts": dict(zip(CATEGORIES, row.tolist())),
+            }
+            for code, row in zip(codes, counts)
+        ]
+
+    def score(self, answers: Sequence[Any], question_order: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+        """Score one survey, optionally with the order its questions were served in"""
+        return self.score_batch([answers], [question_order])[0]
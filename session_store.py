@@ -0,0 +1,179 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+
+from storage import SessionStore
+
+
+class SurveySession:
+    """One in-progress survey, with a fixed set of slotted fields.
+
+    Behaves like the dicts the endpoints used before (get, [], in, keys), but
+    without a per-instance __dict__. Unknown keys, such as fields of older
+    session layouts, are rejected on write and dropped by `from_dict`.
+    """
+
+    FIELDS = ('answers', 'basic_info', 'final_answers', 'question_order', 'served',
+              'questions_version', 'holland_code', 'matching_industries', 'all_holland_codes')
+    __slots__ = FIELDS + ('last_seen',)
+
+    def __init__(self, **fields):
+        self.last_seen = time.monotonic()
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SurveySession":
+        return cls(**{key: value for key, value in data.items() if key in cls.FIELDS})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.FIELDS:
+            raise KeyError(f"Unknown session field: {key}")
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS and hasattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Iterator[str]:
+        return (key for key in self.FIELDS if hasattr(self, key))
+
+    def __iter__(self) -> Iterator[str]:
+        return self.keys()
+
+    def items(self):
+        return ((key, getattr(self, key)) for key in self.keys())
+
+    def estimated_size(self) -> int:
+        """Rough bytes held by this session and its field values"""
+        size = sys.getsizeof(self)
+        for _, value in self.items():
+            size += sys.getsizeof(value)
+            if isinstance(value, list):
+                size += sum(sys.getsizeof(item) for item in value)
+        return size
+
+
+class BoundedSessionStore(SessionStore):
+    """Process-local session store with idle expiry and an LRU size cap.
+
+    Sessions idle for longer than `ttl` seconds are dropped on access and by
+    a periodic sweep; once `max_entries` sessions are live, saving a new one
+    evicts the least recently used.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 2 * 3600, sweep_interval: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, SurveySession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, session: SurveySession, now: float) -> bool:
+        return now - session.last_seen > self.ttl
+
+    def get(self, user_name: str) -> Optional[SurveySession]:
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(user_name)
+            if session is None:
+                return None
+            if self._expired(session, now):
+                del self._sessions[user_name]
+                self.expirations += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(user_name)
+            return session
+
+    def save(self, user_name: str, session: Dict[str, Any]):
+        if not isinstance(session, SurveySession):
+            session = SurveySession.from_dict(session)
+        session.last_seen = time.monotonic()
+        with self._lock:
+            self._sessions[user_name] = session
+            self._sessions.move_to_end(user_name)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, user_name: str):
+        with self._lock:
+            self._sessions.pop(user_name, None)
+
+    def __contains__(self, user_name: str) -> bool:
+        return self.get(user_name) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def sweep(self) -> int:
+        """Drop every idle session; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            # Sessions are in access order, so expired ones are at the front
+            removed = 0
+            while self._sessions:
+                user_name, session = next(iter(self._sessions.items()))
+                if not self._expired(session, now):
+                    break
+                del self._sessions[user_name]
+                removed += 1
+            self.expirations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "live_sessions": len(self._sessions),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "bytes_estimate": sum(s.estimated_size() for s in self._sessions.values()),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def start_background_tasks(self):
+        """Sweep idle sessions periodically from a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.sweep_interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping sessions: {str(e)}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    while it runs await the same task and get its result or exception. The
+    key is released when the task finishes, so later calls start afresh.
+    The task is shielded from any single waiter being cancelled, such as a
+    client disconnecting, since other waiters still need its result.
+    Coalescing is per process; each worker has its own in-flight calls.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def _release(self, key: str, task: asyncio.Task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every waiter was cancelled
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Task, bool]:
+        """The in-flight task for `key`, starting `fn()` if there is none, and whether it was started here.
+
+        Registers the task before returning, so a caller that drives the
+        work itself, such as a stream, is joined by everyone arriving after.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task, False
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        self.calls += 1
+        task.add_done_callback(lambda done: self._release(key, done))
+        return task, True
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task, _ = self.start(key, fn)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
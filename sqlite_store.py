@@ -0,0 +1,345 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from storage import ChatSessionStore, ResponseStore, SessionStore, file_signature, primary_holland_code
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS survey_responses (
+    user_name TEXT PRIMARY KEY,
+    holland_code TEXT,
+    submitted_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_survey_responses_holland_code
+    ON survey_responses (holland_code);
+CREATE TABLE IF NOT EXISTS survey_sessions (
+    user_name TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated_at ON chat_sessions (updated_at);
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the prepared form on every call
+GET_RESPONSE = "SELECT data FROM survey_responses WHERE user_name = ?"
+PUT_RESPONSE = """
+INSERT INTO survey_responses (user_name, holland_code, submitted_at, data)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (user_name) DO UPDATE SET
+    holland_code = excluded.holland_code,
+    submitted_at = excluded.submitted_at,
+    data = excluded.data
+"""
+LIST_USERS = "SELECT user_name FROM survey_responses"
+COUNT_RESPONSES = "SELECT COUNT(*) FROM survey_responses"
+# Keyset pagination so exports never hold more than one page in memory
+PAGE_RESPONSES = "SELECT user_name, data FROM survey_responses WHERE user_name > ? ORDER BY user_name LIMIT ?"
+FIND_BY_CODE = "SELECT user_name FROM survey_responses WHERE holland_code = ? LIMIT ?"
+GET_SESSION = "SELECT data FROM survey_sessions WHERE user_name = ? AND updated_at > ?"
+PUT_SESSION = """
+INSERT INTO survey_sessions (user_name, updated_at, data) VALUES (?, ?, ?)
+ON CONFLICT (user_name) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data
+"""
+DELETE_SESSION = "DELETE FROM survey_sessions WHERE user_name = ?"
+DELETE_IDLE_SESSIONS = "DELETE FROM survey_sessions WHERE updated_at <= ?"
+COUNT_SESSIONS = "SELECT COUNT(*) FROM survey_sessions WHERE updated_at > ?"
+GET_CHAT_SESSION = "SELECT data FROM chat_sessions WHERE session_id = ? AND updated_at > ?"
+PUT_CHAT_SESSION = """
+INSERT INTO chat_sessions (session_id, updated_at, data) VALUES (?, ?, ?)
+ON CONFLICT (session_id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data
+"""
+DELETE_CHAT_SESSION = "DELETE FROM chat_sessions WHERE session_id = ?"
+DELETE_IDLE_CHAT_SESSIONS = "DELETE FROM chat_sessions WHERE updated_at <= ?"
+COUNT_CHAT_SESSIONS = "SELECT COUNT(*) FROM chat_sessions WHERE updated_at > ?"
+
+
+class SQLitePool:
+    """Small fixed-size pool of SQLite connections in WAL mode"""
+
+    def __init__(self, path: str, size: int = 4, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            isolation_level=None,  # Autocommit; transactions are explicit
+            cached_statements=128,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        _POOLS.pop(self.path, None)
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Pools are shared per database file so responses and sessions reuse connections
+_POOLS: Dict[str, SQLitePool] = {}
+
+
+def get_pool(path: str) -> SQLitePool:
+    if path not in _POOLS:
+        _POOLS[path] = SQLitePool(path)
+    return _POOLS[path]
+
+
+class SQLiteResponseStore(ResponseStore):
+    """Finished surveys stored in SQLite, indexed by user and Holland code"""
+
+    def __init__(self, path: str = 'ontrack.db', legacy_path: Optional[str] = None):
+        self.pool = get_pool(path)
+        if legacy_path and len(self) == 0:
+            self._import_legacy(legacy_path)
+
+    def _import_legacy(self, legacy_path: str):
+        """Seed an empty database from survey_responses.json"""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                stored_responses = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.put_many(stored_responses)
+
+    @staticmethod
+    def _row(user_name: str, user_data: Dict[str, Any]):
+        return (
+            user_name,
+            primary_holland_code(user_data),
+            user_data.get('timestamp'),
+            json.dumps(user_data, ensure_ascii=False),
+        )
+
+    def get(self, user_name: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(GET_RESPONSE, (user_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, user_name: str, user_data: Dict[str, Any]):
+        with self.pool.transaction() as conn:
+            conn.execute(PUT_RESPONSE, self._row(user_name, user_data))
+
+    def put_many(self, responses: Dict[str, Dict[str, Any]]):
+        """Store several surveys in one transaction"""
+        with self.pool.transaction() as conn:
+            conn.executemany(PUT_RESPONSE, [self._row(u, d) for u, d in responses.items()])
+
+    def users(self) -> Iterator[str]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(LIST_USERS).fetchall()
+        return iter([row[0] for row in rows])
+
+    def find_by_holland_code(self, holland_code: str, limit: int = 100) -> List[str]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(FIND_BY_CODE, (holland_code, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_items(self, page_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        last = ''
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(PAGE_RESPONSES, (last, page_size)).fetchall()
+            for user_name, data in rows:
+                yield user_name, json.loads(data)
+            if len(rows) < page_size:
+                return
+            last = rows[-1][0]
+
+    def __len__(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(COUNT_RESPONSES).fetchone()[0]
+
+    def version(self):
+        # Commits land in the WAL first, so its size/mtime moves on every write
+        return file_signature(self.pool.path, self.pool.path + '-wal')
+
+    def close(self):
+        self.pool.close()
+
+
+def _encode_session(obj):
+    if isinstance(obj, set):
+        return {"__set__": sorted(obj)}
+    if isinstance(obj, array):
+        return {"__array__": obj.typecode, "items": obj.tolist()}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _decode_session(obj):
+    if "__set__" in obj and len(obj) == 1:
+        return set(obj["__set__"])
+    if "__array__" in obj and len(obj) == 2:
+        return array(obj["__array__"], obj["items"])
+    return obj
+
+
+class SQLiteSessionStore(SessionStore):
+    """In-progress survey sessions shared through SQLite.
+
+    Every worker process reads and writes the same table, so the pages of
+    one survey can be served by different uvicorn workers, and sessions
+    survive restarts. Sessions not saved for `ttl` seconds are ignored and
+    removed by a periodic sweep.
+    """
+
+    def __init__(self, path: str = 'ontrack.db', ttl: float = 2 * 3600, sweep_interval: float = 300.0):
+        self.pool = get_pool(path)
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def get(self, user_name: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(GET_SESSION, (user_name, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0], object_hook=_decode_session) if row else None
+
+    def save(self, user_name: str, session: Dict[str, Any]):
+        if not isinstance(session, dict):
+            session = dict(session.items())
+        data = json.dumps(session, ensure_ascii=False, default=_encode_session)
+        with self.pool.transaction() as conn:
+            conn.execute(PUT_SESSION, (user_name, time.time(), data))
+
+    def delete(self, user_name: str):
+        with self.pool.transaction() as conn:
+            conn.execute(DELETE_SESSION, (user_name,))
+
+    def sweep(self) -> int:
+        """Delete idle sessions; returns how many were removed"""
+        with self.pool.transaction() as conn:
+            return conn.execute(DELETE_IDLE_SESSIONS, (time.time() - self.ttl,)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self.pool.connection() as conn:
+            live = conn.execute(COUNT_SESSIONS, (time.time() - self.ttl,)).fetchone()[0]
+        return {"backend": "sqlite", "live_sessions": live, "ttl_seconds": self.ttl}
+
+    def start_background_tasks(self):
+        """Sweep idle sessions periodically from a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.sweep_interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping sessions: {str(e)}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        self.pool.close()
+
+
+class SQLiteChatSessionStore(ChatSessionStore):
+    """Chat conversations shared through SQLite, so any worker can continue one.
+
+    Conversations not saved for `ttl` seconds are ignored and removed by a
+    periodic sweep.
+    """
+
+    def __init__(self, path: str = 'ontrack.db', ttl: float = 2 * 3600, sweep_interval: float = 300.0):
+        self.pool = get_pool(path)
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(GET_CHAT_SESSION, (session_id, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, session: Dict[str, Any]):
+        data = json.dumps(session, ensure_ascii=False)
+        with self.pool.transaction() as conn:
+            conn.execute(PUT_CHAT_SESSION, (session_id, time.time(), data))
+
+    def delete(self, session_id: str):
+        with self.pool.transaction() as conn:
+            conn.execute(DELETE_CHAT_SESSION, (session_id,))
+
+    def sweep(self) -> int:
+        """Delete idle conversations; returns how many were removed"""
+        with self.pool.transaction() as conn:
+            return conn.execute(DELETE_IDLE_CHAT_SESSIONS, (time.time() - self.ttl,)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self.pool.connection() as conn:
+            live = conn.execute(COUNT_CHAT_SESSIONS, (time.time() - self.ttl,)).fetchone()[0]
+        return {"backend": "sqlite", "live_sessions": live, "ttl_seconds": self.ttl}
+
+    def start_background_tasks(self):
+        """Sweep idle conversations periodically from a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.sweep_interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping chat sessions: {str(e)}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=run, name="chat-session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        self.pool.close()
@@ -0,0 +1,175 @@
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class ResponseStore:
+    """Interface for finished survey storage, keyed by user_name"""
+
+    def get(self, user_name: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, user_name: str, user_data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def put_many(self, responses: Dict[str, Dict[str, Any]]):
+        """Store several surveys; backends override this to write once"""
+        for user_name, user_data in responses.items():
+            self.put(user_name, user_data)
+
+    def users(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def find_by_holland_code(self, holland_code: str, limit: int = 100) -> List[str]:
+        """Return user names whose primary Holland code matches"""
+        raise NotImplementedError
+
+    def iter_items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (user_name, data) for every stored survey, one record at a time"""
+        for user_name in self.users():
+            user_data = self.get(user_name)
+            if user_data is not None:
+                yield user_name, user_data
+
+    def __contains__(self, user_name: str) -> bool:
+        return self.get(user_name) is not None
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.users())
+
+    def version(self) -> Any:
+        """Cheap token that changes whenever stored data changes, or None if unknown"""
+        return None
+
+    def start_background_tasks(self):
+        """Start maintenance work such as compaction; optional"""
+
+    def close(self):
+        """Release files and connections; optional"""
+
+
+class SessionStore:
+    """Interface for in-progress survey sessions (pages 1-6), keyed by user_name"""
+
+    def get(self, user_name: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, user_name: str, session: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete(self, user_name: str):
+        raise NotImplementedError
+
+    def __contains__(self, user_name: str) -> bool:
+        return self.get(user_name) is not None
+
+    def start_background_tasks(self):
+        """Start maintenance work such as expiring idle sessions; optional"""
+
+    def close(self):
+        """Release files and connections; optional"""
+
+
+class ChatSessionStore:
+    """Interface for chat conversations (history and rolling summary), keyed by session id"""
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def save(self, session_id: str, session: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def start_background_tasks(self):
+        """Start maintenance work such as expiring idle conversations; optional"""
+
+    def close(self):
+        """Release files and connections; optional"""
+
+
+def file_signature(*paths: str) -> Tuple:
+    """(inode, size, mtime) of each file; changes whenever any file is rewritten or grows"""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+def primary_holland_code(user_data: Dict[str, Any]) -> Optional[str]:
+    """Holland code stored with a survey, across old and new record layouts"""
+    code = user_data.get('holland_codes') or user_data.get('holland_code')
+    if not code:
+        return None
+    return str(code).split(' / ')[0]
+
+
+def create_response_store() -> ResponseStore:
+    """Build the response store selected by ONTRACK_STORAGE (log or sqlite).
+
+    Reads go through a CachedResponseStore of ONTRACK_RESPONSE_CACHE_SIZE
+    users; set it to 0 to read the backend directly.
+    """
+    backend = os.getenv('ONTRACK_STORAGE', 'log').lower()
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteResponseStore
+        store = SQLiteResponseStore(os.getenv('ONTRACK_DB_PATH', 'ontrack.db'),
+                                    legacy_path='survey_responses.json')
+    elif backend == 'log':
+        from response_store import LogResponseStore
+        store = LogResponseStore('survey_responses.jsonl', legacy_path='survey_responses.json')
+    else:
+        raise ValueError(f"Unknown ONTRACK_STORAGE backend: {backend}")
+    cache_size = int(os.getenv('ONTRACK_RESPONSE_CACHE_SIZE', '2048'))
+    if cache_size <= 0:
+        return store
+    from response_cache import CachedResponseStore
+    return CachedResponseStore(store, max_entries=cache_size)
+
+
+def session_backend() -> str:
+    """Session backend chosen by ONTRACK_SESSIONS (sqlite unless set to memory)"""
+    return os.getenv('ONTRACK_SESSIONS', 'sqlite').lower()
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by ONTRACK_SESSIONS (sqlite or memory).
+
+    The default is sqlite, which every uvicorn worker shares, so any worker
+    can serve any page of a survey. Memory sessions live in one process and
+    only work with a single worker; the number of workers cannot be read
+    reliably from inside one (--workers sets no environment variable).
+    """
+    backend = session_backend()
+    ttl = float(os.getenv('ONTRACK_SESSION_TTL', str(2 * 3600)))
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteSessionStore
+        path = os.getenv('ONTRACK_SESSION_DB_PATH') or os.getenv('ONTRACK_DB_PATH', 'ontrack.db')
+        return SQLiteSessionStore(path, ttl=ttl)
+    if backend == 'memory':
+        from session_store import BoundedSessionStore
+        return BoundedSessionStore(max_entries=int(os.getenv('ONTRACK_SESSION_MAX', '10000')), ttl=ttl)
+    raise ValueError(f"Unknown ONTRACK_SESSIONS backend: {backend}")
+
+
+def create_chat_session_store() -> ChatSessionStore:
+    """Build the chat session store on the same backend as survey sessions.
+
+    Conversations idle for ONTRACK_CHAT_SESSION_TTL seconds expire; the
+    memory backend keeps at most ONTRACK_CHAT_SESSION_MAX of them.
+    """
+    backend = session_backend()
+    ttl = float(os.getenv('ONTRACK_CHAT_SESSION_TTL', str(2 * 3600)))
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteChatSessionStore
+        path = os.getenv('ONTRACK_SESSION_DB_PATH') or os.getenv('ONTRACK_DB_PATH', 'ontrack.db')
+        return SQLiteChatSessionStore(path, ttl=ttl)
+    if backend == 'memory':
+        from chat_sessions import MemoryChatSessionStore
+        return MemoryChatSessionStore(max_entries=int(os.getenv('ONTRACK_CHAT_SESSION_MAX', '5000')), ttl=ttl)
+    raise ValueError(f"Unknown ONTRACK_SESSIONS backend: {backend}")
@@ -0,0 +1,35 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _guarded(events: AsyncIterator[str], label: str,
+                   error_data: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    # Headers are already sent once streaming starts, so failures are
+    # reported in-band as an `error` event instead of an HTTP status
+    try:
+        async for event in events:
+            yield event
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "detail": e.detail, **(error_data or {})})
+    except Exception as e:
+        print(f"Error in {label}: {str(e)}")
+        yield sse_event("error", {"status_code": 500, "detail": f"Error generating response: {str(e)}",
+                                  **(error_data or {})})
+
+
+def sse_response(events: AsyncIterator[str], label: str = "stream",
+                 error_data: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+    """Stream pre-formatted SSE events to the client; `error_data` is added to any error event"""
+    return StreamingResponse(
+        _guarded(events, label, error_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,26 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_main(tmp_path_factory):
+    """The server module, with every file it writes kept in a temporary directory"""
+    tmp = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in {
+            'OPENAI_API_KEY': 'test',
+            'ONTRACK_STORAGE': 'sqlite',
+            'ONTRACK_SESSIONS': 'memory',
+            'ONTRACK_DB_PATH': str(tmp / 'ontrack.db'),
+            'ONTRACK_CAREER_CACHE_PATH': str(tmp / 'career_paths_cache.db'),
+            'ONTRACK_TRACE_PATH': str(tmp / 'request_traces.jsonl'),
+        }.items():
+            patch.setenv(name, value)
+        import main
+        yield main
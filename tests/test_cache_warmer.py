@@ -0,0 +1,41 @@
+import random
+
+from cache_warmer import career_path_profiles
+
+
+def test_profiles_carry_each_codes_own_industries(app_main):
+    reference = app_main.REFERENCE.current
+    profiles = dict(career_path_profiles(reference.scorer))
+    assert len(profiles) == 120
+
+    # Straight from industry_mapping.yaml: industries listing the exact code
+    def listing(code):
+        return [entry['industry'] for entry in reference.industry_mapping
+                if code in [str(c).upper() for c in entry.get('holland_codes', [])]]
+
+    exact_codes = [code for code in profiles if listing(code)]
+    assert exact_codes
+    for code in exact_codes:
+        assert profiles[code] == listing(code), code
+    assert profiles["SEC"] != profiles["RIA"]
+    assert all(len(industries) < len(reference.industry_mapping) for industries in profiles.values())
+    assert len({tuple(industries) for industries in profiles.values()}) > 20
+
+
+def test_warmed_keys_cover_real_submissions(app_main):
+    scorer = app_main.REFERENCE.current.scorer
+    warmed = {app_main.career_paths_cache_key(code, industries)
+              for code, industries in career_path_profiles(scorer)}
+    assert len(warmed) == 120
+
+    rng = random.Random(3)
+    pool_size = len(app_main.REFERENCE.current.questions_pool)
+    submissions = [(["Yes"] * pool_size, None), (["No"] * pool_size, None)]
+    for _ in range(300):
+        submissions.append(([rng.choice(["Yes", "No"]) for _ in range(pool_size)], None))
+        order = rng.sample(range(pool_size), 40)  # Pages 2-5 of a session
+        submissions.append(([rng.choice(["Yes", "No"]) for _ in order], order))
+    for answers, order in submissions:
+        scored = scorer.score(answers, order)
+        key = app_main.career_paths_cache_key(scored["holland_codes"], scored["matching_industries"])
+        assert key in warmed, scored["holland_codes"]
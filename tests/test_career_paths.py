@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+from fake_openai import career_paths_text
+
+
+def sse_events(body: str):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        yield event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def test_concurrent_streams_share_one_generation(app_main, monkeypatch):
+    upstream_calls = 0
+
+    async def fake_stream(**kwargs):
+        nonlocal upstream_calls
+        upstream_calls += 1
+        for word in career_paths_text(3, "RIA").split(' '):
+            await asyncio.sleep(0.001)
+            yield word + ' '
+
+    monkeypatch.setattr(app_main.LLM, "stream", fake_stream)
+    industries = ["Stream Coalescing Test Industry"]
+    for i in range(5):
+        app_main.RESPONSE_STORE.put(f"stream-{i}", {"holland_codes": "RIA", "matching_industries": industries})
+
+    async def read(user_name):
+        response = await app_main.stream_career_paths(user_name)
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    async def run():
+        return await asyncio.gather(*(read(f"stream-{i}") for i in range(5)))
+
+    bodies = asyncio.run(run())
+    assert upstream_calls == 1
+
+    done = [data for body in bodies for event, data in sse_events(body) if event == "done"]
+    assert len(done) == 5
+    assert all(data["total_paths"] == 3 for data in done)
+    assert len({json.dumps(data["career_paths"]) for data in done}) == 1
+    assert sum(any(event == "token" for event, _ in sse_events(body)) for body in bodies) == 1
+    assert app_main.CAREER_PATHS_CACHE.get(app_main.career_paths_cache_key("RIA", industries)) is not None
+
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+USER = "chat-student"
+
+
+@pytest.fixture
+def chat(app_main, monkeypatch):
+    app_main.RESPONSE_STORE.put(USER, {
+        "holland_codes": "SEC",
+        "matching_industries": ["Education"],
+        "dse_scores": [4, 5, 3, 4, 5],
+    })
+    replies = []
+
+    async def fake_chat(**kwargs):
+        if not replies:
+            raise RuntimeError("upstream unavailable")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=replies.pop(0)))])
+
+    async def fake_stream(**kwargs):
+        if not replies:
+            raise RuntimeError("upstream unavailable")
+        for word in replies.pop(0).split(' '):
+            yield word
+
+    monkeypatch.setattr(app_main.LLM, "chat", fake_chat)
+    monkeypatch.setattr(app_main.LLM, "stream", fake_stream)
+    return app_main, replies
+
+
+def live_sessions(app_main):
+    return app_main.CHAT_SESSION_STORE.stats()["live_sessions"]
+
+
+def stream_events(app_main, message, session_id=None):
+    async def read():
+        response = await app_main.stream_chat_with_bot(
+            USER, app_main.ChatMessage(message=message, session_id=session_id))
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    events = []
+    for block in asyncio.run(read()).strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_failed_first_turn_leaves_no_session(chat):
+    app_main, replies = chat
+    before = live_sessions(app_main)
+    with pytest.raises(HTTPException):
+        asyncio.run(app_main.chat_with_bot(USER, app_main.ChatMessage(message="hello")))
+    assert live_sessions(app_main) == before
+
+    event, data = stream_events(app_main, "hello")[-1]
+    assert event == "error" and data["session_id"] is None
+    assert live_sessions(app_main) == before
+
+
+def test_session_is_stored_with_its_first_reply(chat):
+    app_main, replies = chat
+    replies.append("first reply")
+    result = asyncio.run(app_main.chat_with_bot(USER, app_main.ChatMessage(message="hello")))
+    session = app_main.CHAT_MEMORY.get(result["session_id"], USER)
+    assert [turn["content"] for turn in session["turns"]] == ["hello", "first reply"]
+
+    replies.append("streamed reply")
+    event, data = stream_events(app_main, "again", result["session_id"])[-1]
+    assert event == "done" and data["session_id"] == result["session_id"]
+    event, data = stream_events(app_main, "once more", result["session_id"])[-1]
+    assert event == "error" and data["session_id"] == result["session_id"]
+    assert len(app_main.CHAT_MEMORY.get(result["session_id"], USER)["turns"]) == 4
+
+
+def test_messages_do_not_wait_for_a_compaction(chat):
+    app_main, replies = chat
+    session = app_main.CHAT_MEMORY.create(USER, app_main.chat_profile(USER))
+    replies.append("reply")
+
+    async def run():
+        # A summary that never arrives must not hold up the conversation
+        compaction, _ = app_main.CHAT_COMPACTIONS.start(session["session_id"], lambda: asyncio.sleep(60))
+        try:
+            return await asyncio.wait_for(app_main.chat_with_bot(
+                USER, app_main.ChatMessage(message="hello", session_id=session["session_id"])), timeout=1)
+        finally:
+            compaction.cancel()
+
+    assert asyncio.run(run())["response"] == "reply"
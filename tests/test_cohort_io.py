@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cohort_io import parse_rows
+
+
+async def collect(lines, fmt):
+    async def source():
+        for line in lines:
+            yield line
+    return [item async for item in parse_rows(source(), fmt)]
+
+
+def test_invalid_csv_header_stops_parsing():
+    with pytest.raises(ValueError, match="user_name"):
+        asyncio.run(collect(["name,answers", "a,[]", "b,[]"], "csv"))
+
+
+def test_bad_rows_are_reported_one_by_one():
+    rows = asyncio.run(collect(['{"user_name": "a"}', "[1]", "not json"], "jsonl"))
+    assert [line for line, _ in rows] == [1, 2, 3]
+    assert rows[0][1] == {"user_name": "a"}
+    assert all(isinstance(row, str) for _, row in rows[1:])
+
+
+@pytest.fixture
+def client(app_main, monkeypatch):
+    monkeypatch.setattr(app_main, "ADMIN_TOKEN", "secret")
+    return TestClient(app_main.app)
+
+
+def test_export_and_import_need_the_admin_token(client):
+    assert client.get("/export_survey_results").status_code == 403
+    assert client.post("/import_survey_results", content=b"user_name\nx\n").status_code == 403
+    assert client.get("/export_survey_results", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_import_with_an_invalid_header_fails_once(client):
+    body = "name,answers,dse_scores\n" + "student,[],[]\n" * 5
+    response = client.post("/import_survey_results", content=body.encode(),
+                           headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 400
+    assert "user_name" in response.json()["detail"]
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from hedging import DeadlineExceeded, LatencyBudget
+
+
+def test_cold_budget_hedges_after_a_fraction_of_the_deadline():
+    budget = LatencyBudget("cold", deadline=1.0)
+    assert budget.hedge_delay() == pytest.approx(0.25)
+    assert LatencyBudget("explicit", deadline=1.0, hedge_after=0.1).hedge_delay() == 0.1
+
+
+def test_cold_start_hedge_answers_a_stuck_first_call():
+    budget = LatencyBudget("cold", deadline=0.4)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            await asyncio.sleep(10)  # The first attempt hangs
+        return "hedged"
+
+    assert asyncio.run(budget.run(call)) == "hedged"
+    assert (budget.hedged, budget.hedge_wins, budget.deadline_exceeded) == (1, 1, 0)
+
+
+def test_deadline_still_applies_when_both_attempts_hang():
+    budget = LatencyBudget("cold", deadline=0.2)
+
+    async def call():
+        await asyncio.sleep(10)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(budget.run(call))
+    assert budget.hedged == 1
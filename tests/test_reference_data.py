@@ -0,0 +1,45 @@
+import shutil
+
+import pytest
+
+import build_data
+from conftest import ROOT
+from reference_data import SOURCES, compile_snapshot, load_snapshot, load_yaml_sources
+from reference_set import ReferenceSet
+
+
+@pytest.fixture
+def sources(tmp_path):
+    for filename in (*SOURCES.values(), build_data.XLSX_PATH):
+        shutil.copy(f"{ROOT}/{filename}", tmp_path / filename)
+    return tmp_path
+
+
+def reference_view(reference: ReferenceSet):
+    """What a ReferenceSet serves: its data and the answers of its indexes"""
+    industries = sorted({entry['industry'] for entry in reference.industry_mapping} | set(reference.jupas))
+    targets = [1.5, 3.0, 4.2, 5.5, 6.8]
+    return {
+        "questions": reference.questions_pool,
+        "questions_version": reference.questions_version,
+        "mapping": reference.industry_mapping,
+        "jupas": reference.jupas,
+        "codes": {code: reference.scorer.matching_industries(code) for code in ("RIA", "SEC", "CER", "AES")},
+        "nearest": {(industry, target): reference.jupas_index.nearest(industry, target, 3)
+                    for industry in industries for target in targets},
+    }
+
+
+def test_both_build_paths_load_the_same_reference_set(sources):
+    build_path, _ = build_data.build(str(sources), snapshot_path=str(sources / "built.snapshot"))
+    compiled_path = compile_snapshot(str(sources), str(sources / "compiled.snapshot"))
+
+    built = load_snapshot(str(sources), build_path)
+    compiled = load_snapshot(str(sources), compiled_path)
+    assert built is not None and compiled is not None
+    assert built['jupas'] == compiled['jupas']
+    assert not any(industry.lower() == 'nan' for industry in built['jupas'])
+
+    from_yaml = reference_view(ReferenceSet.from_data(load_yaml_sources(str(sources))))
+    assert reference_view(ReferenceSet.from_data(built)) == from_yaml
+    assert reference_view(ReferenceSet.from_data(compiled)) == from_yaml
@@ -0,0 +1,63 @@
+import shutil
+
+import pytest
+import yaml
+
+from conftest import ROOT
+from reference_data import SOURCES
+from reference_set import ReloadableReference
+from sampler import QuestionSampler
+
+
+@pytest.fixture
+def sources(tmp_path):
+    for filename in SOURCES.values():
+        shutil.copy(f"{ROOT}/{filename}", tmp_path / filename)
+    return tmp_path
+
+
+def rewrite_questions(base_dir):
+    """Reverse the question pool, so every served index now points at another question"""
+    path = base_dir / SOURCES['questions_pool']
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    data['questions'].reverse()
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(data, f, allow_unicode=True)
+
+
+def test_session_is_scored_against_the_pool_it_started_on(sources):
+    reference = ReloadableReference(str(sources))
+    started_on = reference.current
+    session = {}
+    sampler = QuestionSampler.new(len(started_on.questions_pool), seed=7, version=started_on.questions_version)
+    for page in range(2, 6):
+        sampler.page(page)
+    sampler.save(session)
+    answers = ['Yes' if started_on.questions_pool[i]['category'] in 'RI' else 'No'
+               for i in session['question_order'][:session['served']]]
+    expected = started_on.scorer.score(answers, session['question_order'][:session['served']])
+
+    rewrite_questions(sources)
+    reference.reload()
+    assert reference.current.questions_version != session['questions_version']
+
+    kept = reference.for_version(session['questions_version'])
+    assert kept is started_on
+    assert kept.scorer.score(answers, session['question_order'][:session['served']]) == expected
+    assert reference.for_version(None) is reference.current
+
+
+def test_only_recent_versions_are_kept(sources):
+    reference = ReloadableReference(str(sources), keep_versions=1)
+    first = reference.current.questions_version
+    rewrite_questions(sources)
+    reference.reload()
+    second = reference.current.questions_version
+    rewrite_questions(sources)  # Back to the first pool
+    reference.reload()
+
+    assert reference.current.questions_version == first
+    assert reference.for_version(second) is not None
+    assert reference.for_version('not-a-version') is None
+    assert reference.stats()['previous_versions'] == [second]
@@ -0,0 +1,53 @@
+import asyncio
+import sqlite3
+import time
+
+from result_cache import ResultCache
+
+
+def used_at(path, key):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT used_at FROM results WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_disk_hits_touch_rows_only_when_stale(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResultCache(path).put("k", {"v": 1})
+    written = used_at(path, "k")
+
+    # A fresh instance has an empty memory tier, so every get reads the disk
+    cache = ResultCache(path, max_entries=0, touch_interval=60.0)
+    for _ in range(5):
+        assert cache.get("k") == {"v": 1}
+    assert used_at(path, "k") == written
+    assert cache.disk_hits == 5
+
+    stale = ResultCache(path, max_entries=0, touch_interval=0.0)
+    time.sleep(0.01)
+    assert stale.get("k") == {"v": 1}
+    assert used_at(path, "k") > written
+
+
+def test_async_disk_work_runs_in_a_thread(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    ResultCache(path).put("on disk", [1])
+    cache = ResultCache(path)
+    offloaded = []
+    to_thread = asyncio.to_thread
+
+    async def counting_to_thread(fn, *args):
+        offloaded.append(fn.__name__)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", counting_to_thread)
+
+    async def run():
+        await cache.aput("new", [2])
+        assert await cache.aget("new") == [2]  # memory hit, answered inline
+        assert await cache.aget("on disk") == [1]
+        assert await cache.aget("missing") is None
+        assert await cache.acontains("on disk")
+
+    asyncio.run(run())
+    assert offloaded == ["_put_disk", "_get_disk", "_get_disk"]
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 1, 1)
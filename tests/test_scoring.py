@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import ROOT
+from indexes import IndustryIndex
+from reference_data import load_yaml_sources
+from scoring import SurveyScorer, page_category_counts
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return load_yaml_sources(ROOT)
+
+
+@pytest.fixture(scope='module')
+def scorer(reference):
+    return SurveyScorer(reference['questions_pool'], IndustryIndex.from_mapping(reference['industry_mapping']))
+
+
+def answers_for(questions, categories):
+    """submit_survey answers saying yes to every question in the given categories"""
+    return ["student", 5, 4, 6, 3, 5] + ["yes" if q['category'] in categories else "no" for q in questions]
+
+
+def test_real_answers_match_their_code(reference, scorer):
+    result = scorer.score(answers_for(reference['questions_pool'], "SE"))
+    assert result["holland_codes"][:2] in ("ES", "SE")
+    index = IndustryIndex.from_mapping(reference['industry_mapping'])
+    assert result["matching_industries"] == index.ordered(index.for_code(result["holland_codes"]))
+
+
+def test_different_codes_get_different_industries(reference, scorer):
+    index = IndustryIndex.from_mapping(reference['industry_mapping'])
+    codes = ("SEC", "RIA", "AES", "CIR")
+    matched = {code: scorer.matching_industries(code) for code in codes}
+    assert len({tuple(industries) for industries in matched.values()}) == len(codes)
+    for code, industries in matched.items():
+        # Industries listing the exact code, and only those, when there are any
+        assert industries == index.ordered(index.for_code(code))
+        assert 0 < len(industries) < len(index)
+
+
+def test_falls_back_from_exact_code_to_pair_to_letters():
+    mapping = [
+        {'industry': 'Same letters', 'holland_codes': ['CES']},
+        {'industry': 'Leading pair', 'holland_codes': ['SEA']},
+        {'industry': 'Exact', 'holland_codes': ['SEC']},
+        {'industry': 'Unrelated', 'holland_codes': ['RIA']},
+    ]
+    scorer = SurveyScorer([{'question': 'q', 'category': 'S'}], IndustryIndex.from_mapping(mapping))
+    assert scorer.matching_industries('SEC') == ['Exact']
+    assert scorer.matching_industries('SER') == ['Leading pair', 'Exact']
+    assert scorer.matching_industries('ECS') == ['Same letters', 'Exact']
+    assert scorer.matching_industries('RCA') == ['General']
+
+
+def test_page6_counts_answers_by_question_order():
+    questions = [{"question": f"q{i}", "category": category} for i, category in enumerate("RIASEC")]
+    answers = ["Yes", "yes", "No", "Yes"]
+    # Answer i belongs to question order[i]; answers past `served` are ignored
+    assert page_category_counts(answers, questions, [5, 4, 0, 1], served=3) == \
+        {"R": 0, "A": 0, "S": 0, "C": 1, "I": 0, "E": 1}
+    # Sessions without an order count answer i for question i modulo the pool
+    assert page_category_counts(answers, questions) == {"R": 1, "A": 0, "S": 1, "C": 0, "I": 1, "E": 0}
@@ -0,0 +1,35 @@
+from sqlite_store import SQLiteChatSessionStore, SQLiteSessionStore
+from storage import create_chat_session_store, create_session_store
+
+
+def test_sessions_default_to_sqlite(tmp_path, monkeypatch):
+    for name in ('ONTRACK_SESSIONS', 'ONTRACK_STORAGE', 'WEB_CONCURRENCY', 'ONTRACK_SESSION_DB_PATH'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('ONTRACK_DB_PATH', str(tmp_path / 'ontrack.db'))
+    sessions = create_session_store()
+    chats = create_chat_session_store()
+    try:
+        assert isinstance(sessions, SQLiteSessionStore)
+        assert isinstance(chats, SQLiteChatSessionStore)
+    finally:
+        sessions.close()
+        chats.close()
+
+
+def test_sqlite_sessions_are_shared_between_workers(tmp_path):
+    # Two stores on one file stand in for two uvicorn worker processes
+    path = str(tmp_path / 'ontrack.db')
+    first = SQLiteSessionStore(path)
+    first.save('student', {'answers': ['a'], 'question_order': [3, 1, 2]})
+    first.pool.close()
+    second = SQLiteSessionStore(path)
+    try:
+        assert second.get('student')['question_order'] == [3, 1, 2]
+    finally:
+        second.close()
+
+
+def test_memory_sessions_on_request(monkeypatch):
+    monkeypatch.setenv('ONTRACK_SESSIONS', 'memory')
+    store = create_session_store()
+    assert store.stats()["backend"] == "memory"
@@ -0,0 +1,314 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qs
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+# Trace of the request being handled; None outside requests (e.g. the cache warmer)
+CURRENT_TRACE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    'ontrack_current_trace', default=None)
+
+
+def add_timing(stage: str, seconds: float):
+    """Add time spent in a stage (store, llm, ...) to the current request's trace"""
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        timings = trace['timings']
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def annotate(**fields: Any):
+    """Set fields on the current request's trace"""
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.update(fields)
+
+
+def add_llm_usage(model: str, usage: Any):
+    """LLMGateway usage hook: record the model and token counts on the current trace"""
+    trace = CURRENT_TRACE.get()
+    if trace is None:
+        return
+    llm = trace.setdefault('llm', {"models": [], "prompt_tokens": 0, "completion_tokens": 0})
+    if model not in llm["models"]:
+        llm["models"].append(model)
+    llm["prompt_tokens"] += getattr(usage, 'prompt_tokens', 0) or 0
+    llm["completion_tokens"] += getattr(usage, 'completion_tokens', 0) or 0
+
+
+class TraceLog:
+    """Per-request trace records written to JSON Lines off the request path.
+
+    `record` only appends to an in-memory queue; a daemon thread writes the
+    queue out in batches every `flush_interval` seconds or once `batch_size`
+    records are waiting. When `max_queue` records are already waiting, new
+    ones are dropped and counted rather than slowing requests down. The file
+    is rotated to path.1 ... path.N once it would grow past `max_bytes`.
+    Workers sharing the file serialize their writes with a lock file.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 5,
+                 max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._lock_fd = None
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        if fcntl is not None:
+            self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+
+    def record(self, trace: Dict[str, Any]):
+        # deque.append is atomic, so the request path takes no lock. The record
+        # is encoded now, since a task the request started may still touch it.
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(json.dumps(trace, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    @contextmanager
+    def _file_lock(self):
+        if self._lock_fd is None:
+            yield
+            return
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def _write(self, batch: List[bytes]):
+        data = b''.join(batch)
+        with self._file_lock():
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        self.written += len(batch)
+
+    def flush(self):
+        """Write out everything queued so far"""
+        with self._write_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(self._queue.popleft())
+                try:
+                    self._write(batch)
+                except OSError as e:
+                    print(f"Error writing request traces: {str(e)}")
+                    self.dropped += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "queued": len(self._queue),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+    def start_background_tasks(self):
+        """Flush the queue periodically from a daemon thread"""
+        if self._writer is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self.flush()
+
+        self._stop.clear()
+        self._writer = threading.Thread(target=run, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            self._writer = None
+        self.flush()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+class TraceMiddleware:
+    """ASGI middleware that opens a trace for each HTTP request and logs it when the response ends.
+
+    Code handling the request adds to the trace through `add_timing`,
+    `annotate` and `add_llm_usage`; the record gets route, user, status,
+    total latency and the per-stage timings.
+    """
+
+    def __init__(self, app, log: TraceLog):
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        trace: Dict[str, Any] = {"timestamp": time.time(), "timings": {}}
+        status = {"code": 500}
+        token = CURRENT_TRACE.set(trace)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status["code"] = message['status']
+                trace["timings"]["first_byte"] = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            CURRENT_TRACE.reset(token)
+            route = scope.get('route')
+            path_params = scope.get('path_params') or {}
+            trace.update(
+                method=scope.get('method'),
+                route=getattr(route, 'path', None) or scope.get('path'),
+                user=path_params.get('user_name') or _query_user(scope),
+                status=status["code"],
+                latency=time.perf_counter() - start,
+            )
+            self.log.record(trace)
+
+
+def _query_user(scope: Dict[str, Any]) -> Optional[str]:
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return query.get('user_name', [None])[0]
+
+
+def trace_methods(obj: Any, methods: Iterable[str], stage: str):
+    """Replace each named method on the instance `obj` with one adding its time to `stage`"""
+    for name in methods:
+        method = getattr(obj, name, None)
+        if method is None:
+            continue
+
+        def make(method):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    add_timing(stage, time.perf_counter() - start)
+            return wrapper
+
+        setattr(obj, name, make(method))
+
+
+def trace_cache(cache: Any, name: str):
+    """Record whether the current request's lookups in `cache` hit or missed"""
+    get = cache.get
+    aget = cache.aget
+
+    @functools.wraps(get)
+    def traced_get(key):
+        value = get(key)
+        annotate_cache(name, "hit" if value is not None else "miss")
+        return value
+
+    @functools.wraps(aget)
+    async def traced_aget(key):
+        value = await aget(key)
+        annotate_cache(name, "hit" if value is not None else "miss")
+        return value
+
+    cache.get = traced_get
+    cache.aget = traced_aget
+
+
+def trace_flights(flights: Any, name: str):
+    """Record when the current request joins a SingleFlight call already in flight"""
+    start = flights.start
+
+    @functools.wraps(start)
+    def traced_start(key, fn):
+        task, started = start(key, fn)
+        if not started:
+            annotate_cache(name, "coalesced")
+        return task, started
+
+    flights.start = traced_start
+
+
+def annotate_cache(name: str, outcome: str):
+    trace = CURRENT_TRACE.get()
+    if trace is not None:
+        trace.setdefault('cache', {})[name] = outcome
+
+
+def trace_gateway(gateway: Any):
+    """Add LLM call time, first-token time and token usage to the current trace"""
+    chat = gateway.chat
+    stream = gateway.stream
+
+    @functools.wraps(chat)
+    async def traced_chat(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await chat(*args, **kwargs)
+        finally:
+            add_timing("llm", time.perf_counter() - start)
+
+    @functools.wraps(stream)
+    async def traced_stream(*args, **kwargs):
+        start = time.perf_counter()
+        first = True
+        try:
+            async for text in stream(*args, **kwargs):
+                if first:
+                    add_timing("llm_first_token", time.perf_counter() - start)
+                    first = False
+                yield text
+        finally:
+            add_timing("llm", time.perf_counter() - start)
+
+    gateway.chat = traced_chat
+    gateway.stream = traced_stream
+    gateway.usage_hooks.append(add_llm_usage)